@@ -1,13 +1,9 @@
 import os
 import time
-import bisect
-from faker import Faker
-from bloomfilter import BloomFilter
-from cuckoofilter import CuckooFilter
-from random import shuffle
+import importlib
 import unittest
-import pickle
-from bitarray import bitarray
+# The structure modules (and numpy, mmh3, bitarray under them) are imported on first use,
+# so a run that needs one structure only pays for that one; see LazyStructures below.
 
 # File path
 iii = 5 # number of users you want to use, in 'million'
@@ -17,121 +13,124 @@ iii = 5 # number of users you want to use, in 'million'
 # BLOOM_FILTER_FILE = "bloom_filter_2.pkl"
 # CUCKOO_FILTER_FILE = "cuckoo_filter_2.pkl"
 
-DATA_FILE = f"usernames_5M.txt"
+DATA_FILE = f"usernames_{iii}M.txt"
 # sorted_data_path = f"sorted_usernames_{iii}M.txt"
-BLOOM_FILTER_FILE = f"bloom_filter_2.pkl"
-CUCKOO_FILTER_FILE = f"cuckoo_filter_2.pkl"
+SORTED_INDEX_FILE = f"sorted_usernames_{iii}M.idx"  # built by sortedindex.py
+BLOOM_FILTER_FILE = f"bloom_filter_{iii}M.bin"
+CUCKOO_FILTER_FILE = f"cuckoo_filter_{iii}M.bin"
+BLOCKED_BLOOM_FILTER_FILE = f"blocked_bloom_filter_{iii}M.bin"
+FINGERPRINT_SET_FILE = f"fingerprint_set_{iii}M.bin"  # built by fingerprintset.py
+XOR_FILTER_FILE = f"xor_filter_{iii}M.bin"
+BATCH_SIZE = 1_000_000  # usernames read per batch
+
+# Startup cost per phase (imports, each structure load), in the order the phases ran
+STARTUP_PHASES = {}
+_nested_time = [0.0]  # time of the phases running inside the current one
+
+def timed_phase(phase, load):
+    """
+    Run load(), record its duration under phase in STARTUP_PHASES and return its result.
+    Phases run inside it (e.g. the import a load triggers) are recorded on their own
+    and not counted again here.
+    """
+    outer_nested = _nested_time[0]
+    _nested_time[0] = 0.0
+    start = time.perf_counter()
+    try:
+        value = load()
+    finally:
+        elapsed = time.perf_counter() - start
+        STARTUP_PHASES[phase] = STARTUP_PHASES.get(phase, 0.0) + elapsed - _nested_time[0]
+        _nested_time[0] = outer_nested + elapsed
+    return value
+
+def lazy_import(module):
+    """
+    Import a module on first use, timing the import as a startup phase.
+    """
+    return timed_phase(f"import {module}", lambda: importlib.import_module(module))
+
+def print_startup_report():
+    """
+    Print the startup cost broken down by phase.
+    """
+    print("Startup phases:")
+    for phase, seconds in STARTUP_PHASES.items():
+        print(f"  {phase:<28} {seconds * 1000:10.3f} ms")
+    print(f"  {'total':<28} {sum(STARTUP_PHASES.values()) * 1000:10.3f} ms")
 
 def load_usernames(filename, max_users):
     """
     Load usernames from the specified file (one per line) and return them as a list.
     """
     print(f"Loading usernames from file {filename}...")
+    UsernameSource = lazy_import("usernamesource").UsernameSource
     start = time.time()
     usernames = []
-    with open(filename, 'r', encoding='utf-8') as f:
-        for i, line in enumerate(f):
-            if max_users and i >= max_users:
-                break  # stop reading
-            usernames.append(line.strip())
+    for batch in UsernameSource(filename).batches(BATCH_SIZE):
+        usernames.extend(batch)
+        if max_users and len(usernames) >= max_users:
+            del usernames[max_users:]
+            break  # stop reading
     elapsed = time.time() - start
     print(f"Loaded {len(usernames)} usernames in {elapsed:.2f} seconds.")
     return usernames
 
-def load_usernames_set(filename):
-    """Use a generator to load large pickle file."""
-    with open(filename, 'rb') as f:
-        usernames_set = pickle.load(f)
-
-    return usernames_set
-
-def load_bloom_filter_in_chunks(filename, numUser):
-    bloom_filter = BloomFilter(items_count=numUser, fp_prob=0.01)
-    all_bits = []
-    with open(filename, "rb") as f:
-        while True:
-            current_pos = f.tell()
-            try:
-                chunk = pickle.load(f)
-                if not chunk:  # Check if chunk is null
-                    break
-                # bloom_filter.bit_array.extend(chunk)
-                all_bits.extend(chunk) # Append the current chunk of the bit array to `bit_array`
-                # print(f"Loaded BloomFilter chunk, total bits: {len(bloom_filter.bit_array)}")
-                # print(f"Loaded BloomFilter chunk, total bits: {len(all_bits)}")
-            except EOFError:
-                if f.tell() == current_pos:
-                    break
-
-    if len(all_bits) >= bloom_filter.size:
-        bloom_filter.bit_array.extend(all_bits[:bloom_filter.size])
-        print(f"Loaded {len(all_bits)} bits in total, using first {bloom_filter.size} bits.")
-    else:
-        bloom_filter.bit_array.extend(all_bits[:len(all_bits)])
-        print(f"Loaded {len(all_bits)} bits in total, using first {len(all_bits)} bits.")
-    return bloom_filter
-
-def load_cuckoo_filter_in_chunks(filename, numUser):
-    cuckoo_filter = CuckooFilter(capacity=numUser)
-    all_buckets = []
-
-    with open(filename, "rb") as f:
-        while True:
-            try:
-                current_pos = f.tell()
-                chunk = pickle.load(f)
-                # cuckoo_filter.buckets.extend(chunk)
-                all_buckets.extend(chunk)  # Append the current chunk's bucket data to the `buckets` list
-                # print(f"Loaded CuckooFilter chunk, total buckets: {len(cuckoo_filter.buckets)}")
-                # print(f"Loaded CuckooFilter chunk, total buckets: {len(all_buckets)}")
-            except EOFError:
-                if f.tell() == current_pos:
-                    # print("Reached EOF, breaking loop")
-                    break
-
-    cuckoo_filter.buckets.extend(all_buckets[:numUser])
-    print(f"Loaded {len(all_buckets)} buckets in total, using first {numUser} buckets.")
-
-    return cuckoo_filter
-
 # Different data structures
 def method_linear(usernames, new_username):
 
     return new_username in usernames
 
-# def method_binary(sorted_usernames, new_username):
-#
-#     index = bisect.bisect_left(sorted_usernames, new_username)
-#     return index < len(sorted_usernames) and sorted_usernames[index] == new_username
 
-def method_binary(sorted_usernames, new_username):
-    """
-    Implements binary search to check if new_username exists in sorted_usernames.
+def method_hash(usernames_set, new_username):
+
+    return new_username in usernames_set
+
 
-    Parameters:
-        sorted_usernames (list): A list of usernames sorted in ascending order.
-        new_username (str): The username to search for.
+class LazyStructures:
+    """
+    Loads each search structure on first access and keeps it.
 
-    Returns:
-        bool: True if new_username exists, False otherwise.
+    Filters, the fingerprint set and the sorted index are memory-mapped from their
+    prebuilt files, so opening one costs milliseconds; the raw username list (and the
+    set built from it) is only read when the linear or hash search asks for it.
     """
-    left, right = 0, len(sorted_usernames) - 1
 
-    while left <= right:
-        mid = (left + right) // 2
-        if sorted_usernames[mid] == new_username:
-            return True
-        elif sorted_usernames[mid] < new_username:
-            left = mid + 1
-        else:
-            right = mid - 1
+    def __init__(self, max_users):
+        self.max_users = max_users
 
-    return False
+    def __getattr__(self, name):
+        # Only called for structures that are not loaded yet.
+        loader = getattr(type(self), f"_load_{name}", None)
+        if loader is None:
+            raise AttributeError(name)
+        value = timed_phase(f"load {name}", lambda: loader(self))
+        setattr(self, name, value)
+        return value
 
+    def _load_usernames(self):
+        return load_usernames(DATA_FILE, self.max_users)
 
-def method_hash(usernames_set, new_username):
+    def _load_usernames_set(self):
+        return set(self.usernames)
 
-    return new_username in usernames_set
+    def _load_sorted_index(self):
+        return lazy_import("sortedindex").SortedIndex(SORTED_INDEX_FILE)
+
+    def _load_bloom_filter(self):
+        return lazy_import("bloomfilter").BloomFilter.load(BLOOM_FILTER_FILE)
+
+    def _load_cuckoo_filter(self):
+        return lazy_import("cuckoofilter").CuckooFilter.load(CUCKOO_FILTER_FILE)
+
+    def _load_blocked_bloom_filter(self):
+        return lazy_import("bloomfilter").BlockedBloomFilter.load(BLOCKED_BLOOM_FILTER_FILE)
+
+    def _load_fingerprint_set(self):
+        return lazy_import("fingerprintset").FingerprintSet.load(FINGERPRINT_SET_FILE)
+
+    def _load_xor_filter(self):
+        return lazy_import("xorfilter").XorFilter.load(XOR_FILTER_FILE)
 
 
 class TestSearchMethods(unittest.TestCase):
@@ -140,15 +139,8 @@ class TestSearchMethods(unittest.TestCase):
 
     @classmethod
     def setUpClass(cls):
-        """ Load usernames only once for all tests. """
-        cls.usernames = load_usernames(DATA_FILE, cls.max_users)
-
-        # Load BloomFilter and CuckooFilter
-        start = time.time()
-        cls.bloom_filter = load_bloom_filter_in_chunks(BLOOM_FILTER_FILE, cls.max_users)
-        cls.cuckoo_filter = load_cuckoo_filter_in_chunks(CUCKOO_FILTER_FILE, cls.max_users)
-        time_load = time.time() - start
-        print(f"Load time : {time_load:.6f} seconds.")
+        """ Set up lazy loading: each test loads only the structure it searches. """
+        cls.structures = LazyStructures(cls.max_users)
 
         # Generate a new username
         # cls.fake = Faker()
@@ -156,47 +148,81 @@ class TestSearchMethods(unittest.TestCase):
         cls.new_username = 'haoyu_5000001' # Set a non-existent username to ensure the worst-case search.
         print(f"Generated new username: {cls.new_username}")
 
+    @classmethod
+    def tearDownClass(cls):
+        print_startup_report()
+
     def test_1_linear_search(self):
         """ Test linear search """
         new_username = TestSearchMethods.new_username
+        usernames = self.structures.usernames
         start = time.time()
-        result = method_linear(self.usernames, new_username)
+        result = method_linear(usernames, new_username)
         time_linear = time.time() - start
         print(f"Method 1 (Linear Search): {'User name existed' if result else 'User name is available'}, search time: {time_linear:.6f} seconds")
 
     def test_2_binary_search(self):
         """ Test binary search """
         new_username = TestSearchMethods.new_username
-        self.sorted_usernames = sorted(TestSearchMethods.usernames)
+        sorted_index = self.structures.sorted_index
         start = time.perf_counter()
-        result = method_binary(self.sorted_usernames, new_username)
+        result = sorted_index.contains(new_username)
         time_binary = time.perf_counter() - start
         print(f"Method 2 (Binary Search): {'User name existed' if result else 'User name is available'}, search time: {time_binary:.16f} seconds")
 
     def test_3_hash_search(self):
         """ Test hash search """
         new_username = TestSearchMethods.new_username
-        self.usernames_set = set(TestSearchMethods.usernames)
+        usernames_set = self.structures.usernames_set
         start = time.perf_counter()
-        result = method_hash(self.usernames_set, new_username)
+        result = method_hash(usernames_set, new_username)
         time_hash = time.perf_counter() - start
         print(f"Method 3 (Hash Search): {'User name existed' if result else 'User name is available'}, search time: {time_hash:.16f} seconds")
 
     def test_4_bloomfilter_search(self):
         """ Test BloomFilter search """
         new_username = TestSearchMethods.new_username
+        bloom_filter = self.structures.bloom_filter
         start = time.perf_counter()
-        result = TestSearchMethods.bloom_filter.check(new_username)
+        result = bloom_filter.check(new_username)
         time_bloom = time.perf_counter() - start
         print(f"Method 4 (BloomFilter Search): {'User name existed' if result else 'User name is available'}, search time: {time_bloom:.16f} seconds")
 
     def test_5_cuckoofilter_search(self):
         """ Test CuckooFilter search """
         new_username = TestSearchMethods.new_username
+        cuckoo_filter = self.structures.cuckoo_filter
         start = time.perf_counter()
-        result = TestSearchMethods.cuckoo_filter.contains(new_username)
+        result = cuckoo_filter.contains(new_username)
         time_cuckoo = time.perf_counter() - start
         print(f"Method 5 (CuckooFilter Search): {'User name existed' if result else 'User name is available'}, search time: {time_cuckoo:.16f} seconds")
 
+    def test_6_blockedbloomfilter_search(self):
+        """ Test BlockedBloomFilter search """
+        new_username = TestSearchMethods.new_username
+        blocked_bloom_filter = self.structures.blocked_bloom_filter
+        start = time.perf_counter()
+        result = blocked_bloom_filter.check(new_username)
+        time_blocked_bloom = time.perf_counter() - start
+        print(f"Method 6 (BlockedBloomFilter Search): {'User name existed' if result else 'User name is available'}, search time: {time_blocked_bloom:.16f} seconds")
+
+    def test_7_fingerprintset_search(self):
+        """ Test FingerprintSet search """
+        new_username = TestSearchMethods.new_username
+        fingerprint_set = self.structures.fingerprint_set
+        start = time.perf_counter()
+        result = fingerprint_set.contains(new_username)
+        time_fingerprint = time.perf_counter() - start
+        print(f"Method 7 (FingerprintSet Search): {'User name existed' if result else 'User name is available'}, search time: {time_fingerprint:.16f} seconds")
+
+    def test_8_xorfilter_search(self):
+        """ Test XorFilter search """
+        new_username = TestSearchMethods.new_username
+        xor_filter = self.structures.xor_filter
+        start = time.perf_counter()
+        result = xor_filter.check(new_username)
+        time_xor = time.perf_counter() - start
+        print(f"Method 8 (XorFilter Search): {'User name existed' if result else 'User name is available'}, search time: {time_xor:.16f} seconds")
+
 if __name__ == '__main__':
     unittest.main()
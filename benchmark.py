@@ -0,0 +1,314 @@
+import argparse
+import csv
+import gc
+import json
+import os
+import random
+import resource
+import tempfile
+import time
+import tracemalloc
+from bisect import bisect_left
+import numpy as np
+from bloomfilter import BloomFilter, BlockedBloomFilter
+from cuckoofilter import CuckooFilter
+from fingerprintset import FingerprintSet
+from sortedindex import SortedIndex, build_sorted_index
+from usernamesource import UsernameSource
+from xorfilter import XorFilter
+
+# Benchmark harness for every membership structure.
+#
+# For each dataset and structure the harness builds the structure (writing its artifact,
+# if it has one), loads it back, warms it up and then times a seeded query mix with a
+# configurable share of taken names over several repetitions. It reports build time,
+# load time, memory (Python heap and resident growth), single-query throughput and
+# p50/p95/p99 latency (and batch throughput where the structure has a vectorized path)
+# as JSON and CSV rows that plot_run_time.py reads directly.
+FP_PROB = 0.01
+CUCKOO_FINGERPRINT_SIZE = 10  # about FP_PROB at the default 95% load
+BATCH_SIZE = 1_000_000
+
+
+class Structure:
+    """
+    How to build, load and query one membership structure.
+
+    Attributes:
+        name (str): Name used on the command line and in the results.
+        load (callable): load(data_file, artifact) -> structure, ready for queries.
+        check (callable): check(structure, name) -> bool.
+        build (callable): build(data_file, artifact) persisting the structure to artifact and
+            returning the number of names that did not fit (or None when none can fail),
+            or None for structures that are only ever built in memory by load.
+        check_many (callable): check_many(structure, names) -> array of bool, or None.
+        max_queries (int): Cap on timed queries (for O(n) structures), or None.
+    """
+
+    def __init__(self, name, load, check, build=None, check_many=None, max_queries=None):
+        self.name = name
+        self.load = load
+        self.check = check
+        self.build = build
+        self.check_many = check_many
+        self.max_queries = max_queries
+
+
+def _load_list(data_file, artifact=None):
+    usernames = []
+    for batch in UsernameSource(data_file).batches(BATCH_SIZE):
+        usernames.extend(batch)
+    return usernames
+
+
+def _binary_search(sorted_usernames, name):
+    i = bisect_left(sorted_usernames, name)
+    return i < len(sorted_usernames) and sorted_usernames[i] == name
+
+
+def _build_filter(make_filter, add):
+    def build(data_file, artifact):
+        source = UsernameSource(data_file)
+        new_filter = make_filter(source.count())
+        for batch in source.batches(BATCH_SIZE):
+            add(new_filter, batch)
+        new_filter.save(artifact)
+    return build
+
+
+def _build_cuckoo(data_file, artifact):
+    source = UsernameSource(data_file)
+    cuckoo_filter = CuckooFilter(expected_items=source.count(), fingerprint_size=CUCKOO_FINGERPRINT_SIZE)
+    # Hash batch by batch but place all keys at once, so they spread over the whole table.
+    keys = [cuckoo_filter._fingerprints_and_indices(batch) for batch in source.batches(BATCH_SIZE)]
+    failed = 0
+    if keys:
+        failed = cuckoo_filter._insert_fingerprints(np.concatenate([fps for fps, _ in keys]),
+                                                    np.concatenate([indices for _, indices in keys]))
+    cuckoo_filter.save(artifact)
+    return failed
+
+
+def _build_sorted_index(data_file, artifact):
+    build_sorted_index(data_file, artifact)  # returns the count of distinct names, not failures
+
+
+STRUCTURES = {}
+
+
+def register_structure(structure):
+    """
+    Adds a structure to the benchmark registry.
+    """
+    STRUCTURES[structure.name] = structure
+    return structure
+
+
+register_structure(Structure(
+    'linear', load=_load_list, check=lambda usernames, name: name in usernames, max_queries=200))
+register_structure(Structure(
+    'binary', load=lambda data_file, artifact: sorted(_load_list(data_file)), check=_binary_search))
+register_structure(Structure(
+    'hash', load=lambda data_file, artifact: set(_load_list(data_file)),
+    check=lambda usernames, name: name in usernames))
+register_structure(Structure(
+    'sorted_index', build=_build_sorted_index,
+    load=lambda data_file, artifact: SortedIndex(artifact),
+    check=SortedIndex.contains, check_many=SortedIndex.contains_many))
+register_structure(Structure(
+    'fingerprints', build=lambda data_file, artifact: FingerprintSet.from_file(data_file).save(artifact),
+    load=lambda data_file, artifact: FingerprintSet.load(artifact),
+    check=FingerprintSet.contains, check_many=FingerprintSet.contains_many))
+register_structure(Structure(
+    'bloom', build=_build_filter(lambda n: BloomFilter(n, FP_PROB), BloomFilter.add_many),
+    load=lambda data_file, artifact: BloomFilter.load(artifact),
+    check=BloomFilter.check, check_many=BloomFilter.check_many))
+register_structure(Structure(
+    'blocked_bloom', build=_build_filter(lambda n: BlockedBloomFilter(n, FP_PROB), BlockedBloomFilter.add_many),
+    load=lambda data_file, artifact: BlockedBloomFilter.load(artifact),
+    check=BlockedBloomFilter.check, check_many=BlockedBloomFilter.check_many))
+register_structure(Structure(
+    'cuckoo', build=_build_cuckoo, load=lambda data_file, artifact: CuckooFilter.load(artifact),
+    check=CuckooFilter.contains, check_many=CuckooFilter.contains_many))
+register_structure(Structure(
+    'xor', build=lambda data_file, artifact: XorFilter.from_file(data_file).save(artifact),
+    load=lambda data_file, artifact: XorFilter.load(artifact),
+    check=XorFilter.check, check_many=XorFilter.check_many))
+
+
+def current_rss():
+    """
+    Returns the resident set size of this process in bytes.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        # Peak rather than current RSS, in KB on Linux.
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def make_queries(data_file, count, hit_ratio, seed=0):
+    """
+    Returns a reproducible, shuffled list of count query names: round(count * hit_ratio)
+    sampled from data_file and the rest guaranteed absent (no generated username has a '~').
+    """
+    rng = random.Random(seed)
+    source = UsernameSource(data_file)
+    total = source.count()
+    hits = min(round(count * hit_ratio), total)
+    wanted = sorted(rng.sample(range(total), hits))
+    queries = []
+    position = 0
+    for i, name in enumerate(source):
+        if position == len(wanted):
+            break
+        if i == wanted[position]:
+            queries.append(name)
+            position += 1
+    queries.extend(f"~absent~{seed}~{i}" for i in range(count - hits))
+    rng.shuffle(queries)
+    return queries
+
+
+def _percentile_us(latencies_ns, q):
+    return float(np.percentile(latencies_ns, q)) / 1000 if len(latencies_ns) else 0.0
+
+
+def run_structure(structure, data_file, queries, workdir, warmup=1000, repetitions=5):
+    """
+    Builds, loads and times one structure over one dataset.
+
+    Returns:
+        dict: One result row.
+    """
+    artifact = os.path.join(workdir, f"{structure.name}.bin")
+    start = time.perf_counter()
+    failed_inserts = 0
+    if structure.build is not None:
+        failed_inserts = structure.build(data_file, artifact) or 0
+    build_seconds = time.perf_counter() - start
+
+    # Python heap used by the structure, from a separate traced load (tracing slows loading).
+    # Memory-mapped structures barely show here; their pages appear in rss_bytes instead.
+    gc.collect()
+    tracemalloc.start()
+    instance = structure.load(data_file, artifact)
+    heap_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del instance
+
+    gc.collect()
+    rss_before = current_rss()
+    start = time.perf_counter()
+    instance = structure.load(data_file, artifact)
+    load_seconds = time.perf_counter() - start
+
+    if structure.max_queries is not None:
+        queries = queries[:structure.max_queries]
+    check = structure.check
+    for name in queries[:warmup]:
+        check(instance, name)
+
+    latencies = np.empty(len(queries) * repetitions, dtype=np.int64)
+    single_seconds = 0.0
+    batch_seconds = 0.0
+    perf_counter_ns = time.perf_counter_ns
+    for rep in range(repetitions):
+        # Throughput is measured without per-query timers, latency with them.
+        start = time.perf_counter()
+        for name in queries:
+            check(instance, name)
+        single_seconds += time.perf_counter() - start
+
+        offset = rep * len(queries)
+        for j, name in enumerate(queries):
+            t0 = perf_counter_ns()
+            check(instance, name)
+            latencies[offset + j] = perf_counter_ns() - t0
+
+        if structure.check_many is not None:
+            start = time.perf_counter()
+            structure.check_many(instance, queries)
+            batch_seconds += time.perf_counter() - start
+
+    rss_bytes = current_rss() - rss_before
+    timed = len(queries) * repetitions
+    result = {
+        'structure': structure.name,
+        'dataset': os.path.basename(data_file),
+        'items': UsernameSource(data_file).count(),
+        'queries': len(queries),
+        'repetitions': repetitions,
+        'build_seconds': build_seconds,
+        'failed_inserts': failed_inserts,
+        'load_seconds': load_seconds,
+        'heap_bytes': heap_bytes,
+        'rss_bytes': rss_bytes,
+        'throughput_qps': timed / single_seconds if single_seconds else 0.0,
+        'batch_throughput_qps': timed / batch_seconds if batch_seconds else None,
+        'mean_us': float(latencies.mean()) / 1000 if timed else 0.0,
+        'p50_us': _percentile_us(latencies, 50),
+        'p95_us': _percentile_us(latencies, 95),
+        'p99_us': _percentile_us(latencies, 99),
+    }
+    del instance
+    gc.collect()
+    return result
+
+
+def run_benchmark(data_files, structures, query_count=100_000, hit_ratio=0.1, warmup=1000,
+                  repetitions=5, seed=0, workdir=None):
+    """
+    Runs every structure over every dataset.
+
+    Returns:
+        list: Result rows, each also recording hit_ratio and seed.
+    """
+    results = []
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        for data_file in data_files:
+            queries = make_queries(data_file, query_count, hit_ratio, seed)
+            for name in structures:
+                row = run_structure(STRUCTURES[name], data_file, queries, tmp, warmup, repetitions)
+                row.update(hit_ratio=hit_ratio, seed=seed)
+                print(f"{row['dataset']:>20} {name:>14}: {row['throughput_qps']:>12.0f} q/s, "
+                      f"p50 {row['p50_us']:.2f} us, p99 {row['p99_us']:.2f} us, "
+                      f"build {row['build_seconds']:.2f} s, load {row['load_seconds']:.4f} s, "
+                      f"heap {row['heap_bytes'] / 2**20:.1f} MB, rss {row['rss_bytes'] / 2**20:.1f} MB"
+                      + (f", {row['failed_inserts']} names did not fit" if row['failed_inserts'] else ""))
+                results.append(row)
+    return results
+
+
+def write_results(results, json_file=None, csv_file=None):
+    """
+    Writes result rows as a JSON list and/or a CSV table.
+    """
+    if json_file:
+        with open(json_file, 'w') as f:
+            json.dump(results, f, indent=2)
+    if csv_file and results:
+        with open(csv_file, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(results[0]))
+            writer.writeheader()
+            writer.writerows(results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the username membership structures.")
+    parser.add_argument("data_files", nargs="+", help="username files, one dataset size each")
+    parser.add_argument("--structures", nargs="+", default=list(STRUCTURES), choices=list(STRUCTURES))
+    parser.add_argument("--queries", type=int, default=100_000, help="timed queries per repetition")
+    parser.add_argument("--hit-ratio", type=float, default=0.1, help="share of queries for taken names")
+    parser.add_argument("--warmup", type=int, default=1000, help="untimed queries before timing")
+    parser.add_argument("--repetitions", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="bench_results.json", help="JSON results file")
+    parser.add_argument("--csv", help="optional CSV results file")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.data_files, args.structures, args.queries, args.hit_ratio,
+                            args.warmup, args.repetitions, args.seed)
+    write_results(results, args.output, args.csv)
+    print(f"Wrote {len(results)} results to {args.output}")
@@ -1,94 +1,278 @@
-# Python 3 program to build Bloom Filter
-# Install mmh3 and bitarray 3rd party module first
-# pip install mmh3
-# pip install bitarray
-import math
-import mmh3
-from bitarray import bitarray
-
-
-class BloomFilter(object):
-
-    '''
-    Class for Bloom filter, using murmur3 hash function
-    '''
-
-    def __init__(self, items_count, fp_prob):
-        '''
-        items_count : int
-            Number of items expected to be stored in bloom filter
-        fp_prob : float
-            False Positive probability in decimal
-        '''
-        # False possible probability in decimal
-        self.fp_prob = fp_prob
-
-        # Size of bit array to use
-        self.size = self.get_size(items_count, fp_prob)
-
-        # number of hash functions to use
-        self.hash_count = self.get_hash_count(self.size, items_count)
-
-        # Bit array of given size
-        self.bit_array = bitarray(self.size)
-
-        # initialize all bits as 0
-        self.bit_array.setall(0)
-
-    def add(self, item):
-        '''
-        Add an item in the filter
-        '''
-        digests = []
-        for i in range(self.hash_count):
-
-            # create digest for given item.
-            # i work as seed to mmh3.hash() function
-            # With different seed, digest created is different
-            digest = mmh3.hash(item, i) % self.size
-            digests.append(digest)
-
-            # set the bit True in bit_array
-            self.bit_array[digest] = True
-
-    def check(self, item):
-        '''
-        Check for existence of an item in filter
-        '''
-        for i in range(self.hash_count):
-            digest = mmh3.hash(item, i) % self.size
-            if self.bit_array[digest] == False:
-
-                # if any of bit is False then,its not present
-                # in filter
-                # else there is probability that it exist
-                return False
-        return True
-
-    @classmethod
-    def get_size(self, n, p):
-        '''
-        Return the size of bit array(m) to used using following formula
-        m = -(n * lg(p)) / (lg(2)^2)
-        n : int
-            number of items expected to be stored in filter
-        p : float
-            False Positive probability in decimal
-        '''
-        m = -(n * math.log(p))/(math.log(2)**2)
-        return int(m)
-
-    @classmethod
-    def get_hash_count(self, m, n):
-        '''
-        Return the hash function(k) to be used using
-        following formula
-        k = (m/n) * lg(2)
-
-        m : int
-            size of bit array
-        n : int
-            number of items expected to be stored in filter
-        '''
-        k = (m/n) * math.log(2)
-        return int(k)
\ No newline at end of file
+# Python 3 program to build Bloom Filter
+# Install mmh3 and bitarray 3rd party module first
+# pip install mmh3
+# pip install bitarray
+# pip install numpy
+import math
+import os
+import numpy as np
+from bitarray import bitarray
+import filterfile
+from hashing import (Murmur3Hasher, blocked_positions, blocked_positions_many,
+                     double_hash_positions, double_hash_positions_many, saved_seed)
+
+
+class BloomFilter(object):
+
+    '''
+    Class for Bloom filter, using murmur3 hash function
+    '''
+
+    # filter kind recorded in saved files
+    kind = filterfile.KIND_BLOOM
+
+    def __init__(self, items_count, fp_prob, seed=0, hasher=None):
+        '''
+        items_count : int
+            Number of items expected to be stored in bloom filter
+        fp_prob : float
+            False Positive probability in decimal
+        seed : int
+            Seed of the hash function
+        hasher : object
+            Hasher from hashing.py, overrides seed (default murmur3)
+        '''
+        # Number of items the filter is sized for
+        self.items_count = items_count
+
+        # False possible probability in decimal
+        self.fp_prob = fp_prob
+
+        # one 128-bit hash per item, split into k positions by double hashing
+        self.hasher = hasher if hasher is not None else Murmur3Hasher(seed)
+
+        # Size of bit array to use
+        self.size = self.get_size(items_count, fp_prob)
+
+        # number of hash functions to use
+        self.hash_count = self.get_hash_count(self.size, items_count)
+
+        # Bit array of given size, padded to whole 64-bit words
+        # big-endian so bit i lives in byte i >> 3 at mask 0x80 >> (i & 7),
+        # which the batch methods rely on when viewing it as a uint8 array
+        self.bit_array = bitarray(-(-self.size // 64) * 64, endian='big')
+
+        # initialize all bits as 0
+        self.bit_array.setall(0)
+
+    def add(self, item):
+        '''
+        Add an item in the filter
+        '''
+        for digest in self._positions(item):
+
+            # set the bit True in bit_array
+            self.bit_array[digest] = True
+
+    def check(self, item):
+        '''
+        Check for existence of an item in filter
+        '''
+        for digest in self._positions(item):
+            if self.bit_array[digest] == False:
+
+                # if any of bit is False then,its not present
+                # in filter
+                # else there is probability that it exist
+                return False
+        return True
+
+    def add_many(self, items):
+        '''
+        Add a batch of items in the filter, setting all their bits
+        with one scatter over the bit array
+        '''
+        positions = self._positions_many(items)
+        if positions.size == 0:
+            return
+        bytes_view = np.frombuffer(self.bit_array, dtype=np.uint8)
+        masks = (0x80 >> (positions & 7)).astype(np.uint8)
+        np.bitwise_or.at(bytes_view, positions >> 3, masks)
+
+    def check_many(self, items):
+        '''
+        Check for existence of a batch of items in filter.
+        Returns a numpy bool array, one entry per item
+        '''
+        positions = self._positions_many(items)
+        bytes_view = np.frombuffer(self.bit_array, dtype=np.uint8)
+        bits = bytes_view[positions >> 3] & (0x80 >> (positions & 7)).astype(np.uint8)
+        return bits.astype(bool).all(axis=1)
+
+    def _positions(self, item):
+        '''
+        Return the hash_count bit positions of an item. The item is
+        hashed once and the positions derived by double hashing
+        '''
+        h1, h2 = self.hasher.hash_pair(item)
+        return double_hash_positions(h1, h2, self.hash_count, self.size)
+
+    def _positions_many(self, items):
+        '''
+        Return an (n, hash_count) uint64 array with the bit positions
+        of every item, hashing the whole batch in one pass
+        '''
+        h1, h2 = self.hasher.hash_pairs(items)
+        return double_hash_positions_many(h1, h2, self.hash_count, self.size)
+
+    def save(self, filename):
+        '''
+        Save the filter to filename in the binary filter format.
+        Raises ValueError if it uses a hasher other than murmur3, whose
+        identity the file cannot record
+        '''
+        header = filterfile.FilterHeader(
+            kind=self.kind, seed=saved_seed(self.hasher), size=self.size,
+            hash_count=self.hash_count, bucket_size=0, fingerprint_size=0,
+            count=self.items_count, fp_prob=self.fp_prob)
+        filterfile.write_filter(filename, header, self.bit_array)
+
+    @classmethod
+    def load(cls, filename, mode='r', verify=False):
+        '''
+        Open a filter saved with save(). The bit array is memory-mapped
+        from the file, so nothing is copied and it is ready at once.
+
+        mode : str
+            'r' read-only, 'r+' adds are written back to the file,
+            'c' adds stay private to this process
+        verify : bool
+            Check the payload checksum (reads the whole bit array)
+        '''
+        header, payload = filterfile.open_filter(filename, cls.kind, mode, verify)
+        bloom_filter = cls.__new__(cls)
+        bloom_filter.items_count = header.count
+        bloom_filter.fp_prob = header.fp_prob
+        bloom_filter.hasher = Murmur3Hasher(header.seed)
+        bloom_filter.size = header.size
+        bloom_filter.hash_count = header.hash_count
+        bloom_filter.bit_array = bitarray(buffer=payload, endian='big')
+        return bloom_filter
+
+    def to_shared_memory(self, name=None):
+        '''
+        Move the bit array into shared memory and return the name other
+        processes attach to with attach_shared(). This filter keeps
+        working on the shared pages, so its adds are seen at once by
+        every attached process. Call filterfile.unlink_shared(name) when
+        the pool is done with it.
+
+        name : str
+            Name of the shared filter (default: a new unique name)
+        '''
+        path = filterfile.shared_path(name)
+        self.save(path)
+        self.bit_array = type(self).load(path, mode='r+').bit_array
+        return os.path.basename(path)
+
+    @classmethod
+    def attach_shared(cls, name, readonly=True):
+        '''
+        Attach to a filter placed in shared memory by to_shared_memory().
+        Nothing is copied: every attached process maps the same pages.
+
+        readonly : bool
+            Map the bit array read-only (add() then raises TypeError)
+        '''
+        return cls.load(filterfile.shared_path(name), mode='r' if readonly else 'r+')
+
+    @classmethod
+    def get_size(self, n, p):
+        '''
+        Return the size of bit array(m) to used using following formula
+        m = -(n * lg(p)) / (lg(2)^2)
+        n : int
+            number of items expected to be stored in filter
+        p : float
+            False Positive probability in decimal
+        '''
+        m = -(n * math.log(p))/(math.log(2)**2)
+        return int(m)
+
+    @classmethod
+    def get_hash_count(self, m, n):
+        '''
+        Return the hash function(k) to be used using
+        following formula
+        k = (m/n) * lg(2)
+
+        m : int
+            size of bit array
+        n : int
+            number of items expected to be stored in filter
+        '''
+        k = (m/n) * math.log(2)
+        return int(k)
+
+class BlockedBloomFilter(BloomFilter):
+
+    '''
+    Cache-line blocked Bloom filter. One hash picks a 512-bit (64-byte)
+    block and all k bits of an item are set or tested inside that block,
+    so a lookup touches a single cache line instead of up to k of them.
+    Blocks fill unevenly, so the bit array is grown until the blocked
+    false positive rate meets fp_prob.
+    '''
+
+    # filter kind recorded in saved files
+    kind = filterfile.KIND_BLOCKED_BLOOM
+
+    # bits per block, one 64-byte cache line
+    block_bits = 512
+
+    @property
+    def num_blocks(self):
+        return self.size // self.block_bits
+
+    def _positions(self, item):
+        h1, h2 = self.hasher.hash_pair(item)
+        return blocked_positions(h1, h2, self.hash_count, self.num_blocks, self.block_bits)
+
+    def _positions_many(self, items):
+        h1, h2 = self.hasher.hash_pairs(items)
+        return blocked_positions_many(h1, h2, self.hash_count, self.num_blocks, self.block_bits)
+
+    @classmethod
+    def get_size(self, n, p):
+        '''
+        Return the size of bit array(m), a whole number of blocks.
+        Starts from the classic Bloom size and grows it by 2% steps
+        until get_false_positive_rate(m, n, k) <= p
+        n : int
+            number of items expected to be stored in filter
+        p : float
+            False Positive probability in decimal
+        '''
+        m = super().get_size(n, p)
+        while True:
+            m = -(-m // self.block_bits) * self.block_bits
+            k = self.get_hash_count(m, n)
+            if self.get_false_positive_rate(m, n, k) <= p:
+                return m
+            m = int(m * 1.02)
+
+    @classmethod
+    def get_false_positive_rate(self, m, n, k):
+        '''
+        Return the expected false positive rate of a blocked filter.
+        The number of items per block follows a Poisson distribution
+        with mean n * B / m (B = block_bits); a block holding i items
+        behaves like a classic Bloom filter of B bits:
+        fp = sum_i Poisson(i) * (1 - (1 - 1/B)^(k*i))^k
+        m : int
+            size of bit array
+        n : int
+            number of items expected to be stored in filter
+        k : int
+            number of hash functions
+        '''
+        B = self.block_bits
+        lam = n * B / m
+        fp = 0.0
+        # log-space Poisson terms avoid underflow of exp(-lam) for large lam
+        log_pmf = -lam
+        for i in range(int(lam + 10 * math.sqrt(lam) + 10)):
+            if i > 0:
+                log_pmf += math.log(lam) - math.log(i)
+            fp += math.exp(log_pmf) * (1 - (1 - 1/B) ** (k * i)) ** k
+        return fp
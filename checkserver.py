@@ -0,0 +1,425 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from collections import deque
+import numpy as np
+from journal import JournaledFilter
+from loginchecker import LoginChecker
+from shardedfilter import ShardedFilter
+from snapshots import SnapshotManager, filter_class
+from sortedindex import SortedIndex
+from suggest import SuggestionEngine
+from usernamesource import UsernameSource
+
+# Line protocol, one request per line, answered in order (requests may be pipelined):
+#   CHECK <name>     -> FREE | TAKEN
+#   REGISTER <name>  -> OK | TAKEN
+#   SUGGEST <name>   -> up to 5 available variants of name, separated by spaces
+#   STATS            -> one line of JSON with the checker and batcher counters
+# Anything else is answered with ERROR <message>.
+HOST = "127.0.0.1"
+PORT = 7878
+MAX_BATCH_SIZE = 1024
+MAX_WAIT = 0.001  # seconds a batch waits for more requests
+
+def open_filter_file(filename, journal=False, watch=None):
+    """
+    Opens a saved filter of any kind, copy-on-write so registrations stay in memory.
+    With journal=True registrations are also appended to a journal next to the file
+    and survive restarts. With watch=seconds the file is polled and a rebuilt filter
+    is swapped in without a restart. A directory is opened as a ShardedFilter, which
+    supports neither. Static kinds (fingerprint sets, xor filters) raise
+    filterfile.FilterFileError.
+    """
+    if os.path.isdir(filename):
+        if journal or watch:
+            raise ValueError(f"{filename} is a sharded filter directory, which cannot be journaled or watched")
+        return ShardedFilter.load(filename, mode='c')
+    cls = filter_class(filename)
+    if watch:
+        manager = SnapshotManager(filename)
+        manager.watch(watch)
+        return manager
+    if journal:
+        return JournaledFilter(cls, filename)
+    return cls.load(filename, mode='c')
+
+
+def open_exact_store(filename):
+    """
+    Opens the exact store: a sorted index (.idx) or a username file loaded into a set.
+    """
+    if filename.endswith(".idx"):
+        return SortedIndex(filename)
+    return set(UsernameSource(filename))
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent availability checks into batches for LoginChecker.is_available_many.
+
+    A batch is flushed once it holds max_batch_size names or its first request has waited
+    max_wait seconds, whichever comes first. Registrations and suggestion candidates go
+    through the same queue and run in their place in the batch, so a check queued before
+    a registration of the same name is answered as of before it, and the checker (which
+    is not thread-safe) is only ever used from the event loop.
+
+    Attributes:
+        checker (LoginChecker): The checker answering the batches.
+        max_batch_size (int): Maximum number of requests per batch.
+        max_wait (float): Maximum seconds a request waits for its batch to fill.
+        batches (int): Number of batches of checks answered.
+        batched (int): Number of names checked through batches.
+    """
+
+    def __init__(self, checker, max_batch_size=MAX_BATCH_SIZE, max_wait=MAX_WAIT):
+        self.checker = checker
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.batches = 0
+        self.batched = 0
+        self._queue = asyncio.Queue()
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def check(self, name):
+        """
+        Queues one name and returns True once its batch says it is free.
+        """
+        return await self._submit('check', name)
+
+    async def register(self, name):
+        """
+        Queues one registration and returns LoginChecker.register's answer once it ran.
+        """
+        return await self._submit('register', name)
+
+    async def check_candidates(self, names):
+        """
+        Queues a batch of one-off names (suggestion candidates), checked without the cache,
+        and returns the bool array of which are free.
+        """
+        return await self._submit('candidates', names)
+
+    async def _submit(self, op, arg):
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((op, arg, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            # Runs of checks between other requests are answered with one call each.
+            start = 0
+            while start < len(batch):
+                op, arg, future = batch[start]
+                if op == 'register':
+                    _answer(future, self.checker.register, arg)
+                elif op == 'candidates':
+                    _answer(future, self.checker.is_available_many, arg, cache=False)
+                else:
+                    end = start + 1
+                    while end < len(batch) and batch[end][0] == 'check':
+                        end += 1
+                    self._run_checks(batch[start:end])
+                    start = end
+                    continue
+                start += 1
+
+    def _run_checks(self, checks):
+        try:
+            free = self.checker.is_available_many([name for _, name, _ in checks])
+        except Exception as error:
+            for _, _, future in checks:
+                if not future.done():
+                    future.set_exception(error)
+            return
+        self.batches += 1
+        self.batched += len(checks)
+        for (_, _, future), is_free in zip(checks, free.tolist()):
+            if not future.done():
+                future.set_result(is_free)
+
+
+def _answer(future, method, *args, **kwargs):
+    """
+    Resolves future with method(*args, **kwargs), or with the exception it raised.
+    """
+    try:
+        result = method(*args, **kwargs)
+    except Exception as error:
+        if not future.done():
+            future.set_exception(error)
+        return
+    if not future.done():
+        future.set_result(result)
+
+
+class CheckServer:
+    """
+    Asyncio TCP server answering availability queries with the line protocol above.
+
+    Each connection reads requests as fast as they arrive and answers them in order, so
+    clients can pipeline; CHECK and REGISTER requests from all connections, and the
+    candidate batches of SUGGEST requests, share one MicroBatcher.
+
+    Attributes:
+        checker (LoginChecker): The checker answering requests.
+        batcher (MicroBatcher): Batches CHECK requests.
+        suggestions (SuggestionEngine): Answers SUGGEST requests.
+    """
+
+    def __init__(self, checker, max_batch_size=MAX_BATCH_SIZE, max_wait=MAX_WAIT):
+        self.checker = checker
+        self.batcher = MicroBatcher(checker, max_batch_size, max_wait)
+        self.suggestions = SuggestionEngine(checker)
+        self._server = None
+
+    async def start(self, host=HOST, port=PORT):
+        """
+        Starts listening; returns the bound (host, port).
+        """
+        self.batcher.start()
+        self._server = await asyncio.start_server(self._serve_connection, host, port)
+        return self._server.sockets[0].getsockname()[:2]
+
+    async def serve_forever(self):
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+        await self.batcher.stop()
+
+    async def _answer(self, line):
+        command, _, name = line.strip().partition(" ")
+        command = command.upper()
+        if command == "CHECK" and name:
+            return "FREE" if await self.batcher.check(name) else "TAKEN"
+        if command == "REGISTER" and name:
+            return "OK" if await self.batcher.register(name) else "TAKEN"
+        if command == "SUGGEST" and name:
+            return " ".join(await self.suggestions.suggest_async(name, self.batcher.check_candidates))
+        if command == "STATS":
+            stats = dict(self.checker.stats, batches=self.batcher.batches, batched=self.batcher.batched)
+            if isinstance(self.checker.front_filter, SnapshotManager):
+                stats['snapshot_generation'] = self.checker.front_filter.generation
+            return json.dumps(stats)
+        return f"ERROR unknown request {line.strip()!r}"
+
+    async def _serve_connection(self, reader, writer):
+        pending = asyncio.Queue()
+
+        async def write_answers():
+            while True:
+                answer = await pending.get()
+                if answer is None:
+                    break
+                try:
+                    writer.write((await answer + "\n").encode('utf-8'))
+                except Exception as error:
+                    writer.write(f"ERROR {error}\n".encode('utf-8'))
+                if pending.empty():
+                    await writer.drain()
+
+        writer_task = asyncio.get_running_loop().create_task(write_answers())
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                await pending.put(asyncio.ensure_future(self._answer(line.decode('utf-8'))))
+        finally:
+            await pending.put(None)
+            await writer_task
+            writer.close()
+
+
+class CheckClient:
+    """
+    Async client for CheckServer. Requests are pipelined on one connection: any number can
+    be in flight, and answers are matched to requests in order.
+    """
+
+    def __init__(self):
+        self._reader = None
+        self._writer = None
+        self._waiting = deque()
+        self._reader_task = None
+
+    async def connect(self, host=HOST, port=PORT):
+        self._reader, self._writer = await asyncio.open_connection(host, port)
+        self._reader_task = asyncio.get_running_loop().create_task(self._read_answers())
+        return self
+
+    async def close(self):
+        self._writer.close()
+        await self._writer.wait_closed()
+        await self._reader_task
+
+    async def _read_answers(self):
+        while True:
+            line = await self._reader.readline()
+            if not line:
+                break
+            self._waiting.popleft().set_result(line.decode('utf-8').rstrip("\n"))
+        for future in self._waiting:
+            future.set_exception(ConnectionError("Connection closed by the server"))
+
+    async def request(self, line):
+        """
+        Sends one raw request line and returns the answer line.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._waiting.append(future)
+        self._writer.write((line + "\n").encode('utf-8'))
+        await self._writer.drain()
+        return await future
+
+    async def is_available(self, name):
+        return await self.request(f"CHECK {name}") == "FREE"
+
+    async def register(self, name):
+        return await self.request(f"REGISTER {name}") == "OK"
+
+    async def suggest(self, name):
+        return (await self.request(f"SUGGEST {name}")).split()
+
+    async def stats(self):
+        return json.loads(await self.request("STATS"))
+
+
+def make_queries(data_file, count, hit_ratio, seed=0):
+    """
+    Returns count query names, a hit_ratio share of them taken from data_file (sampled from
+    its first million names) and the rest guaranteed absent.
+    """
+    rng = random.Random(seed)
+    taken = next(UsernameSource(data_file).batches(1_000_000), []) if data_file else []
+    queries = []
+    for i in range(count):
+        if taken and rng.random() < hit_ratio:
+            queries.append(rng.choice(taken))
+        else:
+            queries.append(f"~free~{seed}_{i}")
+    return queries
+
+
+async def run_load(queries, host=HOST, port=PORT, connections=8, pipeline=64):
+    """
+    Sends every query as a CHECK request over several connections, each keeping up to
+    'pipeline' requests in flight, and reports throughput and latency percentiles.
+
+    Returns:
+        dict: requests, seconds, requests_per_second and p50/p95/p99/max latency in ms.
+    """
+    clients = [await CheckClient().connect(host, port) for _ in range(connections)]
+    latencies = []
+
+    async def worker(client, names):
+        window = asyncio.Semaphore(pipeline)
+
+        async def one(name):
+            async with window:
+                start = time.perf_counter()
+                await client.is_available(name)
+                latencies.append(time.perf_counter() - start)
+
+        await asyncio.gather(*(one(name) for name in names))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(client, queries[i::connections]) for i, client in enumerate(clients)))
+    elapsed = time.perf_counter() - start
+    for client in clients:
+        await client.close()
+
+    ms = np.array(latencies) * 1000
+    return {
+        'requests': len(latencies),
+        'seconds': elapsed,
+        'requests_per_second': len(latencies) / elapsed if elapsed else 0.0,
+        'p50_ms': float(np.percentile(ms, 50)) if len(ms) else 0.0,
+        'p95_ms': float(np.percentile(ms, 95)) if len(ms) else 0.0,
+        'p99_ms': float(np.percentile(ms, 99)) if len(ms) else 0.0,
+        'max_ms': float(ms.max()) if len(ms) else 0.0,
+    }
+
+
+async def _serve(args):
+    start = time.time()
+    checker = LoginChecker(open_filter_file(args.filter, args.journal, args.watch), open_exact_store(args.store), cache_size=args.cache_size)
+    print(f"Loaded checker in {time.time() - start:.2f} seconds.")
+    server = CheckServer(checker, args.max_batch, args.max_wait_ms / 1000)
+    host, port = await server.start(args.host, args.port)
+    print(f"Serving availability checks on {host}:{port}")
+    await server.serve_forever()
+
+
+async def _bench(args):
+    queries = make_queries(args.data, args.requests, args.hit_ratio, args.seed)
+    report = await run_load(queries, args.host, args.port, args.connections, args.pipeline)
+    print(f"{report['requests']} requests in {report['seconds']:.2f} seconds: "
+          f"{report['requests_per_second']:.0f} requests/sec")
+    print(f"latency p50 {report['p50_ms']:.3f} ms, p95 {report['p95_ms']:.3f} ms, "
+          f"p99 {report['p99_ms']:.3f} ms, max {report['max_ms']:.3f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local username availability server and load generator.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve = commands.add_parser("serve", help="run the availability server")
+    serve.add_argument("--filter", required=True, help="saved filter file (any kind) or sharded filter directory")
+    serve.add_argument("--store", required=True, help="sorted index (.idx) or username file")
+    serve.add_argument("--journal", action="store_true",
+                       help="journal registrations next to the filter file so they survive restarts")
+    serve.add_argument("--watch", type=float, metavar="SECONDS",
+                       help="poll the filter file and swap in a rebuilt filter without restarting")
+    serve.add_argument("--cache-size", type=int, default=100_000, help="LRU cache entries")
+    serve.add_argument("--max-batch", type=int, default=MAX_BATCH_SIZE, help="maximum names per batch")
+    serve.add_argument("--max-wait-ms", type=float, default=MAX_WAIT * 1000, help="maximum batching delay")
+
+    bench = commands.add_parser("bench", help="run the load generator against a server")
+    bench.add_argument("--data", help="username file to sample taken names from")
+    bench.add_argument("--requests", type=int, default=100_000)
+    bench.add_argument("--hit-ratio", type=float, default=0.1, help="share of queries for taken names")
+    bench.add_argument("--connections", type=int, default=8)
+    bench.add_argument("--pipeline", type=int, default=64, help="requests in flight per connection")
+    bench.add_argument("--seed", type=int, default=0)
+
+    args = parser.parse_args()
+    if args.command == "serve" and args.journal and args.watch:
+        parser.error("--journal and --watch cannot be combined: a journal belongs to one snapshot")
+    if args.command == "serve" and (args.journal or args.watch) and os.path.isdir(args.filter):
+        parser.error("--journal and --watch need a filter file, not a sharded filter directory")
+    asyncio.run(_serve(args) if args.command == "serve" else _bench(args))
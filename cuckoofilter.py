@@ -1,190 +1,508 @@
-import random
-
-
-class CuckooFilter:
-    """
-    An implementation of a Cuckoo Filter.
-
-    Attributes:
-        capacity (int): Number of buckets in the filter.
-        bucket_size (int): Maximum number of fingerprints that each bucket can store.
-        fingerprint_size (int): Number of bits used for each fingerprint.
-        max_kicks (int): Maximum number of relocations (kicks) allowed during an insertion.
-        buckets (list): The filter's bucket array, where each bucket is a list that holds fingerprints.
-    """
-
-    def __init__(self, capacity=1024, bucket_size=4, fingerprint_size=8, max_kicks=500):
-        """
-        Initializes a new Cuckoo Filter.
-
-        Parameters:
-            capacity (int): Total number of buckets.
-            bucket_size (int): Maximum entries per bucket.
-            fingerprint_size (int): Fingerprint size in bits.
-            max_kicks (int): Maximum number of displacements allowed during insertion.
-        """
-        self.capacity = capacity
-        self.bucket_size = bucket_size
-        self.fingerprint_size = fingerprint_size
-        self.max_kicks = max_kicks
-        # Initialize each bucket as an empty list.
-        self.buckets = [[] for _ in range(self.capacity)]
-
-    def _fingerprint(self, item):
-        """
-        Generates a fingerprint for the given item.
-
-        Parameters:
-            item: The element (e.g., string) for which to generate the fingerprint.
-
-        Returns:
-            int: The fingerprint as an integer (non-zero).
-        """
-        fp = hash(item) & ((1 << self.fingerprint_size) - 1)
-        if fp == 0:
-            fp = 1  # Avoid a fingerprint of zero.
-        return fp
-
-    def _index1(self, item):
-        """
-        Computes the first bucket index for the given item.
-
-        Parameters:
-            item: The item for which to compute the bucket index.
-
-        Returns:
-            int: The index of the first candidate bucket.
-        """
-        return hash(item) % self.capacity
-
-    def _index2(self, index, fp):
-        """
-        Computes the second bucket index based on the first index and the fingerprint.
-
-        Parameters:
-            index (int): The first bucket index.
-            fp (int): The fingerprint of the item.
-
-        Returns:
-            int: The index of the second candidate bucket.
-        """
-        # Here, we use XOR of the first index with the hash of the fingerprint,
-        # then take modulo capacity.
-        return (index ^ hash(fp)) % self.capacity
-
-    def load_factor(self):
-        """
-        Computes the load factor of the Cuckoo Filter.
-
-        Returns:
-            float: The current load factor (0.0 - 1.0).
-        """
-        num_fingerprints = sum(len(bucket) for bucket in self.buckets)
-        total_capacity = self.capacity * self.bucket_size
-        return num_fingerprints / total_capacity
-
-    def insert(self, item):
-        """
-        Inserts an item into the Cuckoo Filter.
-
-        Parameters:
-            item: The item to be inserted.
-
-        Returns:
-            bool: True if the insertion is successful; False otherwise.
-        """
-        fp = self._fingerprint(item)
-        i1 = self._index1(item)
-        i2 = self._index2(i1, fp)
-
-        # Try inserting into the first bucket.
-        if len(self.buckets[i1]) < self.bucket_size:
-            self.buckets[i1].append(fp)
-            return True
-
-        # Try inserting into the second bucket.
-        if len(self.buckets[i2]) < self.bucket_size:
-            self.buckets[i2].append(fp)
-            return True
-
-        # Both candidate buckets are full; perform cuckoo kicking.
-        i = random.choice([i1, i2])
-        for _ in range(self.max_kicks):
-            # Randomly choose a fingerprint in bucket i to kick out.
-            j = random.randrange(len(self.buckets[i]))
-            kicked_fp = self.buckets[i][j]
-            self.buckets[i][j] = fp  # Place the new fingerprint here.
-            fp = kicked_fp  # Set the kicked fingerprint as the one to reinsert.
-            i = self._index2(i, fp)  # Compute the alternate bucket for the kicked fingerprint.
-            if len(self.buckets[i]) < self.bucket_size:
-                self.buckets[i].append(fp)
-                return True
-        # Insertion failed after maximum kicks.
-        return False
-
-    def contains(self, item):
-        """
-        Checks whether an item is possibly in the filter.
-
-        Parameters:
-            item: The item to search for.
-
-        Returns:
-            bool: True if the item might be in the filter (or is present), False if definitely not.
-        """
-        fp = self._fingerprint(item)
-        i1 = self._index1(item)
-        i2 = self._index2(i1, fp)
-        return fp in self.buckets[i1] or fp in self.buckets[i2]
-
-    def delete(self, item):
-        """
-        Deletes an item from the Cuckoo Filter.
-
-        Parameters:
-            item: The item to delete.
-
-        Returns:
-            bool: True if the item was found and deleted; False if not found.
-        """
-        fp = self._fingerprint(item)
-        i1 = self._index1(item)
-        i2 = self._index2(i1, fp)
-        if fp in self.buckets[i1]:
-            self.buckets[i1].remove(fp)
-            return True
-        if fp in self.buckets[i2]:
-            self.buckets[i2].remove(fp)
-            return True
-        return False
-
-
-# Example of how to use the CuckooFilter class:
-if __name__ == "__main__":
-    # Create a Cuckoo Filter instance with default parameters.
-    cf = CuckooFilter(capacity=1024, bucket_size=4, fingerprint_size=8, max_kicks=500)
-
-    # Insert some items.
-    items_to_insert = ["apple", "banana", "cherry", "date", "elderberry"]
-    for item in items_to_insert:
-        success = cf.insert(item)
-        print(f"Inserting '{item}': {'Success' if success else 'Failed'}")
-
-    # Search for items using the contains() method.
-    search_items = ["apple", "banana", "fig", "grape"]
-    for item in search_items:
-        if cf.contains(item):
-            print(f"'{item}' is possibly in the filter.")
-        else:
-            print(f"'{item}' is definitely not in the filter.")
-
-    # Delete an item and check again.
-    if cf.delete("banana"):
-        print("Deleted 'banana' successfully.")
-    else:
-        print("Failed to delete 'banana'.")
-
-    if cf.contains("banana"):
-        print("'banana' is still in the filter (or false positive).")
-    else:
-        print("'banana' has been removed from the filter.")
+import math
+import os
+import numpy as np
+import filterfile
+from hashing import (Murmur3Hasher, cuckoo_alt_index, cuckoo_alt_index_many,
+                     cuckoo_fingerprint, cuckoo_fingerprint_many, saved_seed)
+
+# Default load factor when sizing from an expected item count. Breadth-first eviction
+# reaches it reliably with 4-slot buckets.
+TARGET_LOAD = 0.95
+
+
+def fingerprint_dtype(fingerprint_size):
+    """
+    Returns the smallest unsigned integer dtype that holds a fingerprint.
+
+    Parameters:
+        fingerprint_size (int): Fingerprint size in bits.
+
+    Returns:
+        numpy.dtype: uint8, uint16 or uint32.
+    """
+    if not 1 <= fingerprint_size <= 32:
+        raise ValueError(f"fingerprint_size must be between 1 and 32 bits, got {fingerprint_size}")
+    if fingerprint_size <= 8:
+        return np.dtype(np.uint8)
+    if fingerprint_size <= 16:
+        return np.dtype(np.uint16)
+    return np.dtype(np.uint32)
+
+
+def capacity_for(expected_items, bucket_size=4, target_load=TARGET_LOAD):
+    """
+    Returns the number of buckets that holds expected_items at the target load factor.
+
+    Parameters:
+        expected_items (int): Number of items the filter must hold.
+        bucket_size (int): Slots per bucket.
+        target_load (float): Share of slots expected to be used (up to about 0.95 with 4-slot buckets).
+
+    Returns:
+        int: The number of buckets.
+    """
+    if not 0 < target_load <= 1:
+        raise ValueError(f"target_load must be in (0, 1], got {target_load}")
+    return max(1, math.ceil(expected_items / (bucket_size * target_load)))
+
+
+def false_positive_bound(fingerprint_size, bucket_size=4, load=TARGET_LOAD):
+    """
+    Returns the false positive bound of a cuckoo filter, 2 * bucket_size * load / 2**fingerprint_size:
+    a lookup compares against the fingerprints stored in two buckets.
+
+    Parameters:
+        fingerprint_size (int): Number of bits of each fingerprint.
+        bucket_size (int): Slots per bucket.
+        load (float): Share of slots in use.
+
+    Returns:
+        float: The bound, at most 1.
+    """
+    return min(1.0, 2 * bucket_size * load / 2 ** fingerprint_size)
+
+
+def fingerprint_size_for(fp_prob, bucket_size=4, target_load=TARGET_LOAD):
+    """
+    Returns the smallest fingerprint size whose false_positive_bound() at target_load
+    meets fp_prob.
+
+    Parameters:
+        fp_prob (float): Target false positive probability.
+        bucket_size (int): Slots per bucket.
+        target_load (float): Load factor the table is sized for.
+
+    Returns:
+        int: The fingerprint size in bits.
+    """
+    return max(1, math.ceil(math.log2(2 * bucket_size * target_load / fp_prob)))
+
+
+class CuckooFilter:
+    """
+    An implementation of a Cuckoo Filter.
+
+    Attributes:
+        capacity (int): Number of buckets in the filter.
+        bucket_size (int): Maximum number of fingerprints that each bucket can store.
+        fingerprint_size (int): Number of bits used for each fingerprint.
+        max_kicks (int): Maximum number of buckets the eviction search visits during an insertion.
+        hasher: Stable 128-bit hasher; each item is hashed once for its fingerprint and index.
+        buckets (numpy.ndarray): The filter's table of shape (capacity, bucket_size), holding
+            fingerprints in the smallest unsigned dtype that fits them; 0 marks an empty slot.
+    """
+
+    # Filter kind recorded in saved files.
+    kind = filterfile.KIND_CUCKOO
+
+    def __init__(self, capacity=1024, bucket_size=4, fingerprint_size=8, max_kicks=500, seed=0, hasher=None,
+                 expected_items=None, target_load=TARGET_LOAD):
+        """
+        Initializes a new Cuckoo Filter.
+
+        Parameters:
+            capacity (int): Total number of buckets, ignored when expected_items is given.
+            bucket_size (int): Maximum entries per bucket.
+            fingerprint_size (int): Fingerprint size in bits (1 to 32).
+            max_kicks (int): Maximum number of buckets visited by the eviction search.
+            seed (int): Seed of the hash function.
+            hasher: Hasher from hashing.py, overrides seed (default murmur3).
+            expected_items (int): Size the table for this many items at target_load.
+            target_load (float): Load factor used with expected_items.
+        """
+        if expected_items is not None:
+            capacity = capacity_for(expected_items, bucket_size, target_load)
+        self.capacity = capacity
+        self.bucket_size = bucket_size
+        self.fingerprint_size = fingerprint_size
+        self.max_kicks = max_kicks
+        self.hasher = hasher if hasher is not None else Murmur3Hasher(seed)
+        # One flat table for all buckets; a zero fingerprint marks an empty slot.
+        self.buckets = np.zeros((self.capacity, self.bucket_size), dtype=fingerprint_dtype(fingerprint_size))
+
+    def _fingerprint_and_index(self, item):
+        """
+        Hashes the item once and derives its fingerprint and first bucket index.
+
+        Parameters:
+            item: The element (e.g., string) to hash.
+
+        Returns:
+            tuple: The fingerprint (non-zero int) and the index of the first candidate bucket.
+        """
+        h1, h2 = self.hasher.hash_pair(item)
+        return cuckoo_fingerprint(h2, self.fingerprint_size), h1 % self.capacity
+
+    def _fingerprints_and_indices(self, items):
+        """
+        Vectorized _fingerprint_and_index over a batch of items.
+
+        Parameters:
+            items: An iterable of elements to hash.
+
+        Returns:
+            tuple: Fingerprints (in the table's dtype) and first bucket indices (uint64) as arrays.
+        """
+        h1, h2 = self.hasher.hash_pairs(items)
+        fps = cuckoo_fingerprint_many(h2, self.fingerprint_size).astype(self.buckets.dtype)
+        return fps, h1 % np.uint64(self.capacity)
+
+    def _index2(self, index, fp):
+        """
+        Computes the alternate bucket index based on an index and the fingerprint.
+
+        Parameters:
+            index (int): One of the two candidate bucket indices.
+            fp (int): The fingerprint of the item.
+
+        Returns:
+            int: The other candidate bucket index.
+        """
+        # The mapping is its own inverse, so it works from either candidate bucket
+        # and is stable across processes (unlike the built-in hash()).
+        return cuckoo_alt_index(index, fp, self.capacity)
+
+    def _put(self, index, fp):
+        """
+        Stores a fingerprint in the first empty slot of a bucket.
+
+        Parameters:
+            index (int): The bucket index.
+            fp (int): The fingerprint to store.
+
+        Returns:
+            bool: True if the bucket had a free slot; False if it is full.
+        """
+        bucket = self.buckets[index]
+        # tolist() keeps the per-slot scan in plain Python ints, which is much
+        # cheaper than numpy scalar access for a handful of slots.
+        slots = bucket.tolist()
+        if 0 in slots:
+            bucket[slots.index(0)] = fp
+            return True
+        return False
+
+    def load_factor(self):
+        """
+        Computes the load factor of the Cuckoo Filter.
+
+        Returns:
+            float: The current load factor (0.0 - 1.0).
+        """
+        num_fingerprints = np.count_nonzero(self.buckets)
+        total_capacity = self.capacity * self.bucket_size
+        return num_fingerprints / total_capacity
+
+    def insert(self, item):
+        """
+        Inserts an item into the Cuckoo Filter.
+
+        Parameters:
+            item: The item to be inserted.
+
+        Returns:
+            bool: True if the insertion is successful; False otherwise.
+        """
+        fp, i1 = self._fingerprint_and_index(item)
+        return self._insert_fingerprint(fp, i1)
+
+    def _insert_fingerprint(self, fp, i1):
+        """
+        Inserts an already hashed item given its fingerprint and first bucket index.
+
+        Parameters:
+            fp (int): The fingerprint of the item.
+            i1 (int): The index of its first candidate bucket.
+
+        Returns:
+            bool: True if the insertion is successful; False otherwise.
+        """
+        i2 = self._index2(i1, fp)
+
+        # Try inserting into the first bucket, then into the second one.
+        if self._put(i1, fp) or self._put(i2, fp):
+            return True
+
+        # Both candidate buckets are full; move fingerprints along the shortest path to a free slot.
+        start = self._eviction_path(i1, i2)
+        if start is None:
+            return False
+        self._put(start, fp)
+        return True
+
+    def _eviction_path(self, i1, i2):
+        """
+        Breadth-first search from the two full candidate buckets for the shortest chain of
+        displacements ending in a bucket with a free slot, visiting at most max_kicks buckets.
+        If one is found, the chain is applied: each fingerprint on it moves to its alternate
+        bucket, last one first, which frees a slot in the starting bucket.
+
+        Parameters:
+            i1 (int): The first candidate bucket of the item being inserted.
+            i2 (int): The second candidate bucket.
+
+        Returns:
+            int: The candidate bucket that now has a free slot, or None if the search failed.
+        """
+        parents = {i1: None, i2: None}  # bucket -> (bucket it is reached from, slot moved)
+        queue = [i1, i2]
+        for bucket in queue:
+            for slot, fp in enumerate(self.buckets[bucket].tolist()):
+                target = self._index2(bucket, fp)
+                if target in parents:
+                    continue
+                parents[target] = (bucket, slot)
+                if 0 in self.buckets[target].tolist():
+                    # Shift the chain back towards the candidate bucket, freeing one slot at each step.
+                    while parents[target] is not None:
+                        bucket, slot = parents[target]
+                        self._put(target, self.buckets[bucket, slot])
+                        self.buckets[bucket, slot] = 0
+                        target = bucket
+                    return target
+                if len(parents) >= self.max_kicks:
+                    return None
+                queue.append(target)
+        return None
+
+    def bulk_insert(self, items):
+        """
+        Inserts a batch of items. Keys are hashed at once and placed in bucket order:
+        first every key that fits its less contended candidate bucket, then every key that
+        fits its other bucket, both with one vectorized scatter, and only the rest with eviction.
+
+        Parameters:
+            items: An iterable of items to insert.
+
+        Returns:
+            int: The number of items that could not be inserted (0 when all were).
+        """
+        fps, indices = self._fingerprints_and_indices(items)
+        return self._insert_fingerprints(fps, indices)
+
+    def _preferred_indices(self, fps, indices):
+        """
+        Picks for each key of a batch whichever of its two buckets fewer keys of the batch
+        hash to, which spreads the batch evenly before any slot is taken.
+
+        Parameters:
+            fps (numpy.ndarray): Fingerprints in the table's dtype.
+            indices (numpy.ndarray): One candidate bucket index (uint64) of each fingerprint.
+
+        Returns:
+            numpy.ndarray: The preferred bucket index (uint64) of each fingerprint.
+        """
+        alt = cuckoo_alt_index_many(indices, fps, self.capacity)
+        rows, alt_rows = indices.astype(np.intp), alt.astype(np.intp)
+        demand = np.bincount(rows, minlength=self.capacity) + np.bincount(alt_rows, minlength=self.capacity)
+        return np.where(demand[rows] <= demand[alt_rows], indices, alt)
+
+    def _insert_fingerprints(self, fps, indices):
+        """
+        bulk_insert() for already hashed items.
+
+        Parameters:
+            fps (numpy.ndarray): Fingerprints in the table's dtype.
+            indices (numpy.ndarray): One candidate bucket index (uint64) of each fingerprint.
+
+        Returns:
+            int: The number of fingerprints that could not be inserted.
+        """
+        fps, indices = fill_first_choice(self.buckets, 0, fps, self._preferred_indices(fps, indices))
+        fps, indices = fill_first_choice(self.buckets, 0, fps, cuckoo_alt_index_many(indices, fps, self.capacity))
+        failed = 0
+        for fp, index in zip(fps.tolist(), indices.tolist()):
+            if not self._insert_fingerprint(fp, index):
+                failed += 1
+        return failed
+
+    def contains(self, item):
+        """
+        Checks whether an item is possibly in the filter.
+
+        Parameters:
+            item: The item to search for.
+
+        Returns:
+            bool: True if the item might be in the filter (or is present), False if definitely not.
+        """
+        fp, i1 = self._fingerprint_and_index(item)
+        if fp in self.buckets[i1].tolist():
+            return True
+        return fp in self.buckets[self._index2(i1, fp)].tolist()
+
+    def contains_many(self, items):
+        """
+        Checks a batch of items at once.
+
+        Parameters:
+            items: An iterable of items to search for.
+
+        Returns:
+            numpy.ndarray: A bool array, True where the item might be in the filter.
+        """
+        fps, i1 = self._fingerprints_and_indices(items)
+        i2 = cuckoo_alt_index_many(i1, fps, self.capacity)
+        fps = fps[:, None]
+        return (self.buckets[i1] == fps).any(axis=1) | (self.buckets[i2] == fps).any(axis=1)
+
+    def delete(self, item):
+        """
+        Deletes an item from the Cuckoo Filter.
+
+        Parameters:
+            item: The item to delete.
+
+        Returns:
+            bool: True if the item was found and deleted; False if not found.
+        """
+        fp, i1 = self._fingerprint_and_index(item)
+        for i in (i1, self._index2(i1, fp)):
+            slots = self.buckets[i].tolist()
+            if fp in slots:
+                self.buckets[i, slots.index(fp)] = 0
+                return True
+        return False
+
+    def save(self, filename):
+        """
+        Saves the filter to a file in the binary filter format.
+
+        Parameters:
+            filename (str): Path of the file to write.
+
+        Raises:
+            ValueError: If the filter uses a hasher other than murmur3, which files cannot record.
+        """
+        header = filterfile.FilterHeader(
+            kind=self.kind, seed=saved_seed(self.hasher), size=self.capacity,
+            hash_count=0, bucket_size=self.bucket_size, fingerprint_size=self.fingerprint_size,
+            count=int(np.count_nonzero(self.buckets)), fp_prob=0.0)
+        # Fingerprints are stored little-endian whatever the host byte order.
+        table = self.buckets.astype(self.buckets.dtype.newbyteorder('<'), copy=False)
+        filterfile.write_filter(filename, header, np.ascontiguousarray(table))
+
+    @classmethod
+    def load(cls, filename, mode='r', verify=False, max_kicks=500):
+        """
+        Opens a filter saved with save(). The table is memory-mapped from the file,
+        so nothing is copied and it is ready at once.
+
+        Parameters:
+            filename (str): Path of the file to open.
+            mode (str): 'r' read-only, 'r+' changes are written back to the file,
+                'c' changes stay private to this process.
+            verify (bool): Check the payload checksum (reads the whole table).
+            max_kicks (int): Maximum number of buckets visited by the eviction search.
+
+        Returns:
+            CuckooFilter: The loaded filter.
+        """
+        header, payload = filterfile.open_filter(filename, cls.kind, mode, verify)
+        cuckoo_filter = cls.__new__(cls)
+        cuckoo_filter.capacity = header.size
+        cuckoo_filter.bucket_size = header.bucket_size
+        cuckoo_filter.fingerprint_size = header.fingerprint_size
+        cuckoo_filter.max_kicks = max_kicks
+        cuckoo_filter.hasher = Murmur3Hasher(header.seed)
+        dtype = fingerprint_dtype(header.fingerprint_size).newbyteorder('<')
+        cuckoo_filter.buckets = np.frombuffer(payload, dtype=dtype).reshape(header.size, header.bucket_size)
+        return cuckoo_filter
+
+    def to_shared_memory(self, name=None):
+        """
+        Moves the table into shared memory. This filter keeps working on the shared pages,
+        so its inserts and deletes are seen at once by every process attached with
+        attach_shared(). Evictions copy a fingerprint to its new bucket before clearing the
+        old slot, so readers never miss a stored item while it moves. Call
+        filterfile.unlink_shared(name) when the pool is done with it.
+
+        Parameters:
+            name (str): Name of the shared filter (default: a new unique name).
+
+        Returns:
+            str: The name to pass to attach_shared().
+        """
+        path = filterfile.shared_path(name)
+        self.save(path)
+        self.buckets = type(self).load(path, mode='r+').buckets
+        return os.path.basename(path)
+
+    @classmethod
+    def attach_shared(cls, name, readonly=True, max_kicks=500):
+        """
+        Attaches to a filter placed in shared memory by to_shared_memory(). Nothing is
+        copied: every attached process maps the same pages.
+
+        Parameters:
+            name (str): Name of the shared filter.
+            readonly (bool): Map the table read-only (inserts then raise ValueError).
+            max_kicks (int): Maximum number of buckets visited by the eviction search.
+
+        Returns:
+            CuckooFilter: The attached filter.
+        """
+        return cls.load(filterfile.shared_path(name), mode='r' if readonly else 'r+', max_kicks=max_kicks)
+
+
+def fill_first_choice(buckets, first_bucket, fps, indices):
+    """
+    Places fingerprints in the given candidate bucket with one vectorized scatter, each
+    taking the next free slot of its bucket (keys are ordered by bucket first).
+
+    buckets may be a slice of a larger table starting at bucket first_bucket, so
+    disjoint bucket ranges can be filled independently.
+
+    Parameters:
+        buckets (numpy.ndarray): Table rows to fill, modified in place.
+        first_bucket (int): Bucket index of buckets[0].
+        fps (numpy.ndarray): Fingerprints to place.
+        indices (numpy.ndarray): Bucket index of each fingerprint, all within the slice.
+
+    Returns:
+        tuple: Fingerprints and bucket indices that did not fit, in bucket order.
+    """
+    order = np.argsort(indices, kind='stable')
+    fps, indices = fps[order], indices[order]
+    rows = (indices - np.uint64(first_bucket)).astype(np.intp)
+    # Rank of each key among the keys sharing its bucket.
+    rank = np.arange(len(rows)) - np.searchsorted(rows, rows, side='left')
+    # The key of rank r takes the (r + 1)-th free slot of its row, if the row has one.
+    free = buckets[rows] == 0
+    free_rank = np.where(free, np.cumsum(free, axis=1) - 1, -1)
+    matches = free_rank == rank[:, None]
+    fits = matches.any(axis=1)
+    slot = matches.argmax(axis=1)
+    buckets[rows[fits], slot[fits]] = fps[fits]
+    return fps[~fits], indices[~fits]
+
+
+# Example of how to use the CuckooFilter class:
+if __name__ == "__main__":
+    # Create a Cuckoo Filter instance with default parameters.
+    cf = CuckooFilter(capacity=1024, bucket_size=4, fingerprint_size=8, max_kicks=500)
+
+    # Insert some items.
+    items_to_insert = ["apple", "banana", "cherry", "date", "elderberry"]
+    for item in items_to_insert:
+        success = cf.insert(item)
+        print(f"Inserting '{item}': {'Success' if success else 'Failed'}")
+
+    # Search for items using the contains() method.
+    search_items = ["apple", "banana", "fig", "grape"]
+    for item in search_items:
+        if cf.contains(item):
+            print(f"'{item}' is possibly in the filter.")
+        else:
+            print(f"'{item}' is definitely not in the filter.")
+
+    # Delete an item and check again.
+    if cf.delete("banana"):
+        print("Deleted 'banana' successfully.")
+    else:
+        print("Failed to delete 'banana'.")
+
+    if cf.contains("banana"):
+        print("'banana' is still in the filter (or false positive).")
+    else:
+        print("'banana' has been removed from the filter.")
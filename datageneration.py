@@ -1,42 +1,173 @@
+import argparse
 import os
+import shutil
+import tempfile
 import time
-import bisect
-from faker import Faker
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 
-# File path to store the usernames
-DATA_FILE = "usernames_2.txt"
+# Usernames are composed from a vocabulary of Faker user names sampled once per seed:
+# username i is f"{vocabulary[choice]}_{i}", where the choice for every row of a shard is
+# drawn from that shard's own random stream. The "_i" suffix keeps every username unique,
+# and because shard streams depend only on (seed, shard number), a given --seed produces
+# the same file whatever the number of worker processes.
+# (Faker's samples can change between Faker releases, so pin it to reproduce old files.)
+VOCABULARY_SIZE = 50_000
+SHARD_SIZE = 1_000_000  # usernames per shard, the unit of work of a process
+WRITE_BUFFER = 1 << 24
 
-# Number of usernames to generate
-NUM_USERS = 5000000
+_vocabulary = None  # the vocabulary inside worker processes
 
-### Generate and save usernames
-def generate_usernames(num):
+
+def build_vocabulary(size=VOCABULARY_SIZE, seed=0):
     """
-    Generate 'num' unique usernames using Faker.
-    To ensure uniqueness, a counter is appended to each generated username.
-    Yields usernames one by one.
+    Samples 'size' Faker user names with a seeded Faker, keeping the distinct ones in order.
     """
+    from faker import Faker
+
     fake = Faker()
-    for i in range(num):
-        yield f"{fake.user_name()}_{i}"
+    fake.seed_instance(seed)
+    return list(dict.fromkeys(fake.user_name() for _ in range(size)))
+
+
+def _shard_rng(seed, shard):
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(shard,)))
+
+
+def _set_vocabulary(vocabulary):
+    global _vocabulary
+    _vocabulary = vocabulary
+
+
+def compose_usernames(vocabulary, start, stop, seed=0):
+    """
+    Returns usernames start..stop-1 of the dataset for this seed. [start, stop) must lie
+    within one shard.
+    """
+    shard = start // SHARD_SIZE
+    first = shard * SHARD_SIZE
+    choices = _shard_rng(seed, shard).integers(0, len(vocabulary), min(stop, first + SHARD_SIZE) - first)
+    return [f"{vocabulary[j]}_{i}" for i, j in zip(range(start, stop), choices[start - first:].tolist())]
+
+
+def _write_shard(task):
+    path, start, stop, seed = task
+    with open(path, 'wb') as f:
+        f.write(("\n".join(compose_usernames(_vocabulary, start, stop, seed)) + "\n").encode('utf-8'))
+    return stop - start
+
+
+def _shards(num, shard_size=SHARD_SIZE):
+    return [(start, min(start + shard_size, num)) for start in range(0, num, shard_size)]
 
-def save_usernames(filename, num):
+
+def generate_usernames(num, seed=0, vocabulary=None):
+    """
+    Generate 'num' unique usernames, reproducibly for a given seed.
+    Yields usernames one by one.
+    """
+    if vocabulary is None:
+        vocabulary = build_vocabulary(seed=seed)
+    for start, stop in _shards(num):
+        yield from compose_usernames(vocabulary, start, stop, seed)
+
+
+def save_usernames(filename, num, seed=0, workers=1, vocabulary=None):
     """
     Generate 'num' unique usernames and save them to the specified file,
-    one username per line.
+    one username per line. Shards are written by 'workers' processes to
+    temporary files and concatenated in order.
     """
     print(f"Generating and saving {num} usernames to {filename}...")
     start = time.time()
-    with open(filename, 'w', encoding='utf-8') as f:
-        for username in generate_usernames(num):
-            f.write(username + "\n")
+    if vocabulary is None:
+        vocabulary = build_vocabulary(seed=seed)
+    directory = os.path.dirname(os.path.abspath(filename))
+    with tempfile.TemporaryDirectory(dir=directory) as tmp:
+        tasks = [(os.path.join(tmp, f"shard_{k}.txt"), first, stop, seed)
+                 for k, (first, stop) in enumerate(_shards(num))]
+        if workers > 1:
+            with ProcessPoolExecutor(workers, initializer=_set_vocabulary, initargs=(vocabulary,)) as pool:
+                list(pool.map(_write_shard, tasks))
+        else:
+            _set_vocabulary(vocabulary)
+            for task in tasks:
+                _write_shard(task)
+
+        tmp_file = os.path.join(tmp, "usernames.txt")
+        with open(tmp_file, 'wb') as out:
+            for path, _, _, _ in tasks:
+                with open(path, 'rb') as shard:
+                    shutil.copyfileobj(shard, out, WRITE_BUFFER)
+                os.remove(path)
+        os.replace(tmp_file, filename)
     elapsed = time.time() - start
     print(f"Finished generating and saving usernames. Total time: {elapsed:.2f} seconds.")
 
 
-for i in range(4):
-    DATA_FILE = f'usernames_{i+1}M.txt'
-    NUM_USERS = int(i+1) * 1000000
-    if not os.path.exists(DATA_FILE):
-        print(f"Data file {DATA_FILE} not found. Generating dataset...")
-        save_usernames(DATA_FILE, NUM_USERS)
\ No newline at end of file
+def make_query_sets(num, hits, misses, seed=0, vocabulary=None):
+    """
+    Returns (hit names, miss names) for the dataset of 'num' usernames with this seed.
+    Hits are distinct usernames sampled from the dataset; misses look like real usernames
+    but carry a suffix >= num, so none of them is in the dataset.
+    """
+    if vocabulary is None:
+        vocabulary = build_vocabulary(seed=seed)
+    rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(2 ** 32,)))
+    wanted = np.sort(rng.choice(num, size=min(hits, num), replace=False))
+    hit_names = []
+    for first, stop in _shards(num):
+        rows = wanted[(wanted >= first) & (wanted < stop)] - first
+        if len(rows):
+            shard = compose_usernames(vocabulary, first, stop, seed)
+            hit_names.extend(shard[i] for i in rows.tolist())
+    order = rng.permutation(len(hit_names))
+    hit_names = [hit_names[i] for i in order.tolist()]
+    choices = rng.integers(0, len(vocabulary), misses)
+    miss_names = [f"{vocabulary[j]}_{num + i}" for i, j in enumerate(choices.tolist())]
+    return hit_names, miss_names
+
+
+def _save_lines(filename, names):
+    with open(filename, 'wb', buffering=WRITE_BUFFER) as f:
+        f.write(("\n".join(names) + "\n").encode('utf-8') if names else b"")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate reproducible username datasets.")
+    parser.add_argument("--size", type=int, nargs="+",
+                        help="usernames per dataset (default: the 1M-5M datasets, if missing)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="generator processes")
+    parser.add_argument("--output", help="output file (default: usernames_{size}M.txt or usernames_{size}.txt)")
+    parser.add_argument("--format", choices=['txt', 'idx'], default='txt',
+                        help="txt: one username per line; idx: also build a sorted index (sortedindex.py)")
+    parser.add_argument("--hits", type=int, default=0, help="taken names to write to <name>.hits.txt")
+    parser.add_argument("--misses", type=int, default=0, help="free names to write to <name>.misses.txt")
+    parser.add_argument("--force", action="store_true", help="regenerate existing files")
+    args = parser.parse_args()
+
+    sizes = args.size or [(i + 1) * 1000000 for i in range(5)]
+    vocabulary = None
+    for num in sizes:
+        if args.output and len(sizes) == 1:
+            data_file = args.output
+        else:
+            data_file = f"usernames_{num // 1000000}M.txt" if num % 1000000 == 0 else f"usernames_{num}.txt"
+        if vocabulary is None and (args.force or not os.path.exists(data_file) or args.hits or args.misses):
+            vocabulary = build_vocabulary(seed=args.seed)
+        if args.force or not os.path.exists(data_file):
+            print(f"Data file {data_file} not found. Generating dataset...")
+            save_usernames(data_file, num, args.seed, args.workers, vocabulary)
+        if args.format == 'idx':
+            from sortedindex import build_sorted_index
+
+            index_file = os.path.splitext(data_file)[0] + ".idx"
+            print(f"Building sorted index {index_file}...")
+            build_sorted_index(data_file, index_file)
+        if args.hits or args.misses:
+            hit_names, miss_names = make_query_sets(num, args.hits, args.misses, args.seed, vocabulary)
+            base = os.path.splitext(data_file)[0]
+            _save_lines(f"{base}.hits.txt", hit_names)
+            _save_lines(f"{base}.misses.txt", miss_names)
+            print(f"Wrote {len(hit_names)} hits to {base}.hits.txt and {len(miss_names)} misses to {base}.misses.txt")
@@ -1,76 +1,150 @@
+import argparse
 import time
-import pickle
-from bloomfilter import BloomFilter
-from cuckoofilter import CuckooFilter
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from bloomfilter import BloomFilter, BlockedBloomFilter
+from cuckoofilter import CuckooFilter, fill_first_choice, fingerprint_dtype
+from hashing import Murmur3Hasher, cuckoo_fingerprint_many
+from usernamesource import UsernameSource
+from xorfilter import XorFilter
 
 # DATA_FILE = "usernames_2.txt"
-# BLOOM_FILTER_FILE = "bloom_filter_2.pkl"
-# CUCKOO_FILTER_FILE = "cuckoo_filter_2.pkl"
-CHUNK_SIZE = 5_000_000
+# BLOOM_FILTER_FILE = "bloom_filter_2.bin"
+# CUCKOO_FILTER_FILE = "cuckoo_filter_2.bin"
+BATCH_SIZE = 1_000_000  # usernames hashed per vectorized batch
+FP_PROB = 0.01
+# At the cuckoo filter's default 95% load, 10-bit fingerprints give about the same false
+# positive rate (~0.75%) as the old 8-bit table sized at one bucket per username.
+CUCKOO_FINGERPRINT_SIZE = 10
 
-def load_usernames(filename):
+def _build_part(task):
     """
-    Load usernames from the specified file (one per line) and return them as a list.
+    Worker: build partial Bloom bit arrays over one byte range of the file and hash its usernames
+    for the cuckoo filter. Each filter hashes with the seed of its counterpart in the parent, so the
+    partial bit arrays and fingerprints line up with the filters they are merged into.
+    """
+    filename, start, end, num_users, capacity, bloom_seed, blocked_bloom_seed, cuckoo_seed = task
+    bloom_filter = BloomFilter(items_count=num_users, fp_prob=FP_PROB, seed=bloom_seed)
+    blocked_bloom_filter = BlockedBloomFilter(items_count=num_users, fp_prob=FP_PROB, seed=blocked_bloom_seed)
+    # Only the cuckoo hashes are needed here, not a table of its own
+    hasher = Murmur3Hasher(cuckoo_seed)
+    dtype = fingerprint_dtype(CUCKOO_FINGERPRINT_SIZE)
+
+    all_fps, all_indices = [], []
+    for batch in UsernameSource(filename).batches(BATCH_SIZE, start, end):
+        bloom_filter.add_many(batch)
+        blocked_bloom_filter.add_many(batch)
+        h1, h2 = hasher.hash_pairs(batch)
+        all_fps.append(cuckoo_fingerprint_many(h2, CUCKOO_FINGERPRINT_SIZE).astype(dtype))
+        all_indices.append(h1 % np.uint64(capacity))
+
+    fps = np.concatenate(all_fps) if all_fps else np.empty(0, dtype)
+    indices = np.concatenate(all_indices) if all_indices else np.empty(0, np.uint64)
+    return bloom_filter.bit_array.tobytes(), blocked_bloom_filter.bit_array.tobytes(), fps, indices
+
+def _fill_bucket_range(task):
+    """
+    Worker: place the keys whose preferred bucket lies in [first, last) into that range of the cuckoo table.
+    Bucket ranges are disjoint, so workers never write the same rows.
+    """
+    first, last, bucket_size, dtype, fps, indices = task
+    buckets = np.zeros((last - first, bucket_size), dtype=dtype)
+    left_fps, left_indices = fill_first_choice(buckets, first, fps, indices)
+    return buckets, left_fps, left_indices
+
+def initialize_filters(DATA_FILE, BLOOM_FILTER_FILE, CUCKOO_FILTER_FILE, BLOCKED_BLOOM_FILTER_FILE, workers=1,
+                       XOR_FILTER_FILE=None):
+    """
+    Initialize BloomFilter, CuckooFilter & BlockedBloomFilter, and store them efficiently.
+    With workers > 1 the file is split into byte ranges built in a process pool: partial Bloom
+    bit arrays are ORed together, and the cuckoo table is filled per bucket range.
+    The static XorFilter is built from the same username stream when XOR_FILTER_FILE is given.
     """
-    print(f"Loading usernames from file {filename}...")
-    start = time.time()
-    usernames = []
-    with open(filename, 'r', encoding='utf-8') as f:
-        for line in f:
-            usernames.append(line.strip())
-    elapsed = time.time() - start
-    print(f"Loaded {len(usernames)} usernames in {elapsed:.2f} seconds.")
-    return usernames
-
-def initialize_filters(DATA_FILE, BLOOM_FILTER_FILE, CUCKOO_FILTER_FILE):
-    """Initialize BloomFilter & CuckooFilter, and store them efficiently."""
     print("\n[Initializing Filters...]")
 
-    usernames = load_usernames(DATA_FILE)
+    source = UsernameSource(DATA_FILE)
+    num_users = source.count()
+    print(f"Counted {num_users} usernames in {DATA_FILE}.")
 
-    bloom_filter = BloomFilter(items_count=len(usernames), fp_prob=0.01)
-    cuckoo_filter = CuckooFilter(capacity=len(usernames))
+    bloom_filter = BloomFilter(items_count=num_users, fp_prob=FP_PROB)
+    cuckoo_filter = CuckooFilter(expected_items=num_users, fingerprint_size=CUCKOO_FINGERPRINT_SIZE)
+    blocked_bloom_filter = BlockedBloomFilter(items_count=num_users, fp_prob=FP_PROB)
 
     start = time.time()
-    chunk_counter = 0
+    ranges = source.split(workers)
+    bucket_bounds = [cuckoo_filter.capacity * i // workers for i in range(workers + 1)]
+    pool = ProcessPoolExecutor(workers) if workers > 1 else None
+    mapper = pool.map if pool else map
+    try:
+        # Phase 1: one task per byte range
+        tasks = [(DATA_FILE, first, last, num_users, cuckoo_filter.capacity, bloom_filter.hasher.seed,
+                  blocked_bloom_filter.hasher.seed, cuckoo_filter.hasher.seed)
+                 for first, last in ranges]
+        parts = list(mapper(_build_part, tasks))
 
-    with open(DATA_FILE, 'r', encoding='utf-8') as f:
-        while True:
-            chunk = [f.readline().strip() for _ in range(CHUNK_SIZE)]
-            if not chunk[0]:
-                break
+        bloom_bits = np.frombuffer(bloom_filter.bit_array, dtype=np.uint8)
+        blocked_bloom_bits = np.frombuffer(blocked_bloom_filter.bit_array, dtype=np.uint8)
+        for part_bloom, part_blocked_bloom, _, _ in parts:
+            np.bitwise_or(bloom_bits, np.frombuffer(part_bloom, dtype=np.uint8), out=bloom_bits)
+            np.bitwise_or(blocked_bloom_bits, np.frombuffer(part_blocked_bloom, dtype=np.uint8), out=blocked_bloom_bits)
 
-            for username in chunk:
-                bloom_filter.add(username)
-                cuckoo_filter.insert(username)
+        # Phase 2: each key goes to the less contended of its two buckets, one task per bucket range
+        fps = np.concatenate([part[2] for part in parts])
+        indices = cuckoo_filter._preferred_indices(fps, np.concatenate([part[3] for part in parts]))
+        del parts
+        order = np.argsort(indices, kind='stable')
+        fps, indices = fps[order], indices[order]
+        cuts = np.searchsorted(indices, np.asarray(bucket_bounds[1:-1], dtype=np.uint64))
+        tasks = [(bucket_bounds[w], bucket_bounds[w + 1], cuckoo_filter.bucket_size, cuckoo_filter.buckets.dtype,
+                  range_fps, range_indices)
+                 for w, (range_fps, range_indices) in enumerate(zip(np.split(fps, cuts), np.split(indices, cuts)))]
+        leftovers = []
+        for w, (rows, left_fps, left_indices) in enumerate(mapper(_fill_bucket_range, tasks)):
+            cuckoo_filter.buckets[bucket_bounds[w]:bucket_bounds[w + 1]] = rows
+            leftovers.append((left_fps, left_indices))
+    finally:
+        if pool:
+            pool.shutdown()
 
-            chunk_counter += 1
-            print(f"Processed chunk {chunk_counter}...")
+    # Keys whose first bucket was full go to their second bucket or need eviction,
+    # which may cross bucket ranges
+    failed = cuckoo_filter._insert_fingerprints(np.concatenate([fps for fps, _ in leftovers]),
+                                                np.concatenate([indices for _, indices in leftovers]))
 
     time_insert = time.time() - start
     print(f"Insert time : {time_insert:.2f} seconds.")
 
-    print(f"The load factor is:{cuckoo_filter.load_factor():.2%}")
+    xor_filter = None
+    if XOR_FILTER_FILE:
+        start = time.time()
+        xor_filter = XorFilter.from_file(DATA_FILE)
+        print(f"Xor filter build time : {time.time() - start:.2f} seconds, {xor_filter.bits_per_key():.2f} bits per key.")
 
-    # Chunked Storage in Bloom Filter
-    with open(BLOOM_FILTER_FILE, "wb") as bf_file:
-        for i in range(0, len(bloom_filter.bit_array), CHUNK_SIZE):
-            chunk = bloom_filter.bit_array[i:i + CHUNK_SIZE]
-            pickle.dump(chunk, bf_file)
-            print(f"Saved BloomFilter chunk {i // CHUNK_SIZE + 1}")
+    print(f"The load factor is:{cuckoo_filter.load_factor():.2%}")
+    if failed:
+        print(f"Warning: {failed} usernames could not be inserted into the CuckooFilter.")
 
-    # Chunked Storage in Cuckoo Filter
-    with open(CUCKOO_FILTER_FILE, "wb") as cf_file:
-        for i in range(0, len(cuckoo_filter.buckets), CHUNK_SIZE):
-            chunk = cuckoo_filter.buckets[i:i + CHUNK_SIZE]
-            pickle.dump(chunk, cf_file)
-            print(f"Saved CuckooFilter chunk {i // CHUNK_SIZE + 1}")
+    start = time.time()
+    bloom_filter.save(BLOOM_FILTER_FILE)
+    cuckoo_filter.save(CUCKOO_FILTER_FILE)
+    blocked_bloom_filter.save(BLOCKED_BLOOM_FILTER_FILE)
+    if xor_filter is not None:
+        xor_filter.save(XOR_FILTER_FILE)
+    time_save = time.time() - start
+    print(f"Save time : {time_save:.2f} seconds.")
 
     print("Filters saved efficiently!")
 
 if __name__ == "__main__":
-    for i in range(4):
+    parser = argparse.ArgumentParser(description="Build and save the username filters.")
+    parser.add_argument("--workers", type=int, default=1, help="number of build processes (default: 1)")
+    args = parser.parse_args()
+
+    for i in range(5):
         DATA_FILE = f"usernames_{i+1}M.txt"
-        BLOOM_FILTER_FILE = f"bloom_filter_{i+1}M.pkl"
-        CUCKOO_FILTER_FILE = f"cuckoo_filter_{i+1}M.pkl"
-        initialize_filters(DATA_FILE, BLOOM_FILTER_FILE, CUCKOO_FILTER_FILE)
+        BLOOM_FILTER_FILE = f"bloom_filter_{i+1}M.bin"
+        CUCKOO_FILTER_FILE = f"cuckoo_filter_{i+1}M.bin"
+        BLOCKED_BLOOM_FILTER_FILE = f"blocked_bloom_filter_{i+1}M.bin"
+        XOR_FILTER_FILE = f"xor_filter_{i+1}M.bin"
+        initialize_filters(DATA_FILE, BLOOM_FILTER_FILE, CUCKOO_FILTER_FILE, BLOCKED_BLOOM_FILTER_FILE, args.workers,
+                           XOR_FILTER_FILE)
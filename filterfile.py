@@ -0,0 +1,149 @@
+# Versioned binary file format shared by the persisted filters.
+#
+# A filter file is a fixed 64-byte little-endian header followed by the raw
+# payload (the Bloom bit array or the cuckoo fingerprint table). Files are
+# opened with mmap, so loading costs no copy and every process that opens
+# the same file shares its pages through the page cache.
+#
+# Shared filters are filter files in a memory-backed directory: the owner
+# maps one writable and shared ('r+'), worker processes map it read-only,
+# and every store the owner makes is visible to the workers at once.
+import mmap
+import os
+import secrets
+import struct
+import tempfile
+import zlib
+from collections import namedtuple
+
+MAGIC = b'LCFILTER'
+VERSION = 1
+
+# Filter kinds stored in the header
+KIND_BLOOM = 1
+KIND_CUCKOO = 2
+KIND_BLOCKED_BLOOM = 3
+KIND_FINGERPRINTS = 4
+KIND_XOR = 5
+
+# magic, version, kind, seed, size, hash_count, bucket_size,
+# fingerprint_size, count, payload_length, checksum, fp_prob
+HEADER = struct.Struct('<8sHHIQIIIQQId')
+HEADER_SIZE = 64
+
+FilterHeader = namedtuple('FilterHeader', [
+    'kind',              # one of the KIND_* constants
+    'seed',              # seed of the hash function
+    'size',              # bits of a Bloom filter, buckets of a cuckoo filter, hashes of a fingerprint set
+    'hash_count',        # probes per key (Bloom k, 3 for xor, 0 for cuckoo)
+    'bucket_size',       # cuckoo slots per bucket (0 for Bloom)
+    'fingerprint_size',  # cuckoo / xor fingerprint width in bits (0 for Bloom)
+    'count',             # items the filter was sized for / stores
+    'fp_prob',           # configured false positive probability (0 if unknown)
+])
+
+# Directory of shared filters: tmpfs where available, so they never touch a disk
+SHARED_DIR = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+
+# mmap access used for each open mode
+ACCESS_MODES = {
+    'r': mmap.ACCESS_READ,    # shared, read-only
+    'r+': mmap.ACCESS_WRITE,  # shared, changes are written back to the file
+    'c': mmap.ACCESS_COPY,    # private copy-on-write, the file is never changed
+}
+
+
+class FilterFileError(ValueError):
+    '''
+    Raised when a file is not a valid filter file of the expected kind
+    '''
+
+
+def pack_header(header, payload_length, checksum):
+    '''
+    Return the 64-byte encoded header
+    '''
+    packed = HEADER.pack(MAGIC, VERSION, header.kind, header.seed, header.size,
+                         header.hash_count, header.bucket_size, header.fingerprint_size,
+                         header.count, payload_length, checksum, header.fp_prob)
+    return packed.ljust(HEADER_SIZE, b'\0')
+
+
+def unpack_header(buffer):
+    '''
+    Decode the header at the start of buffer.
+    Returns (FilterHeader, payload_length, checksum)
+    '''
+    if len(buffer) < HEADER_SIZE:
+        raise FilterFileError("File is too short to hold a filter header")
+    (magic, version, kind, seed, size, hash_count, bucket_size, fingerprint_size,
+     count, payload_length, checksum, fp_prob) = HEADER.unpack_from(buffer)
+    if magic != MAGIC:
+        raise FilterFileError("Not a filter file (bad magic)")
+    if version != VERSION:
+        raise FilterFileError(f"Unsupported filter file version {version}")
+    header = FilterHeader(kind, seed, size, hash_count, bucket_size,
+                          fingerprint_size, count, fp_prob)
+    return header, payload_length, checksum
+
+
+def write_filter(filename, header, payload):
+    '''
+    Write header and payload (any contiguous buffer) to filename.
+    The file is written under a temporary name and renamed into place,
+    so readers never observe a half-written filter.
+    '''
+    payload = memoryview(payload).cast('B')
+    tmp_name = f"{filename}.tmp"
+    with open(tmp_name, 'wb') as f:
+        f.write(pack_header(header, len(payload), zlib.crc32(payload)))
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_name, filename)
+
+
+def open_filter(filename, kind, mode='r', verify=False):
+    '''
+    Map a filter file and return (FilterHeader, payload memoryview).
+
+    kind : int
+        Expected KIND_* of the file
+    mode : str
+        'r' read-only, 'r+' writable (written back), 'c' copy-on-write
+    verify : bool
+        Check the payload checksum, which reads the whole payload once
+    '''
+    try:
+        access = ACCESS_MODES[mode]
+    except KeyError:
+        raise ValueError(f"Unknown mode {mode!r}, expected one of {sorted(ACCESS_MODES)}")
+    with open(filename, 'r+b' if mode == 'r+' else 'rb') as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=access)
+    header, payload_length, checksum = unpack_header(mapped)
+    if header.kind != kind:
+        raise FilterFileError(f"{filename} holds filter kind {header.kind}, expected {kind}")
+    if len(mapped) < HEADER_SIZE + payload_length:
+        raise FilterFileError(f"{filename} is truncated")
+    payload = memoryview(mapped)[HEADER_SIZE:HEADER_SIZE + payload_length]
+    if verify and zlib.crc32(payload) != checksum:
+        raise FilterFileError(f"{filename} failed its checksum")
+    return header, payload
+
+
+def shared_path(name=None):
+    '''
+    Return the path of the shared filter called name
+    (a new unique name if name is None)
+    '''
+    if name is None:
+        name = f"lcfilter_{os.getpid()}_{secrets.token_hex(8)}.bin"
+    return os.path.join(SHARED_DIR, name)
+
+
+def unlink_shared(name):
+    '''
+    Remove a shared filter. Processes that attached to it keep their
+    mapping; the memory is freed once the last one exits.
+    '''
+    os.remove(shared_path(name))
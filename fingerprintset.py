@@ -0,0 +1,160 @@
+import argparse
+import time
+from bisect import bisect_left
+import numpy as np
+import filterfile
+from hashing import Murmur3Hasher, saved_seed
+from usernamesource import UsernameSource
+
+# Exact membership with a negligible error rate: each username is reduced to a stable
+# 64-bit hash (the first half of its murmur3 x64_128 hash), and the distinct hashes are
+# kept in one sorted uint64 array. A lookup is a binary search over 8 bytes per user,
+# against roughly 100 bytes per user for a Python set of str. A name that is not stored
+# is reported present only if its hash collides with one of the n stored hashes, which
+# happens with probability about n / 2**64 (3e-13 for 5M users).
+BATCH_SIZE = 1_000_000
+
+
+class FingerprintSet:
+    """
+    Sorted array of 64-bit username hashes.
+
+    Attributes:
+        hasher: Stable 128-bit hasher; the first 64 bits of each hash are stored.
+        hashes (numpy.ndarray): The distinct hashes, sorted, as a uint64 array.
+    """
+
+    # Filter kind recorded in saved files.
+    kind = filterfile.KIND_FINGERPRINTS
+
+    def __init__(self, items=(), seed=0, hasher=None):
+        """
+        Builds the set from an iterable of usernames.
+
+        Parameters:
+            items: An iterable of usernames.
+            seed (int): Seed of the hash function.
+            hasher: Hasher from hashing.py, overrides seed (default murmur3).
+        """
+        self.hasher = hasher if hasher is not None else Murmur3Hasher(seed)
+        items = list(items)
+        self._set_hashes(self._unique_hashes(items[i:i + BATCH_SIZE] for i in range(0, len(items), BATCH_SIZE)))
+
+    @classmethod
+    def from_file(cls, data_file, seed=0, hasher=None):
+        """
+        Builds the set from a username file, hashing it one batch at a time.
+
+        Parameters:
+            data_file (str): Username file, one username per line.
+            seed (int): Seed of the hash function.
+            hasher: Hasher from hashing.py, overrides seed (default murmur3).
+
+        Returns:
+            FingerprintSet: The new set.
+        """
+        fingerprint_set = cls(seed=seed, hasher=hasher)
+        fingerprint_set._set_hashes(fingerprint_set._unique_hashes(UsernameSource(data_file).batches(BATCH_SIZE)))
+        return fingerprint_set
+
+    def _unique_hashes(self, batches):
+        parts = [self.hasher.hash_pairs(batch)[0] for batch in batches if batch]
+        return np.unique(np.concatenate(parts)) if parts else np.empty(0, dtype=np.uint64)
+
+    def _set_hashes(self, hashes):
+        self.hashes = hashes
+        # Scalar lookups bisect a plain memoryview, which returns Python ints much faster
+        # than numpy scalar indexing.
+        self._view = memoryview(hashes).cast('B').cast('Q')
+
+    def __len__(self):
+        return len(self.hashes)
+
+    def __contains__(self, name):
+        return self.contains(name)
+
+    def contains(self, name):
+        """
+        Checks whether a username is in the set.
+
+        Parameters:
+            name (str): The username to search for.
+
+        Returns:
+            bool: True if the username is present (or, with probability about n / 2**64,
+                collides with one that is), False otherwise.
+        """
+        h = self.hasher.hash_pair(name)[0]
+        i = bisect_left(self._view, h)
+        return i < len(self._view) and self._view[i] == h
+
+    def contains_many(self, names):
+        """
+        Checks a batch of usernames with one vectorized search.
+
+        Parameters:
+            names: An iterable of usernames.
+
+        Returns:
+            numpy.ndarray: A bool array, True where the username is present.
+        """
+        h = self.hasher.hash_pairs(names)[0]
+        i = np.searchsorted(self.hashes, h)
+        found = i < len(self.hashes)
+        found[found] = self.hashes[i[found]] == h[found]
+        return found
+
+    def false_positive_rate(self):
+        """
+        Returns the probability that an absent username collides with a stored hash.
+        """
+        return len(self.hashes) / 2.0 ** 64
+
+    def save(self, filename):
+        """
+        Saves the set to a file in the binary filter format (a raw little-endian uint64 array).
+
+        Parameters:
+            filename (str): Path of the file to write.
+
+        Raises:
+            ValueError: If the set uses a hasher other than murmur3, which files cannot record.
+        """
+        header = filterfile.FilterHeader(
+            kind=self.kind, seed=saved_seed(self.hasher), size=len(self.hashes), hash_count=1,
+            bucket_size=0, fingerprint_size=64, count=len(self.hashes), fp_prob=self.false_positive_rate())
+        filterfile.write_filter(filename, header, np.ascontiguousarray(self.hashes.astype('<u8', copy=False)))
+
+    @classmethod
+    def load(cls, filename, mode='r', verify=False):
+        """
+        Opens a set saved with save(). The array is memory-mapped from the file,
+        so nothing is copied and it is ready at once.
+
+        Parameters:
+            filename (str): Path of the file to open.
+            mode (str): 'r' read-only or 'c' private copy-on-write.
+            verify (bool): Check the payload checksum (reads the whole array).
+
+        Returns:
+            FingerprintSet: The loaded set.
+        """
+        header, payload = filterfile.open_filter(filename, cls.kind, mode, verify)
+        fingerprint_set = cls.__new__(cls)
+        fingerprint_set.hasher = Murmur3Hasher(header.seed)
+        fingerprint_set._set_hashes(np.frombuffer(payload, dtype='<u8', count=header.size))
+        return fingerprint_set
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build a sorted 64-bit username fingerprint set.")
+    parser.add_argument("data_file", help="username file, one username per line")
+    parser.add_argument("set_file", help="fingerprint set file to write")
+    args = parser.parse_args()
+
+    print(f"Building fingerprint set {args.set_file} from {args.data_file}...")
+    start = time.time()
+    fingerprint_set = FingerprintSet.from_file(args.data_file)
+    fingerprint_set.save(args.set_file)
+    print(f"Stored {len(fingerprint_set)} hashes ({fingerprint_set.hashes.nbytes / 2**20:.1f} MB) "
+          f"in {time.time() - start:.2f} seconds.")
@@ -0,0 +1,183 @@
+import argparse
+import time
+import numpy as np
+from benchmark import write_results
+from bloomfilter import BloomFilter, BlockedBloomFilter
+from cuckoofilter import CuckooFilter, false_positive_bound
+from usernamesource import UsernameSource
+from xorfilter import XorFilter
+
+# Empirical false positive rate and space measurement.
+#
+# Each configuration is built over a dataset and probed with names that are guaranteed
+# absent (no generated username contains a '~'), so every positive is a false positive.
+# The observed rate is reported next to the configured / analytic target, together with
+# the bits paid per stored key, the cuckoo load factor and failed insertions.
+BATCH_SIZE = 1_000_000
+
+
+def _absent_names(count, start=0):
+    """
+    Yields batches of guaranteed-absent probe names.
+    """
+    for first in range(start, start + count, BATCH_SIZE):
+        yield [f"~absent~{i}" for i in range(first, min(first + BATCH_SIZE, start + count))]
+
+
+def _observed_fp(check_many, probes):
+    positives = 0
+    for batch in _absent_names(probes):
+        positives += int(np.count_nonzero(check_many(batch)))
+    return positives / probes if probes else 0.0
+
+
+def _load_names(data_file, limit=None):
+    names = []
+    for batch in UsernameSource(data_file).batches(BATCH_SIZE):
+        names.extend(batch)
+        if limit and len(names) >= limit:
+            del names[limit:]
+            break
+    return names
+
+
+def _bits_per_key(memory_bytes, names):
+    return memory_bytes * 8 / len(names) if names else 0.0
+
+
+def measure_bloom(cls, names, fp_prob, probes):
+    """
+    Builds a BloomFilter (or subclass) over names and measures its false positive rate.
+
+    Returns:
+        dict: One result row.
+    """
+    start = time.perf_counter()
+    bloom_filter = cls(items_count=max(len(names), 1), fp_prob=fp_prob)
+    for first in range(0, len(names), BATCH_SIZE):
+        bloom_filter.add_many(names[first:first + BATCH_SIZE])
+    build_seconds = time.perf_counter() - start
+    memory_bytes = len(bloom_filter.bit_array) // 8
+    return {
+        'structure': 'blocked_bloom' if cls is BlockedBloomFilter else 'bloom',
+        'items': len(names),
+        'params': f"fp_prob={fp_prob}, size={bloom_filter.size}, hash_count={bloom_filter.hash_count}",
+        'target_fp': fp_prob,
+        'observed_fp': _observed_fp(bloom_filter.check_many, probes),
+        'probes': probes,
+        'memory_bytes': memory_bytes,
+        'bits_per_key': _bits_per_key(memory_bytes, names),
+        'fill_ratio': bloom_filter.bit_array.count() / bloom_filter.size,
+        'load_factor': None,
+        'failures': 0,
+        'build_seconds': build_seconds,
+    }
+
+
+def measure_cuckoo(names, bucket_size, fingerprint_size, target_load, probes):
+    """
+    Builds a CuckooFilter sized for target_load over names and measures its false positive rate.
+
+    Returns:
+        dict: One result row.
+    """
+    start = time.perf_counter()
+    cuckoo_filter = CuckooFilter(bucket_size=bucket_size, fingerprint_size=fingerprint_size,
+                                 expected_items=len(names), target_load=target_load)
+    capacity = cuckoo_filter.capacity
+    failures = 0
+    for first in range(0, len(names), BATCH_SIZE):
+        failures += cuckoo_filter.bulk_insert(names[first:first + BATCH_SIZE])
+    build_seconds = time.perf_counter() - start
+    memory_bytes = cuckoo_filter.buckets.nbytes
+    return {
+        'structure': 'cuckoo',
+        'items': len(names),
+        'params': f"capacity={capacity}, bucket_size={bucket_size}, fingerprint_size={fingerprint_size}",
+        # The bound the tuner uses, at the load the table was sized for.
+        'target_fp': false_positive_bound(fingerprint_size, bucket_size, target_load),
+        'observed_fp': _observed_fp(cuckoo_filter.contains_many, probes),
+        'probes': probes,
+        'memory_bytes': memory_bytes,
+        'bits_per_key': _bits_per_key(memory_bytes, names),
+        'fill_ratio': None,
+        'load_factor': cuckoo_filter.load_factor(),
+        'failures': failures,
+        'build_seconds': build_seconds,
+    }
+
+
+def measure_xor(names, fingerprint_size, probes):
+    """
+    Builds an XorFilter over names and measures its false positive rate.
+
+    Returns:
+        dict: One result row.
+    """
+    start = time.perf_counter()
+    xor_filter = XorFilter(names, fingerprint_size=fingerprint_size)
+    build_seconds = time.perf_counter() - start
+    return {
+        'structure': 'xor',
+        'items': len(names),
+        'params': f"fingerprint_size={fingerprint_size}, slots={len(xor_filter.fingerprints)}",
+        'target_fp': 2.0 ** -fingerprint_size,
+        'observed_fp': _observed_fp(xor_filter.check_many, probes),
+        'probes': probes,
+        'memory_bytes': xor_filter.fingerprints.nbytes,
+        'bits_per_key': xor_filter.bits_per_key(),
+        'fill_ratio': None,
+        'load_factor': None,
+        'failures': 0,
+        'build_seconds': build_seconds,
+    }
+
+
+def run_sweep(data_file, limit=None, probes=1_000_000, fp_probs=(0.01,), bucket_sizes=(4,),
+              fingerprint_sizes=(8,), loads=(0.95,), structures=('bloom', 'blocked_bloom', 'cuckoo', 'xor')):
+    """
+    Measures every requested configuration over the same dataset.
+
+    Returns:
+        list: Result rows.
+    """
+    names = _load_names(data_file, limit)
+    print(f"Measuring over {len(names)} usernames with {probes} absent probes...")
+    results = []
+    for structure in structures:
+        if structure in ('bloom', 'blocked_bloom'):
+            cls = BlockedBloomFilter if structure == 'blocked_bloom' else BloomFilter
+            configs = [lambda p=p: measure_bloom(cls, names, p, probes) for p in fp_probs]
+        elif structure == 'xor':
+            configs = [lambda f=f: measure_xor(names, f, probes) for f in fingerprint_sizes if f in (8, 16)]
+        else:
+            configs = [lambda b=b, f=f, l=l: measure_cuckoo(names, b, f, l, probes)
+                       for b in bucket_sizes for f in fingerprint_sizes for l in loads]
+        for measure in configs:
+            row = measure()
+            print(f"{row['structure']:>14} [{row['params']}]: target {row['target_fp']:.3%}, "
+                  f"observed {row['observed_fp']:.3%}, {row['bits_per_key']:.2f} bits/key"
+                  + (f", load {row['load_factor']:.2%}, {row['failures']} failed" if row['load_factor'] is not None else ""))
+            results.append(row)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure filter false positive rates and bits per key.")
+    parser.add_argument("data_file", help="username file to build the filters over")
+    parser.add_argument("--limit", type=int, help="use only the first LIMIT usernames")
+    parser.add_argument("--probes", type=int, default=1_000_000, help="absent names probed per filter")
+    parser.add_argument("--structures", nargs="+", default=['bloom', 'blocked_bloom', 'cuckoo', 'xor'],
+                        choices=['bloom', 'blocked_bloom', 'cuckoo', 'xor'])
+    parser.add_argument("--fp-probs", nargs="+", type=float, default=[0.01], help="Bloom fp_prob values")
+    parser.add_argument("--bucket-sizes", nargs="+", type=int, default=[4], help="cuckoo bucket sizes")
+    parser.add_argument("--fingerprint-sizes", nargs="+", type=int, default=[8], help="cuckoo / xor (8 or 16) fingerprint bits")
+    parser.add_argument("--loads", nargs="+", type=float, default=[0.95],
+                        help="cuckoo target load factors used to size capacity")
+    parser.add_argument("--output", help="JSON results file")
+    parser.add_argument("--csv", help="CSV results file")
+    args = parser.parse_args()
+
+    results = run_sweep(args.data_file, args.limit, args.probes, args.fp_probs, args.bucket_sizes,
+                        args.fingerprint_sizes, args.loads, args.structures)
+    write_results(results, args.output, args.csv)
@@ -0,0 +1,208 @@
+# Shared hashing layer for BloomFilter and CuckooFilter
+# Install mmh3 and numpy 3rd party module first
+# pip install mmh3
+# pip install numpy
+import mmh3
+import numpy as np
+
+MASK64 = (1 << 64) - 1
+
+# Odd multiplier (from MurmurHash2) used to spread a cuckoo fingerprint
+# before deriving its alternate bucket
+FINGERPRINT_MIX = 0x5bd1e995
+
+
+class Murmur3Hasher(object):
+
+    '''
+    Seedable, process-stable 128-bit hash (MurmurHash3 x64_128).
+    Every key is hashed once and returned as two unsigned 64-bit halves.
+    Unlike Python's built-in hash(), the result does not change between
+    interpreters, so filters built in one process stay valid in another.
+    '''
+
+    name = 'murmur3_x64_128'
+
+    def __init__(self, seed=0):
+        '''
+        seed : int
+            Seed of the hash function, in [0, 2**32)
+        '''
+        self.seed = seed
+
+    def hash_pair(self, item):
+        '''
+        Return the (h1, h2) 64-bit halves of the hash of one item
+        '''
+        return mmh3.hash64(item, self.seed, signed=False)
+
+    def hash_pairs(self, items):
+        '''
+        Return the h1 and h2 halves of a batch of items as two uint64 arrays
+        '''
+        seed = self.seed
+        digests = b''.join([mmh3.hash_bytes(item, seed) for item in items])
+        pairs = np.frombuffer(digests, dtype='<u8').reshape(-1, 2)
+        return pairs[:, 0], pairs[:, 1]
+
+
+# Registry of available hash functions, looked up by name
+HASHERS = {
+    Murmur3Hasher.name: Murmur3Hasher,
+}
+
+
+def get_hasher(name=Murmur3Hasher.name, seed=0):
+    '''
+    Return a hasher instance given its registered name and seed
+    '''
+    try:
+        return HASHERS[name](seed)
+    except KeyError:
+        raise ValueError(f"Unknown hash function: {name}")
+
+
+def saved_seed(hasher):
+    '''
+    Return the seed to record for hasher in a saved filter. Filter files
+    only record a murmur3 seed, so filters using another hasher cannot be
+    saved: loading them would silently hash with murmur3
+    '''
+    name = getattr(hasher, 'name', type(hasher).__name__)
+    if name != Murmur3Hasher.name:
+        raise ValueError(f"Cannot save a filter using hash function {name}; "
+                         f"filter files only support {Murmur3Hasher.name}")
+    return hasher.seed
+
+
+def double_hash_positions(h1, h2, k, m):
+    '''
+    Return the k bit positions of one key in an m-bit array using
+    Kirsch-Mitzenmacher double hashing: g_i = (h1 + i * h2) mod m
+    '''
+    return [((h1 + i * h2) & MASK64) % m for i in range(k)]
+
+
+def double_hash_positions_many(h1, h2, k, m):
+    '''
+    Vectorized double_hash_positions, returning an (n, k) uint64 array.
+    uint64 arithmetic wraps modulo 2**64 exactly like the scalar version
+    '''
+    steps = np.arange(k, dtype=np.uint64)
+    return (h1[:, None] + steps * h2[:, None]) % np.uint64(m)
+
+
+def _splitmix64(x):
+    '''
+    Return the x-th output of the SplitMix64 generator
+    '''
+    z = (x * 0x9E3779B97F4A7C15) & MASK64
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & MASK64
+    return z ^ (z >> 31)
+
+
+# Odd multipliers for the in-block offsets of a blocked Bloom filter,
+# one per probe
+BLOCK_MULTIPLIERS = [_splitmix64(i + 1) | 1 for i in range(64)]
+
+
+def blocked_positions(h1, h2, k, num_blocks, block_bits):
+    '''
+    Return the k bit positions of one key in a blocked Bloom filter.
+    h1 picks the block; probe i takes the top log2(block_bits) bits of
+    h2 * BLOCK_MULTIPLIERS[i] as its offset inside the block (multiply-
+    shift hashing, block_bits must be a power of two and k <= 64)
+    '''
+    base = (h1 % num_blocks) * block_bits
+    shift = 64 - (block_bits.bit_length() - 1)
+    return [base + (((h2 * BLOCK_MULTIPLIERS[i]) & MASK64) >> shift) for i in range(k)]
+
+
+def blocked_positions_many(h1, h2, k, num_blocks, block_bits):
+    '''
+    Vectorized blocked_positions, returning an (n, k) uint64 array
+    '''
+    base = (h1 % np.uint64(num_blocks)) * np.uint64(block_bits)
+    shift = np.uint64(64 - (block_bits.bit_length() - 1))
+    multipliers = np.array(BLOCK_MULTIPLIERS[:k], dtype=np.uint64)
+    offsets = (h2[:, None] * multipliers) >> shift
+    return base[:, None] + offsets
+
+
+def cuckoo_fingerprint(h, bits):
+    '''
+    Return a non-zero fingerprint made of the low bits of h
+    '''
+    fp = h & ((1 << bits) - 1)
+    return fp if fp else 1
+
+
+def cuckoo_fingerprint_many(h, bits):
+    '''
+    Vectorized cuckoo_fingerprint, returning a uint64 array
+    '''
+    fp = h & np.uint64((1 << bits) - 1)
+    fp[fp == 0] = 1
+    return fp
+
+
+def cuckoo_alt_index(index, fp, capacity):
+    '''
+    Return the alternate bucket of a fingerprint stored in bucket index.
+    (mix(fp) - index) mod capacity is its own inverse for any capacity,
+    so the alternate of the alternate bucket is the original bucket.
+    '''
+    mixed = ((fp * FINGERPRINT_MIX) & MASK64) % capacity
+    return (mixed - index) % capacity
+
+
+def cuckoo_alt_index_many(index, fp, capacity):
+    '''
+    Vectorized cuckoo_alt_index over uint64 arrays
+    '''
+    capacity = np.uint64(capacity)
+    mixed = (fp.astype(np.uint64) * np.uint64(FINGERPRINT_MIX)) % capacity
+    return (mixed + capacity - index) % capacity
+
+
+def _rotl64(h, r):
+    return ((h << r) | (h >> (64 - r))) & MASK64
+
+
+def xor_positions(h, block_length):
+    '''
+    Return the three slots of a key with hash h in an xor filter made of
+    three blocks of block_length slots, one slot per block. Each block
+    maps a different 32-bit window of h with multiply-shift range reduction.
+    '''
+    return ((h & 0xFFFFFFFF) * block_length >> 32,
+            block_length + ((_rotl64(h, 21) & 0xFFFFFFFF) * block_length >> 32),
+            2 * block_length + ((_rotl64(h, 42) & 0xFFFFFFFF) * block_length >> 32))
+
+
+def xor_positions_many(h, block_length):
+    '''
+    Vectorized xor_positions, returning an (n, 3) uint64 array
+    '''
+    low = np.uint64(0xFFFFFFFF)
+    length = np.uint64(block_length)
+    positions = np.empty((len(h), 3), dtype=np.uint64)
+    for i, r in enumerate((0, 21, 42)):
+        rotated = h if r == 0 else (h << np.uint64(r)) | (h >> np.uint64(64 - r))
+        positions[:, i] = ((rotated & low) * length >> np.uint64(32)) + np.uint64(i * block_length)
+    return positions
+
+
+def xor_fingerprint(h, bits):
+    '''
+    Return the xor filter fingerprint of a key with hash h
+    '''
+    return (h ^ (h >> 32)) & ((1 << bits) - 1)
+
+
+def xor_fingerprint_many(h, bits):
+    '''
+    Vectorized xor_fingerprint, returning a uint64 array
+    '''
+    return (h ^ (h >> np.uint64(32))) & np.uint64((1 << bits) - 1)
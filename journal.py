@@ -0,0 +1,259 @@
+import os
+import struct
+import zlib
+import filterfile
+
+# Append-only journal of filter updates made since the last snapshot.
+#
+# File layout:
+#   16-byte header: magic, then the checksum of the snapshot payload the journal applies to
+#   records:        op (1 byte), key length (uint32), UTF-8 key, crc32 of the three
+# A record is only trusted when its checksum matches, so a record torn by a crash is
+# dropped (and cut off) when the journal is next opened. Compaction writes a new snapshot
+# and then starts a new journal for it; a journal whose snapshot checksum no longer
+# matches was already folded into the snapshot and is discarded instead of replayed,
+# which keeps replay safe for cuckoo filters, where re-inserting a name is not idempotent.
+MAGIC = b'LCJOURNL'
+HEADER = struct.Struct('<8sI4x')
+RECORD = struct.Struct('<BI')
+CHECKSUM = struct.Struct('<I')
+
+OP_ADD = 1
+OP_DELETE = 2
+
+COMPACT_AFTER = 100_000  # records appended before a JournaledFilter compacts itself
+
+
+def snapshot_checksum(snapshot_file):
+    """
+    Returns the payload checksum recorded in the header of a filter file.
+    """
+    with open(snapshot_file, 'rb') as f:
+        _, _, checksum = filterfile.unpack_header(f.read(filterfile.HEADER_SIZE))
+    return checksum
+
+
+class Journal:
+    """
+    Append-only journal of (op, name) records for one snapshot.
+
+    Attributes:
+        filename (str): Path of the journal file.
+        sync (bool): fsync after every record, so an append is durable once it returns.
+        records (int): Number of valid records in the journal.
+    """
+
+    def __init__(self, filename, snapshot_crc, sync=True):
+        """
+        Opens a journal, creating it if needed. An existing journal written for another
+        snapshot is reset, and a torn record at its end is cut off.
+
+        Parameters:
+            filename (str): Path of the journal file.
+            snapshot_crc (int): Checksum of the snapshot the journal applies to.
+            sync (bool): fsync after every record.
+        """
+        self.filename = filename
+        self.sync = sync
+        self.snapshot_crc = snapshot_crc
+        self._pending = []
+        valid_length = 0
+        if os.path.exists(filename):
+            with open(filename, 'rb') as f:
+                data = f.read()
+            if len(data) >= HEADER.size and HEADER.unpack_from(data) == (MAGIC, snapshot_crc):
+                self._pending, valid_length = self._parse(data)
+        if valid_length:
+            self._file = open(filename, 'r+b')
+            self._file.truncate(valid_length)
+            self._file.seek(valid_length)
+        else:
+            self._pending = []
+            self._file = self._create(filename, snapshot_crc)
+        self.records = len(self._pending)
+
+    @staticmethod
+    def _create(filename, snapshot_crc):
+        tmp_name = f"{filename}.tmp"
+        f = open(tmp_name, 'w+b')
+        f.write(HEADER.pack(MAGIC, snapshot_crc))
+        f.flush()
+        os.fsync(f.fileno())
+        os.replace(tmp_name, filename)
+        return f
+
+    @staticmethod
+    def _parse(data):
+        """
+        Returns the valid records of a journal and the length of its valid prefix.
+        """
+        records = []
+        position = HEADER.size
+        while position + RECORD.size <= len(data):
+            op, length = RECORD.unpack_from(data, position)
+            end = position + RECORD.size + length
+            if end + CHECKSUM.size > len(data):
+                break
+            (checksum,) = CHECKSUM.unpack_from(data, end)
+            if checksum != zlib.crc32(data[position:end]) or op not in (OP_ADD, OP_DELETE):
+                break
+            records.append((op, data[position + RECORD.size:end].decode('utf-8')))
+            position = end + CHECKSUM.size
+        return records, position
+
+    def replay(self):
+        """
+        Returns the (op, name) records found when the journal was opened, oldest first.
+        """
+        pending, self._pending = self._pending, []
+        return pending
+
+    def append(self, op, name):
+        """
+        Appends one record.
+
+        Parameters:
+            op (int): OP_ADD or OP_DELETE.
+            name (str): The username.
+        """
+        key = name.encode('utf-8')
+        record = RECORD.pack(op, len(key)) + key
+        self._file.write(record + CHECKSUM.pack(zlib.crc32(record)))
+        self._file.flush()
+        if self.sync:
+            os.fsync(self._file.fileno())
+        self.records += 1
+
+    def reset(self, snapshot_crc):
+        """
+        Starts an empty journal for a new snapshot.
+        """
+        self._file.close()
+        self.snapshot_crc = snapshot_crc
+        self._file = self._create(self.filename, snapshot_crc)
+        self.records = 0
+
+    def close(self):
+        self._file.close()
+
+
+class JournaledFilter:
+    """
+    A persisted filter that takes updates without rebuilding its snapshot.
+
+    The snapshot is opened copy-on-write and the journal next to it is replayed over it.
+    Every add (and cuckoo delete) is applied in memory and appended to the journal, so it
+    is durable once the call returns and costs O(1). compact() folds the journal into a
+    new snapshot; it also runs on its own every compact_after records, which keeps replay
+    and therefore restart time bounded. Lookups (check, contains and their batch forms)
+    always go to the current filter, so methods bound before a compaction stay valid;
+    everything else (load_factor, ...) is answered by the wrapped filter.
+
+    Attributes:
+        filter: The wrapped BloomFilter, BlockedBloomFilter or CuckooFilter.
+        snapshot_file (str): Path of the snapshot filter file.
+        journal (Journal): The journal of updates made since the snapshot.
+        compact_after (int): Records after which the journal is compacted, or None.
+    """
+
+    def __init__(self, filter_class, snapshot_file, journal_file=None, sync=True, compact_after=COMPACT_AFTER):
+        """
+        Opens a snapshot and replays its journal.
+
+        Parameters:
+            filter_class: Class of the saved filter (its load() opens the snapshot).
+            snapshot_file (str): Path of the snapshot written by the filter's save().
+            journal_file (str): Path of the journal (default: snapshot_file + '.journal').
+            sync (bool): fsync every record.
+            compact_after (int): Compact once the journal holds this many records (None: never).
+        """
+        self.filter_class = filter_class
+        self.snapshot_file = snapshot_file
+        self.compact_after = compact_after
+        self.filter = filter_class.load(snapshot_file, mode='c')
+        self.journal = Journal(journal_file or f"{snapshot_file}.journal", snapshot_checksum(snapshot_file), sync)
+        self._bind()
+        for op, name in self.journal.replay():
+            if op == OP_ADD:
+                self._insert(name)
+            else:
+                self.filter.delete(name)
+
+    def _bind(self):
+        # Bloom filters expose add()/check(), cuckoo filters insert()/contains()/delete().
+        self._insert = getattr(self.filter, 'insert', None) or self.filter.add
+        self._check = getattr(self.filter, 'check', None) or self.filter.contains
+        self._check_many = getattr(self.filter, 'check_many', None) or self.filter.contains_many
+
+    def __getattr__(self, name):
+        if name == 'filter':
+            raise AttributeError(name)
+        return getattr(self.filter, name)
+
+    def check(self, name):
+        """
+        Checks whether a name is possibly in the current filter.
+        """
+        return self._check(name)
+
+    contains = check
+
+    def check_many(self, names):
+        """
+        Checks a batch of names against the current filter.
+        """
+        return self._check_many(names)
+
+    contains_many = check_many
+
+    def add(self, name):
+        """
+        Adds a name to the filter and journals it.
+
+        Returns:
+            The wrapped filter's result: None for Bloom filters, and for cuckoo filters
+            False (nothing journaled) if the name could not be placed.
+        """
+        result = self._insert(name)
+        if result is not False:
+            self.journal.append(OP_ADD, name)
+            self._maybe_compact()
+        return result
+
+    insert = add
+
+    def delete(self, name):
+        """
+        Deletes a name from a cuckoo filter and journals it.
+
+        Returns:
+            bool: True if the name was found and deleted.
+        """
+        deleted = self.filter.delete(name)
+        if deleted:
+            self.journal.append(OP_DELETE, name)
+            self._maybe_compact()
+        return deleted
+
+    def _maybe_compact(self):
+        if self.compact_after is not None and self.journal.records >= self.compact_after:
+            self.compact()
+
+    def compact(self):
+        """
+        Writes the current filter as the new snapshot and starts an empty journal for it.
+        """
+        self.filter.save(self.snapshot_file)
+        self.journal.reset(snapshot_checksum(self.snapshot_file))
+        # Re-map the new snapshot, dropping the private pages the updates had dirtied.
+        self.filter = self.filter_class.load(self.snapshot_file, mode='c')
+        self._bind()
+
+    def close(self):
+        self.journal.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
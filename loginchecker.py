@@ -0,0 +1,176 @@
+from collections import OrderedDict
+import numpy as np
+
+
+class LoginChecker:
+    """
+    Tiered username availability checker.
+
+    A lookup goes through three tiers, cheapest first:
+        1. a bounded LRU cache of recently checked names,
+        2. a probabilistic front filter (BloomFilter, BlockedBloomFilter or CuckooFilter),
+           which answers most lookups for free names on its own,
+        3. an exact backing store, only reached when the filter says "maybe present",
+           so filter false positives never report a free name as taken.
+
+    Attributes:
+        front_filter: Filter with check()/add() (Bloom) or contains()/insert() (cuckoo).
+        exact_store: Exact set of taken names: a set, a SortedIndex, or any container
+            supporting `in`. Stores without add() (e.g. a read-only SortedIndex) keep
+            newly registered names in an in-memory overlay.
+        cache_size (int): Maximum number of names kept in the LRU cache.
+        stats (dict): Per-tier counters.
+    """
+
+    def __init__(self, front_filter, exact_store, cache_size=100_000):
+        """
+        Initializes the checker.
+
+        Parameters:
+            front_filter: The probabilistic filter holding every taken name.
+            exact_store: The exact store holding every taken name.
+            cache_size (int): Maximum number of names kept in the LRU cache (0 disables it).
+        """
+        self.front_filter = front_filter
+        self.exact_store = exact_store
+        self.cache_size = cache_size
+        self._cache = OrderedDict()  # name -> taken
+        self._registered = set()  # names registered in a store without add()
+
+        # Bloom filters expose check/add, cuckoo filters contains/insert.
+        self._filter_check = getattr(front_filter, 'check', None) or front_filter.contains
+        self._filter_check_many = getattr(front_filter, 'check_many', None) or front_filter.contains_many
+        self._filter_add = getattr(front_filter, 'add', None) or front_filter.insert
+
+        self.stats = {
+            'checks': 0,            # names checked
+            'cache_hits': 0,        # answered by the LRU cache
+            'filter_negatives': 0,  # answered "available" by the front filter
+            'exact_lookups': 0,     # filter positives sent to the exact store
+            'exact_hits': 0,        # exact lookups that found the name taken
+            'false_positives': 0,   # exact lookups that found the name free
+            'registrations': 0,     # names registered
+        }
+
+    def _cache_get(self, name):
+        taken = self._cache.get(name)
+        if taken is not None:
+            self._cache.move_to_end(name)
+        return taken
+
+    def _cache_put(self, name, taken):
+        if self.cache_size <= 0:
+            return
+        self._cache[name] = taken
+        self._cache.move_to_end(name)
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _in_store(self, name):
+        return name in self._registered or name in self.exact_store
+
+    def _in_store_many(self, names):
+        contains_many = getattr(self.exact_store, 'contains_many', None)
+        if contains_many is None:
+            return np.fromiter((self._in_store(name) for name in names), dtype=bool, count=len(names))
+        found = np.asarray(contains_many(names), dtype=bool)
+        if self._registered:
+            found |= np.fromiter((name in self._registered for name in names), dtype=bool, count=len(names))
+        return found
+
+    def is_available(self, name):
+        """
+        Checks whether a username is free.
+
+        Parameters:
+            name (str): The username to check.
+
+        Returns:
+            bool: True if nobody has registered the name, False if it is taken.
+        """
+        self.stats['checks'] += 1
+        taken = self._cache_get(name)
+        if taken is not None:
+            self.stats['cache_hits'] += 1
+            return not taken
+
+        if not self._filter_check(name):
+            self.stats['filter_negatives'] += 1
+            taken = False
+        else:
+            self.stats['exact_lookups'] += 1
+            taken = self._in_store(name)
+            self.stats['exact_hits' if taken else 'false_positives'] += 1
+
+        self._cache_put(name, taken)
+        return not taken
+
+    def is_available_many(self, names, cache=True):
+        """
+        Checks a batch of usernames. Cache misses go through the front filter in one
+        vectorized call, and only its positives are looked up in the exact store.
+
+        Parameters:
+            names: An iterable of usernames.
+            cache (bool): Use the LRU cache; pass False for one-off names (such as
+                generated suggestions) that would only evict useful entries.
+
+        Returns:
+            numpy.ndarray: A bool array, True where the name is free.
+        """
+        names = list(names)
+        self.stats['checks'] += len(names)
+        taken = np.zeros(len(names), dtype=bool)
+
+        misses = []
+        for i, name in enumerate(names):
+            cached = self._cache_get(name) if cache else None
+            if cached is None:
+                misses.append(i)
+            else:
+                taken[i] = cached
+        self.stats['cache_hits'] += len(names) - len(misses)
+        if not misses:
+            return ~taken
+
+        miss_names = [names[i] for i in misses]
+        maybe = np.asarray(self._filter_check_many(miss_names), dtype=bool)
+        self.stats['filter_negatives'] += len(misses) - int(np.count_nonzero(maybe))
+
+        positives = np.flatnonzero(maybe)
+        if len(positives):
+            found = self._in_store_many([miss_names[j] for j in positives])
+            hits = int(np.count_nonzero(found))
+            self.stats['exact_lookups'] += len(positives)
+            self.stats['exact_hits'] += hits
+            self.stats['false_positives'] += len(positives) - hits
+            taken[np.asarray(misses)[positives]] = found
+
+        if cache:
+            for i in misses:
+                self._cache_put(names[i], bool(taken[i]))
+        return ~taken
+
+    def register(self, name):
+        """
+        Registers a username in every tier: front filter, exact store and cache.
+
+        Parameters:
+            name (str): The username to register.
+
+        Returns:
+            bool: True if the name was registered, False if it was already taken.
+        """
+        if not self.is_available(name):
+            return False
+        if self._filter_add(name) is False:
+            # A cuckoo filter that cannot place the name would later report it as free.
+            raise RuntimeError(f"Front filter is full, cannot register {name!r}")
+        add = getattr(self.exact_store, 'add', None)
+        if add is not None:
+            add(name)
+        else:
+            self._registered.add(name)
+        self._cache_put(name, True)
+        self.stats['registrations'] += 1
+        return True
@@ -0,0 +1,304 @@
+import time
+from bisect import bisect_left
+import numpy as np
+
+# Opt-in metrics for the filters.
+#
+# Nothing in the filter classes is instrumented. instrument() installs timing and counting
+# wrappers as attributes of one filter instance, which shadow the class methods for that
+# instance only; uninstrument() deletes them again. A filter that was never instrumented
+# runs exactly the code it would without this module, so the hooks cost nothing when off.
+#
+# While on, the wrappers keep counters per operation (calls, items, hashes, probes,
+# positives, failed inserts), latency histograms, cuckoo eviction chain lengths and an
+# occupancy count maintained on every insert and delete, which turns the cuckoo filter's
+# load_factor() into an O(1) read. Everything exports as a dict or as Prometheus text.
+LATENCY_BOUNDS = [1e-6 * 2 ** i for i in range(20)]  # seconds, 1 us to about 0.5 s
+CHAIN_BOUNDS = [0, 1, 2, 3, 4, 6, 8, 12, 16, 24, 32, 64]  # displacements per eviction
+
+# Operations wrapped when the filter has them, and whether they take a batch.
+OPERATIONS = {
+    'add': False, 'check': False, 'insert': False, 'contains': False, 'delete': False,
+    'add_many': True, 'check_many': True, 'bulk_insert': True, 'contains_many': True,
+}
+QUERIES = ('check', 'contains', 'check_many', 'contains_many')
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram in the Prometheus style.
+
+    Attributes:
+        bounds (list): Upper bounds of the buckets; a last +Inf bucket is implied.
+        counts (list): Observations per bucket (not cumulative).
+        sum (float): Sum of all observations.
+        count (int): Number of observations.
+    """
+
+    def __init__(self, bounds):
+        self.bounds = list(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def as_dict(self):
+        return {'bounds': self.bounds, 'counts': list(self.counts), 'sum': self.sum, 'count': self.count}
+
+
+class FilterMetrics:
+    """
+    Counters, histograms and gauges of one instrumented filter.
+
+    Attributes:
+        counters (dict): Monotonic counters, e.g. 'check_calls', 'hashes', 'probes'.
+        latency (dict): Latency Histogram (seconds) per operation.
+        chain_length (Histogram): Displacements per successful cuckoo eviction.
+        occupied (int): Stored cuckoo fingerprints, or set Bloom bits.
+        slots (int): Cuckoo slots, or Bloom bits.
+        load_seconds (float): Duration of the load that produced the filter, if timed.
+        save_seconds (float): Duration of the last save.
+    """
+
+    def __init__(self):
+        self.counters = {}
+        self.latency = {}
+        self.chain_length = Histogram(CHAIN_BOUNDS)
+        self.occupied = 0
+        self.slots = 0
+        self.load_seconds = None
+        self.save_seconds = None
+
+    def count(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def fill_ratio(self):
+        """
+        Returns occupied / slots: the load factor of a cuckoo filter, the share of set bits of a Bloom filter.
+        """
+        return self.occupied / self.slots if self.slots else 0.0
+
+    def as_dict(self):
+        """
+        Returns every metric as plain Python values.
+        """
+        return {
+            'counters': dict(self.counters),
+            'latency_seconds': {op: histogram.as_dict() for op, histogram in self.latency.items()},
+            'chain_length': self.chain_length.as_dict(),
+            'occupied': self.occupied,
+            'slots': self.slots,
+            'fill_ratio': self.fill_ratio(),
+            'load_seconds': self.load_seconds,
+            'save_seconds': self.save_seconds,
+        }
+
+    def to_prometheus(self, prefix='filter', labels=None):
+        """
+        Returns the metrics in the Prometheus text exposition format.
+
+        Parameters:
+            prefix (str): Prefix of every metric name.
+            labels (dict): Labels added to every sample, e.g. {'filter': 'bloom'}.
+        """
+        def fmt(extra=None):
+            pairs = dict(labels or {}, **(extra or {}))
+            return "{" + ",".join(f'{key}="{value}"' for key, value in pairs.items()) + "}" if pairs else ""
+
+        def histogram_lines(name, histogram, extra=None):
+            lines = []
+            cumulative = 0
+            for bound, count in zip(histogram.bounds + ['+Inf'], histogram.counts):
+                cumulative += count
+                lines.append(f"{name}_bucket{fmt(dict(extra or {}, le=bound))} {cumulative}")
+            lines.append(f"{name}_sum{fmt(extra)} {histogram.sum}")
+            lines.append(f"{name}_count{fmt(extra)} {histogram.count}")
+            return lines
+
+        lines = []
+        for name, value in sorted(self.counters.items()):
+            lines += [f"# TYPE {prefix}_{name}_total counter", f"{prefix}_{name}_total{fmt()} {value}"]
+        if self.latency:
+            lines.append(f"# TYPE {prefix}_operation_seconds histogram")
+            for op, histogram in sorted(self.latency.items()):
+                lines += histogram_lines(f"{prefix}_operation_seconds", histogram, {'op': op})
+        if self.chain_length.count:
+            lines.append(f"# TYPE {prefix}_eviction_chain_length histogram")
+            lines += histogram_lines(f"{prefix}_eviction_chain_length", self.chain_length)
+        gauges = {'occupied': self.occupied, 'slots': self.slots, 'fill_ratio': self.fill_ratio(),
+                  'load_seconds': self.load_seconds, 'save_seconds': self.save_seconds}
+        for name, value in gauges.items():
+            if value is not None:
+                lines += [f"# TYPE {prefix}_{name} gauge", f"{prefix}_{name}{fmt()} {value}"]
+        return "\n".join(lines) + "\n"
+
+
+def _probes_per_item(target, op):
+    if hasattr(target, 'bit_array'):
+        return target.hash_count
+    if hasattr(target, 'buckets'):
+        return 2  # both candidate buckets; eviction moves are counted as kicks
+    return getattr(target, 'hash_count', 3 if hasattr(target, 'fingerprints') else 1)
+
+
+def _unset_bits(target, positions):
+    """
+    Returns how many distinct bits among positions are still 0 in a Bloom bit array,
+    i.e. how many an add of those positions newly sets.
+    """
+    positions = np.unique(np.asarray(positions, dtype=np.uint64).ravel())
+    bytes_view = np.frombuffer(target.bit_array, dtype=np.uint8)
+    bits = bytes_view[positions >> np.uint64(3)] & (0x80 >> (positions & np.uint64(7))).astype(np.uint8)
+    return int(np.count_nonzero(bits == 0))
+
+
+def _wrap(target, metrics, op, batch):
+    method = getattr(target, op)
+    histogram = metrics.latency.setdefault(op, Histogram(LATENCY_BOUNDS))
+    probes = _probes_per_item(target, op)
+    is_bloom = hasattr(target, 'bit_array')
+    perf_counter = time.perf_counter
+
+    def wrapper(arg):
+        if batch:
+            arg = list(arg)
+        items = len(arg) if batch else 1
+        if is_bloom and op == 'add':
+            bit_array = target.bit_array
+            new_bits = sum(1 for p in set(target._positions(arg)) if not bit_array[p])
+        elif is_bloom and op == 'add_many':
+            new_bits = _unset_bits(target, target._positions_many(arg)) if arg else 0
+        start = perf_counter()
+        result = method(arg)
+        histogram.observe(perf_counter() - start)
+
+        metrics.count(f"{op}_calls")
+        metrics.count(f"{op}_items", items)
+        metrics.count('hashes', items)
+        metrics.count('probes', items * probes)
+        if op in QUERIES:
+            positives = int(np.count_nonzero(result)) if batch else int(bool(result))
+            metrics.count('positives', positives)
+            metrics.count('negatives', items - positives)
+        elif is_bloom:
+            # Bits of the item(s) that were 0 before the add, so O(k) per item, not O(m).
+            metrics.occupied += new_bits
+        elif op == 'insert':
+            if result:
+                metrics.occupied += 1
+            else:
+                metrics.count('failed_inserts')
+        elif op == 'bulk_insert':
+            metrics.occupied += items - result
+            metrics.count('failed_inserts', result)
+        elif op == 'delete' and result:
+            metrics.occupied -= 1
+        return result
+
+    return wrapper
+
+
+def _wrap_eviction(target, metrics):
+    search = target._eviction_path
+    put = target._put
+
+    def eviction_path(i1, i2):
+        moves = [0]
+
+        def counting_put(index, fp):
+            moves[0] += 1
+            return put(index, fp)
+
+        target._put = counting_put
+        try:
+            start = search(i1, i2)
+        finally:
+            del target._put
+        metrics.count('evictions')
+        if start is None:
+            metrics.count('failed_evictions')
+        else:
+            metrics.count('kicks', moves[0])
+            metrics.chain_length.observe(moves[0])
+        return start
+
+    return eviction_path
+
+
+def _wrap_save(target, metrics):
+    save = target.save
+
+    def timed_save(filename):
+        start = time.perf_counter()
+        save(filename)
+        metrics.save_seconds = time.perf_counter() - start
+        metrics.count('saves')
+
+    return timed_save
+
+
+def instrument(target, metrics=None):
+    """
+    Turns metrics on for one filter (BloomFilter, BlockedBloomFilter, CuckooFilter or any
+    filter with some of the OPERATIONS). Other instances of the class are not affected.
+
+    Parameters:
+        target: The filter to instrument.
+        metrics (FilterMetrics): Metrics to record into (default: a new one).
+
+    Returns:
+        FilterMetrics: The metrics of the filter, also available as target.metrics.
+    """
+    if 'metrics' in vars(target):
+        return target.metrics
+    metrics = metrics or FilterMetrics()
+    # The occupancy is counted once here and then maintained by the wrappers.
+    if hasattr(target, 'bit_array'):
+        metrics.occupied, metrics.slots = target.bit_array.count(), target.size
+    elif hasattr(target, 'buckets'):
+        metrics.occupied, metrics.slots = int(np.count_nonzero(target.buckets)), target.buckets.size
+        target.load_factor = metrics.fill_ratio
+        target._eviction_path = _wrap_eviction(target, metrics)
+    for op, batch in OPERATIONS.items():
+        if hasattr(target, op):
+            setattr(target, op, _wrap(target, metrics, op, batch))
+    if hasattr(target, 'save'):
+        target.save = _wrap_save(target, metrics)
+    target.metrics = metrics
+    return metrics
+
+
+def uninstrument(target):
+    """
+    Turns metrics off for a filter, restoring its plain class methods.
+    """
+    for name in list(OPERATIONS) + ['save', 'load_factor', '_eviction_path', 'metrics']:
+        vars(target).pop(name, None)
+
+
+def load_instrumented(cls, filename, **kwargs):
+    """
+    Loads a filter with cls.load(filename, **kwargs), timing the load, and instruments it.
+
+    Returns:
+        The loaded filter, with its metrics in .metrics.
+    """
+    start = time.perf_counter()
+    target = cls.load(filename, **kwargs)
+    metrics = FilterMetrics()
+    metrics.load_seconds = time.perf_counter() - start
+    instrument(target, metrics)
+    return target
+
+
+def bucket_occupancy(cuckoo_filter):
+    """
+    Returns how many buckets hold 0, 1, ..., bucket_size fingerprints. This scans the
+    whole table, so it is meant for occasional export rather than the hot path.
+    """
+    return np.bincount(np.count_nonzero(cuckoo_filter.buckets, axis=1),
+                       minlength=cuckoo_filter.bucket_size + 1).tolist()
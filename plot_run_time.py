@@ -1,38 +1,61 @@
+import argparse
+import json
+from collections import defaultdict
 import matplotlib.pyplot as plt
 
-# Data from the table
-x = [1, 2, 3, 4, 5]  # User counts in millions
-# y_linear = [0.00856, 0.021851, 0.02855, 0.033668, 0.042824]
-# y_binary = [0.0000137, 0.0000152, 0.0000151, 0.0000162, 0.0000168]
-# y_hash = [0.0000031, 0.0000033, 0.0000033, 0.0000039, 0.0000032]
-# y_bloom = [0.0000189, 0.000021, 0.0000159, 0.0000214, 0.0000199]
-# y_cuckoo = [0.0000072, 0.0000079, 0.0000069, 0.0000073, 0.0000082]
+# Labels of the structures measured by benchmark.py
+LABELS = {
+    'linear': 'Linear Search',
+    'binary': 'Binary Search',
+    'hash': 'Hash Search',
+    'sorted_index': 'Sorted Index Search',
+    'bloom': 'BloomFilter Search',
+    'blocked_bloom': 'BlockedBloomFilter Search',
+    'cuckoo': 'CuckooFilter Search',
+    'fingerprints': 'FingerprintSet Search',
+    'xor': 'XorFilter Search',
+}
 
+def load_results(filename):
+    """Read benchmark.py results and group them as {structure: [(items, row), ...]} sorted by size."""
+    with open(filename) as f:
+        rows = json.load(f)
+    series = defaultdict(list)
+    for row in rows:
+        series[row['structure']].append((row['items'], row))
+    for points in series.values():
+        points.sort(key=lambda point: point[0])
+    return series
 
-# Data extracted from the image
-y_linear = [0.00855600, 0.01825000, 0.02765700, 0.03502000, 0.04378300]
-y_binary = [0.00001400, 0.00001560, 0.00001520, 0.00001760, 0.00001510]
-y_hash = [0.00000300, 0.00000350, 0.00000270, 0.00000270, 0.00000350]
-y_bloom = [0.00001590, 0.00001840, 0.00001580, 0.00001900, 0.00001980]
-y_cuckoo = [0.00000670, 0.00000720, 0.00000720, 0.00000700, 0.00000680]
+def plot_results(filename, metric='p50_us', output=None):
+    series = load_results(filename)
 
-# Plotting the data with logarithmic scale for the y-axis
-plt.figure(figsize=(10, 6))
-plt.plot(x, y_linear, marker='o', label='Linear Search')
-plt.plot(x, y_binary, marker='o', label='Binary Search')
-plt.plot(x, y_hash, marker='o', label='Hash Search')
-plt.plot(x, y_bloom, marker='o', label='BloomFilter Search')
-plt.plot(x, y_cuckoo, marker='o', label='CuckooFilter Search')
+    # Plotting the data with logarithmic scale for the y-axis
+    plt.figure(figsize=(10, 6))
+    for structure, points in series.items():
+        x = [items / 1_000_000 for items, _ in points]
+        y = [row[metric] for _, row in points]
+        plt.plot(x, y, marker='o', label=LABELS.get(structure, structure))
 
-# Adding labels, title, and setting log scale
-plt.xlabel('Number of Users (in Millions)')
-plt.ylabel('Search Time (in Seconds)')
-plt.yscale('log')  # Set y-axis to logarithmic scale
-plt.title('Search Time for Different Data Structures (Log Scale)')
-plt.xticks(x, labels=[f"{i}M" for i in x])
-plt.legend()
-plt.grid(True, which="both", linestyle="--")
-plt.tight_layout()
+    # Adding labels, title, and setting log scale
+    plt.xlabel('Number of Users (in Millions)')
+    plt.ylabel(metric)
+    plt.yscale('log')  # Set y-axis to logarithmic scale
+    plt.title(f'{metric} for Different Data Structures (Log Scale)')
+    plt.legend()
+    plt.grid(True, which="both", linestyle="--")
+    plt.tight_layout()
 
-# Show the plot
-plt.show()
+    if output:
+        plt.savefig(output)
+    else:
+        # Show the plot
+        plt.show()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Plot benchmark.py results.")
+    parser.add_argument("results", nargs="?", default="bench_results.json", help="JSON file written by benchmark.py")
+    parser.add_argument("--metric", default="p50_us", help="result column to plot, e.g. p50_us, p99_us, throughput_qps, rss_bytes")
+    parser.add_argument("--output", help="save the figure to this file instead of showing it")
+    args = parser.parse_args()
+    plot_results(args.results, args.metric, args.output)
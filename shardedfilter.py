@@ -0,0 +1,411 @@
+import argparse
+import json
+import math
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+import mmh3
+import numpy as np
+from bloomfilter import BloomFilter, BlockedBloomFilter
+from cuckoofilter import CuckooFilter, fingerprint_size_for
+from usernamesource import UsernameSource
+
+# A filter split by key space into N independent shards.
+#
+# Each username is routed by a 32-bit murmur3 hash with its own seed, so the routing is
+# stable across processes and independent of the hashes the shards use inside. Shard s
+# holds the names whose routing hash h satisfies (h * N) >> 32 == s. A lookup for an
+# absent name reaches exactly one shard, so shards sized for their own item count at
+# fp_prob keep the overall false positive rate at fp_prob. Every shard is an ordinary
+# filter file: it can be built, saved, loaded and queried on its own, in any process.
+#
+# A sharded filter is saved as a directory holding shard_000.bin, shard_001.bin, ...
+# and manifest.json, which records the kind, shard count, routing seed and parameters.
+# The manifest is written last, so a directory is never seen with a partial set of shards.
+ROUTING_SEED = 0x5eed5a4d
+BATCH_SIZE = 1_000_000
+MANIFEST = "manifest.json"
+SLACK_STDDEVS = 4  # headroom per shard when sizing from an expected total
+
+FILTER_KINDS = {
+    'bloom': BloomFilter,
+    'blocked_bloom': BlockedBloomFilter,
+    'cuckoo': CuckooFilter,
+}
+
+
+def shard_of(name, num_shards, routing_seed=ROUTING_SEED):
+    """
+    Returns the shard a username is routed to.
+    """
+    return (mmh3.hash(name, routing_seed, signed=False) * num_shards) >> 32
+
+
+def shards_of(names, num_shards, routing_seed=ROUTING_SEED):
+    """
+    Returns the shard of every username of a batch as an int array.
+    """
+    h = np.fromiter((mmh3.hash(name, routing_seed, signed=False) for name in names),
+                    dtype=np.uint64, count=len(names))
+    return ((h * np.uint64(num_shards)) >> np.uint64(32)).astype(np.intp)
+
+
+def shard_items(expected_items, num_shards):
+    """
+    Returns the number of items each shard is sized for when only the total is known:
+    the mean plus SLACK_STDDEVS standard deviations of the (binomial) shard size, so no
+    shard overflows its false positive target in practice.
+    """
+    mean = expected_items / num_shards
+    return max(1, math.ceil(mean + SLACK_STDDEVS * math.sqrt(mean)))
+
+
+def new_shard(kind, items, fp_prob=0.01, fingerprint_size=None, seed=0):
+    """
+    Returns an empty shard filter of the given kind sized for items names. Cuckoo shards
+    get the smallest fingerprint that meets fp_prob at the default load unless
+    fingerprint_size is given.
+    """
+    if kind == 'cuckoo':
+        if fingerprint_size is None:
+            fingerprint_size = fingerprint_size_for(fp_prob)
+        return CuckooFilter(expected_items=max(items, 1), fingerprint_size=fingerprint_size, seed=seed)
+    return FILTER_KINDS[kind](max(items, 1), fp_prob, seed=seed)
+
+
+def _fill_shard(shard, names):
+    if isinstance(shard, CuckooFilter):
+        return shard.bulk_insert(names)
+    shard.add_many(names)
+    return 0
+
+
+def _build_shard(task):
+    """
+    Worker: builds one shard from the file of names routed to it and saves it.
+    """
+    kind, names_file, count, fp_prob, fingerprint_size, seed, shard_file = task
+    shard = new_shard(kind, count, fp_prob, fingerprint_size, seed)
+    source = UsernameSource(names_file)
+    failed = 0
+    if isinstance(shard, CuckooFilter):
+        # Place all keys at once, so they spread over the whole table.
+        keys = [shard._fingerprints_and_indices(batch) for batch in source.batches(BATCH_SIZE)]
+        if keys:
+            failed = shard._insert_fingerprints(np.concatenate([fps for fps, _ in keys]),
+                                                np.concatenate([indices for _, indices in keys]))
+    else:
+        for batch in source.batches(BATCH_SIZE):
+            shard.add_many(batch)
+    source.close()
+    shard.save(shard_file)
+    return failed
+
+
+def _shard_filename(shard):
+    return f"shard_{shard:03d}.bin"
+
+
+class ShardedFilter:
+    """
+    N independent filters of one kind, each holding the names routed to it.
+
+    Supports the interface of the underlying filters: add/insert, check/contains and
+    their batch forms, and delete for cuckoo shards.
+
+    Attributes:
+        kind (str): 'bloom', 'blocked_bloom' or 'cuckoo'.
+        shards (list): The shard filters; None for shards that were not loaded.
+        routing_seed (int): Seed of the routing hash.
+        fp_prob (float): False positive target of every shard (and of the whole filter).
+    """
+
+    def __init__(self, kind, shards, routing_seed=ROUTING_SEED, fp_prob=0.01):
+        """
+        Wraps existing shard filters.
+
+        Parameters:
+            kind (str): Kind of the shards.
+            shards (list): One filter per shard, in shard order.
+            routing_seed (int): Seed of the routing hash.
+            fp_prob (float): False positive target of the shards.
+        """
+        self.kind = kind
+        self.shards = list(shards)
+        self.routing_seed = routing_seed
+        self.fp_prob = fp_prob
+
+    @classmethod
+    def create(cls, kind, expected_items, num_shards, fp_prob=0.01, fingerprint_size=None, seed=0,
+               routing_seed=ROUTING_SEED):
+        """
+        Creates empty shards, each sized for its expected share of expected_items.
+
+        Parameters:
+            kind (str): 'bloom', 'blocked_bloom' or 'cuckoo'.
+            expected_items (int): Total number of names expected.
+            num_shards (int): Number of shards.
+            fp_prob (float): False positive target.
+            fingerprint_size (int): Fingerprint size in bits (cuckoo; default: derived from fp_prob).
+            seed (int): Seed of the shards' hash function.
+            routing_seed (int): Seed of the routing hash.
+
+        Returns:
+            ShardedFilter: The new filter.
+        """
+        items = shard_items(expected_items, num_shards)
+        shards = [new_shard(kind, items, fp_prob, fingerprint_size, seed) for _ in range(num_shards)]
+        return cls(kind, shards, routing_seed, fp_prob)
+
+    @classmethod
+    def build(cls, data_file, directory, kind, num_shards, fp_prob=0.01, fingerprint_size=None, seed=0,
+              workers=1, routing_seed=ROUTING_SEED):
+        """
+        Builds a sharded filter from a username file into a directory. The names are routed
+        once into one temporary file per shard; each shard is then sized for its exact count
+        and built and saved by its own worker process.
+
+        Parameters:
+            data_file (str): Username file, one username per line.
+            directory (str): Directory to write the shards and manifest to.
+            kind (str): 'bloom', 'blocked_bloom' or 'cuckoo'.
+            num_shards (int): Number of shards.
+            fp_prob (float): False positive target.
+            fingerprint_size (int): Fingerprint size in bits (cuckoo; default: derived from fp_prob).
+            seed (int): Seed of the shards' hash function.
+            workers (int): Number of processes building shards.
+            routing_seed (int): Seed of the routing hash.
+
+        Returns:
+            int: The number of names that could not be inserted (cuckoo only).
+        """
+        os.makedirs(directory, exist_ok=True)
+        scratch = tempfile.mkdtemp(dir=directory)
+        try:
+            names_files = [os.path.join(scratch, f"shard_{shard:03d}.txt") for shard in range(num_shards)]
+            outputs = [open(name, 'w', encoding='utf-8') for name in names_files]
+            counts = np.zeros(num_shards, dtype=np.int64)
+            for batch in UsernameSource(data_file).batches(BATCH_SIZE):
+                ids = shards_of(batch, num_shards, routing_seed)
+                counts += np.bincount(ids, minlength=num_shards)
+                order = np.argsort(ids, kind='stable')
+                bounds = np.searchsorted(ids[order], np.arange(num_shards + 1))
+                for shard in range(num_shards):
+                    group = order[bounds[shard]:bounds[shard + 1]].tolist()
+                    if group:
+                        outputs[shard].write("\n".join([batch[i] for i in group]) + "\n")
+            for output in outputs:
+                output.close()
+
+            tasks = [(kind, names_files[shard], int(counts[shard]), fp_prob, fingerprint_size, seed,
+                      os.path.join(directory, _shard_filename(shard))) for shard in range(num_shards)]
+            if workers > 1:
+                with ProcessPoolExecutor(workers) as pool:
+                    failed = sum(pool.map(_build_shard, tasks))
+            else:
+                failed = sum(map(_build_shard, tasks))
+        finally:
+            shutil.rmtree(scratch, ignore_errors=True)
+        _write_manifest(directory, kind, num_shards, routing_seed, fp_prob, int(counts.sum()))
+        return failed
+
+    def route(self, name):
+        """
+        Returns the index of the shard a username belongs to.
+        """
+        return shard_of(name, len(self.shards), self.routing_seed)
+
+    def _shard(self, name):
+        index = self.route(name)
+        shard = self.shards[index]
+        if shard is None:
+            raise KeyError(f"Shard {index} of {name!r} is not loaded")
+        return shard
+
+    def add(self, name):
+        """
+        Adds a username to its shard. Returns the shard's result (False if a cuckoo insert failed).
+        """
+        shard = self._shard(name)
+        return shard.insert(name) if isinstance(shard, CuckooFilter) else shard.add(name)
+
+    insert = add
+
+    def check(self, name):
+        """
+        Checks whether a username is possibly present.
+        """
+        shard = self._shard(name)
+        return shard.contains(name) if isinstance(shard, CuckooFilter) else shard.check(name)
+
+    contains = check
+
+    def delete(self, name):
+        """
+        Deletes a username from its (cuckoo) shard.
+        """
+        return self._shard(name).delete(name)
+
+    def _groups(self, names, loaded=True):
+        """
+        Returns (shard index, positions in names) for every shard that has names of the
+        batch. With loaded=True those shards must be loaded in this process.
+        """
+        ids = shards_of(names, len(self.shards), self.routing_seed)
+        order = np.argsort(ids, kind='stable')
+        bounds = np.searchsorted(ids[order], np.arange(len(self.shards) + 1))
+        groups = []
+        for shard in range(len(self.shards)):
+            if bounds[shard] < bounds[shard + 1]:
+                group = order[bounds[shard]:bounds[shard + 1]]
+                if loaded and self.shards[shard] is None:
+                    raise KeyError(f"Shard {shard} of {names[group[0]]!r} is not loaded")
+                groups.append((shard, group))
+        return groups
+
+    def add_many(self, names):
+        """
+        Adds a batch of usernames, one batch call per shard.
+
+        Returns:
+            int: The number of names that could not be inserted (cuckoo only).
+        """
+        names = list(names)
+        return sum(_fill_shard(self.shards[shard], [names[i] for i in group.tolist()])
+                   for shard, group in self._groups(names))
+
+    bulk_insert = add_many
+
+    def check_many(self, names, executor=None):
+        """
+        Checks a batch of usernames, one batch call per shard.
+
+        Parameters:
+            names: An iterable of usernames.
+            executor: A query_pool() over the same directory, to check the shards in
+                parallel worker processes (default: check them in this process).
+
+        Returns:
+            numpy.ndarray: A bool array, True where the username might be present.
+        """
+        names = list(names)
+        found = np.zeros(len(names), dtype=bool)
+        # Worker processes load every shard themselves, so only local checks need them here.
+        groups = self._groups(names, loaded=executor is None)
+        tasks = [(shard, [names[i] for i in group.tolist()]) for shard, group in groups]
+        results = executor.map(_check_shard, tasks) if executor is not None else \
+            (_shard_check_many(self.shards[shard], batch) for shard, batch in tasks)
+        for (_, group), result in zip(groups, results):
+            found[group] = result
+        return found
+
+    contains_many = check_many
+
+    def __len__(self):
+        return len(self.shards)
+
+    def save(self, directory):
+        """
+        Saves every loaded shard to directory, then the manifest.
+        """
+        os.makedirs(directory, exist_ok=True)
+        count = 0
+        for index, shard in enumerate(self.shards):
+            if shard is not None:
+                shard.save(os.path.join(directory, _shard_filename(index)))
+                count += shard.items_count if hasattr(shard, 'items_count') else int(np.count_nonzero(shard.buckets))
+        _write_manifest(directory, self.kind, len(self.shards), self.routing_seed, self.fp_prob, count)
+
+    @classmethod
+    def load(cls, directory, mode='r', shards=None, verify=False):
+        """
+        Opens a sharded filter saved with save() or build(). Every shard is memory-mapped.
+
+        Parameters:
+            directory (str): Directory holding the manifest and shard files.
+            mode (str): Load mode of the shards ('r', 'r+' or 'c').
+            shards: Indices of the shards to load (default: all); the others stay None,
+                so a process can hold only its own part of the key space.
+            verify (bool): Check every loaded shard's checksum.
+
+        Returns:
+            ShardedFilter: The loaded filter.
+        """
+        manifest = read_manifest(directory)
+        filter_class = FILTER_KINDS[manifest['kind']]
+        wanted = range(manifest['num_shards']) if shards is None else set(shards)
+        loaded = [filter_class.load(os.path.join(directory, name), mode=mode, verify=verify)
+                  if index in wanted else None for index, name in enumerate(manifest['shards'])]
+        return cls(manifest['kind'], loaded, manifest['routing_seed'], manifest['fp_prob'])
+
+
+def _shard_check_many(shard, names):
+    return shard.contains_many(names) if isinstance(shard, CuckooFilter) else shard.check_many(names)
+
+
+def _write_manifest(directory, kind, num_shards, routing_seed, fp_prob, count):
+    manifest = {
+        'version': 1,
+        'kind': kind,
+        'num_shards': num_shards,
+        'routing_seed': routing_seed,
+        'fp_prob': fp_prob,
+        'count': count,  # items the shards hold / were sized for
+        'shards': [_shard_filename(shard) for shard in range(num_shards)],
+    }
+    tmp_name = os.path.join(directory, MANIFEST + ".tmp")
+    with open(tmp_name, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_name, os.path.join(directory, MANIFEST))
+
+
+def read_manifest(directory):
+    """
+    Returns the manifest of a sharded filter directory as a dict.
+    """
+    with open(os.path.join(directory, MANIFEST)) as f:
+        return json.load(f)
+
+
+_worker_filter = None
+
+
+def _init_query_worker(directory):
+    global _worker_filter
+    _worker_filter = ShardedFilter.load(directory)
+
+
+def _check_shard(task):
+    shard, names = task
+    return _shard_check_many(_worker_filter.shards[shard], names)
+
+
+def query_pool(directory, workers):
+    """
+    Returns a process pool whose workers map the sharded filter in directory, for
+    ShardedFilter.check_many(names, executor=pool). The shard files are shared through
+    the page cache, so every worker adds no copy of the filter.
+    """
+    return ProcessPoolExecutor(workers, initializer=_init_query_worker, initargs=(directory,))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build a key-space sharded filter from a username file.")
+    parser.add_argument("data_file", help="username file, one username per line")
+    parser.add_argument("directory", help="directory to write the shards and manifest to")
+    parser.add_argument("--kind", choices=sorted(FILTER_KINDS), default="bloom")
+    parser.add_argument("--shards", type=int, default=8, help="number of shards")
+    parser.add_argument("--fp-prob", type=float, default=0.01, help="false positive target")
+    parser.add_argument("--fingerprint-size", type=int,
+                        help="fingerprint bits (cuckoo; default: the smallest that meets --fp-prob)")
+    parser.add_argument("--workers", type=int, default=1, help="processes building shards")
+    args = parser.parse_args()
+
+    print(f"Building {args.shards} {args.kind} shards in {args.directory} from {args.data_file}...")
+    start = time.time()
+    failed = ShardedFilter.build(args.data_file, args.directory, args.kind, args.shards, args.fp_prob,
+                                 args.fingerprint_size, workers=args.workers)
+    manifest = read_manifest(args.directory)
+    print(f"Stored {manifest['count']} usernames ({failed} failed) in {time.time() - start:.2f} seconds.")
@@ -0,0 +1,283 @@
+import os
+import threading
+import time
+import filterfile
+from bloomfilter import BloomFilter, BlockedBloomFilter
+from cuckoofilter import CuckooFilter
+
+# Hot-swappable filter snapshots.
+#
+# A SnapshotManager stands in for a filter. Readers go through one attribute, _snapshot,
+# which holds the current filter and its bound lookup methods, and never take a lock:
+# replacing the attribute is atomic, so a call sees either the old or the new snapshot.
+# A rebuilt filter file is mapped and checked (header and payload checksum, which also
+# reads every page into the page cache) off the request path, and only then swapped in.
+# Calls still running on the old snapshot hold a reference to it, so its mapping is
+# released when the last of them returns. Names added since the current snapshot was
+# loaded are replayed into the new one before the swap, so a registration made while a
+# rebuild was in flight is never lost. Up to MAX_PENDING of them are kept between two
+# swaps; a swap that could not replay them all (too many, or a full cuckoo table) is
+# refused, and the old snapshot, which holds every name, stays.
+POLL_INTERVAL = 5.0  # seconds between checks of the filter file in watch()
+MAX_PENDING = 1_000_000  # names kept for replay between two swaps
+
+FILTER_CLASSES = {
+    filterfile.KIND_BLOOM: BloomFilter,
+    filterfile.KIND_CUCKOO: CuckooFilter,
+    filterfile.KIND_BLOCKED_BLOOM: BlockedBloomFilter,
+}
+
+
+class Snapshot:
+    """
+    One loaded filter with its lookup and insert methods bound once.
+
+    Attributes:
+        filter: The BloomFilter, BlockedBloomFilter or CuckooFilter.
+        filename (str): File the filter was loaded from.
+        generation (int): 1 for the first snapshot, incremented by every swap.
+        file_id (tuple): (inode, mtime, size) of the file when it was loaded.
+    """
+
+    def __init__(self, filter, filename, generation, file_id):
+        self.filter = filter
+        self.filename = filename
+        self.generation = generation
+        self.file_id = file_id
+        # Bloom filters expose check/add, cuckoo filters contains/insert.
+        self.check = getattr(filter, 'check', None) or filter.contains
+        self.check_many = getattr(filter, 'check_many', None) or filter.contains_many
+        self.add = getattr(filter, 'add', None) or filter.insert
+
+
+def _file_id(filename):
+    stat = os.stat(filename)
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+def filter_class(filename):
+    """
+    Returns the filter class (BloomFilter, BlockedBloomFilter or CuckooFilter) of a saved
+    filter file, from its header.
+
+    Raises:
+        filterfile.FilterFileError: If the file holds another kind, such as the static
+            fingerprint set or xor filter, which cannot take new names.
+    """
+    with open(filename, 'rb') as f:
+        header, _, _ = filterfile.unpack_header(f.read(filterfile.HEADER_SIZE))
+    if header.kind not in FILTER_CLASSES:
+        static = header.kind in (filterfile.KIND_FINGERPRINTS, filterfile.KIND_XOR)
+        raise filterfile.FilterFileError(
+            f"{filename} holds unsupported filter kind {header.kind}"
+            + (" (a static structure that cannot take new names)" if static else "")
+            + f", expected one of {sorted(FILTER_CLASSES)}")
+    return FILTER_CLASSES[header.kind]
+
+
+def load_snapshot_filter(filename, mode='c', verify=True):
+    """
+    Opens a saved Bloom, blocked Bloom or cuckoo filter, whichever kind the file holds.
+
+    Parameters:
+        filename (str): Path of the filter file.
+        mode (str): Load mode, 'c' (copy-on-write, so adds stay in memory) or 'r'.
+        verify (bool): Check the payload checksum.
+
+    Returns:
+        The loaded filter.
+
+    Raises:
+        filterfile.FilterFileError: If the file holds an unsupported filter kind.
+    """
+    return filter_class(filename).load(filename, mode=mode, verify=verify)
+
+
+class SnapshotManager:
+    """
+    A filter that can be replaced by a rebuilt one while it is being queried.
+
+    Attributes:
+        filename (str): Filter file that reload() and watch() load by default.
+        mode (str): Load mode of every snapshot.
+        last_error (Exception): Why the last reload failed, or None.
+        max_pending (int): Names added since the last swap that are kept for replay.
+        stats (dict): Swaps made, failed reloads, names a swap could not replay (the swap
+            is then refused), names added beyond max_pending and the duration of the last load.
+    """
+
+    def __init__(self, filename, mode='c', max_pending=MAX_PENDING):
+        """
+        Loads the first snapshot (verifying its checksum).
+
+        Parameters:
+            filename (str): Path of the filter file.
+            mode (str): 'c' to allow add()/insert() in memory, 'r' for a read-only filter.
+            max_pending (int): Names added between two swaps that are kept for replay.
+                Past it, adds still reach the current snapshot, but no later file can
+                be swapped in without losing them, so reloads are refused.
+        """
+        self.filename = filename
+        self.mode = mode
+        self.max_pending = max_pending
+        self.last_error = None
+        self.stats = {'swaps': 0, 'failed_reloads': 0, 'failed_replays': 0, 'unreplayable_adds': 0,
+                      'last_load_seconds': 0.0}
+        self._write_lock = threading.Lock()
+        # Names added since the current snapshot was loaded, cleared by the next swap.
+        self._added = []
+        self._watcher = None
+        self._stop_watching = threading.Event()
+        self._snapshot = self._load(filename, generation=1)
+
+    @property
+    def current(self):
+        """
+        The filter of the current snapshot.
+        """
+        return self._snapshot.filter
+
+    @property
+    def generation(self):
+        return self._snapshot.generation
+
+    # Readers: one attribute read, no lock.
+    def check(self, item):
+        return self._snapshot.check(item)
+
+    def check_many(self, items):
+        return self._snapshot.check_many(items)
+
+    contains = check
+    contains_many = check_many
+
+    def add(self, item):
+        """
+        Adds an item to the current snapshot. Items added between two swaps are replayed
+        into the next snapshot, so they survive a reload.
+        """
+        with self._write_lock:
+            if len(self._added) < self.max_pending:
+                self._added.append(item)
+            else:
+                self.stats['unreplayable_adds'] += 1
+            return self._snapshot.add(item)
+
+    insert = add
+
+    def _load(self, filename, generation):
+        start = time.perf_counter()
+        file_id = _file_id(filename)
+        snapshot = Snapshot(load_snapshot_filter(filename, self.mode, verify=True), filename, generation, file_id)
+        self.stats['last_load_seconds'] = time.perf_counter() - start
+        return snapshot
+
+    def reload(self, filename=None):
+        """
+        Loads and verifies a filter file, then swaps it in. The calling thread does the
+        loading; lookups keep being answered by the old snapshot meanwhile.
+
+        Parameters:
+            filename (str): Filter file to load (default: self.filename).
+
+        Returns:
+            int: The generation of the new snapshot.
+
+        Raises:
+            OSError, FilterFileError: If the file cannot be loaded, or cannot take every
+                name added since the last swap; the old snapshot stays.
+        """
+        filename = filename or self.filename
+        try:
+            snapshot = self._load(filename, self._snapshot.generation + 1)
+            with self._write_lock:
+                self._replay(snapshot)
+                self._added = []
+                self._snapshot = snapshot
+        except (OSError, filterfile.FilterFileError) as error:
+            self.stats['failed_reloads'] += 1
+            self.last_error = error
+            raise
+        self.filename = filename
+        self.last_error = None
+        self.stats['swaps'] += 1
+        return snapshot.generation
+
+    def _replay(self, snapshot):
+        """
+        Adds the names added since the last swap to a new snapshot, under the write lock.
+        """
+        if self.stats['unreplayable_adds']:
+            raise filterfile.FilterFileError(
+                f"{self.stats['unreplayable_adds']} names added since snapshot {self._snapshot.generation} "
+                f"exceed max_pending ({self.max_pending}) and would be lost; restart to load {snapshot.filename}")
+        failed = 0
+        for item in self._added:
+            # A cuckoo filter would store a name twice, so replay only what the rebuild lacks.
+            if not snapshot.check(item) and snapshot.add(item) is False:
+                failed += 1
+        if failed:
+            self.stats['failed_replays'] += failed
+            raise filterfile.FilterFileError(f"{snapshot.filename} is full: {failed} of the names added "
+                                             f"since snapshot {self._snapshot.generation} did not fit")
+
+    def reload_async(self, filename=None):
+        """
+        Runs reload() in a background thread.
+
+        Returns:
+            threading.Thread: The loading thread; failures end up in last_error.
+        """
+        def run():
+            try:
+                self.reload(filename)
+            except (OSError, filterfile.FilterFileError) as error:
+                print(f"Keeping snapshot {self._snapshot.generation}: {error}")
+
+        thread = threading.Thread(target=run, name="snapshot-reload", daemon=True)
+        thread.start()
+        return thread
+
+    def changed(self):
+        """
+        Returns True if the filter file was replaced since the current snapshot was loaded.
+        """
+        try:
+            return _file_id(self.filename) != self._snapshot.file_id
+        except OSError:
+            return False
+
+    def watch(self, interval=POLL_INTERVAL):
+        """
+        Starts a background thread that reloads the filter whenever its file is replaced,
+        e.g. by filter_initializer.py writing a rebuilt filter (files are renamed into
+        place, so a half-written file is never seen).
+        """
+        def run():
+            rejected = None  # a file that failed to load is not retried until it changes again
+            while not self._stop_watching.wait(interval):
+                if self.changed():
+                    try:
+                        file_id = _file_id(self.filename)
+                        if file_id == rejected:
+                            continue
+                        generation = self.reload()
+                        print(f"Swapped in snapshot {generation} from {self.filename} "
+                              f"({self.stats['last_load_seconds']:.2f} seconds to load)")
+                    except (OSError, filterfile.FilterFileError) as error:
+                        rejected = file_id
+                        print(f"Keeping snapshot {self._snapshot.generation}: {error}")
+
+        if self._watcher is None:
+            self._stop_watching.clear()
+            self._watcher = threading.Thread(target=run, name="snapshot-watch", daemon=True)
+            self._watcher.start()
+
+    def stop(self):
+        """
+        Stops the watch() thread, if any.
+        """
+        if self._watcher is not None:
+            self._stop_watching.set()
+            self._watcher.join()
+            self._watcher = None
@@ -0,0 +1,284 @@
+import argparse
+import heapq
+import mmap
+import os
+import struct
+import tempfile
+import time
+from bisect import bisect_left, bisect_right
+import numpy as np
+from usernamesource import UsernameSource
+
+# File layout (all sections 8-byte aligned):
+#   64-byte header | offsets (count + 1, uint32 or uint64) | sparse index (uint64) | blob
+# The blob holds every username, UTF-8 encoded, sorted and concatenated; username i is
+# blob[offsets[i]:offsets[i + 1]]. The sparse index holds the first 8 bytes (as a
+# big-endian integer) of every stride-th username, so a lookup narrows to one block of
+# stride usernames with a search over a few hundred KB before touching the blob.
+MAGIC = b'LCSORTED'
+VERSION = 1
+# magic, version, offset width, stride, count, sparse count, offsets at, sparse at, blob at, blob length
+HEADER = struct.Struct('<8sHHIQQQQQQ')
+HEADER_SIZE = 64
+
+RUN_SIZE = 1_000_000  # usernames sorted in memory per run
+STRIDE = 64
+
+
+def _prefix(key):
+    """
+    Returns the first 8 bytes of a key as a big-endian integer, which orders like the key.
+    """
+    return int.from_bytes(key[:8].ljust(8, b"\0"), 'big')
+
+
+def _align(f):
+    """
+    Pads a file being written to the next multiple of 8 bytes and returns the position.
+    """
+    pad = -f.tell() % 8
+    f.write(b"\0" * pad)
+    return f.tell()
+
+
+def _write_runs(source, tmp_dir, run_size):
+    """
+    Sorts the usernames of a source in runs of run_size and writes each run to its own file.
+    """
+    runs = []
+    for batch in source.batches(run_size, decode=False):
+        batch.sort()
+        path = os.path.join(tmp_dir, f"run_{len(runs)}.txt")
+        with open(path, 'wb') as f:
+            f.write(b"\n".join(batch))
+            f.write(b"\n")
+        runs.append(path)
+    return runs
+
+
+def _read_run(path):
+    with open(path, 'rb', buffering=1 << 20) as f:
+        for line in f:
+            yield line[:-1]
+
+
+def build_sorted_index(data_file, index_file, run_size=RUN_SIZE, stride=STRIDE, tmp_dir=None):
+    """
+    Builds a sorted index from a username file with an external merge sort, so files larger
+    than memory can be indexed: sorted runs are spilled to disk and then merged in one pass.
+    Duplicate usernames are stored once.
+
+    Parameters:
+        data_file (str): Username file, one username per line.
+        index_file (str): Path of the index to write.
+        run_size (int): Number of usernames sorted in memory at a time.
+        stride (int): One username out of stride goes into the sparse index.
+        tmp_dir (str): Directory for the temporary runs (default: next to index_file).
+
+    Returns:
+        int: The number of distinct usernames indexed.
+    """
+    if tmp_dir is None:
+        tmp_dir = os.path.dirname(os.path.abspath(index_file))
+    with tempfile.TemporaryDirectory(dir=tmp_dir) as tmp:
+        runs = _write_runs(UsernameSource(data_file), tmp, run_size)
+
+        # Merge the runs, streaming the blob and the offsets to their own files.
+        count, blob_length, previous = 0, 0, None
+        sparse = []
+        offsets_path, blob_path = os.path.join(tmp, "offsets.bin"), os.path.join(tmp, "blob.bin")
+        with open(offsets_path, 'wb') as offsets_file, open(blob_path, 'wb', buffering=1 << 20) as blob_file:
+            pending = [0]
+            for key in heapq.merge(*(_read_run(path) for path in runs)):
+                if key == previous:
+                    continue
+                if count % stride == 0:
+                    sparse.append(_prefix(key))
+                blob_file.write(key)
+                blob_length += len(key)
+                pending.append(blob_length)
+                if len(pending) >= run_size:
+                    offsets_file.write(np.array(pending, dtype=np.uint64).tobytes())
+                    pending = []
+                count += 1
+                previous = key
+            offsets_file.write(np.array(pending, dtype=np.uint64).tobytes())
+
+        offset_dtype = np.uint32 if blob_length < 2 ** 32 else np.uint64
+        tmp_index = f"{index_file}.tmp"
+        with open(tmp_index, 'wb') as f:
+            f.write(b"\0" * HEADER_SIZE)
+            offsets_at = _align(f)
+            all_offsets = np.memmap(offsets_path, dtype=np.uint64, mode='r')
+            for i in range(0, len(all_offsets), run_size):
+                f.write(all_offsets[i:i + run_size].astype(offset_dtype).tobytes())
+            del all_offsets
+            sparse_at = _align(f)
+            f.write(np.array(sparse, dtype=np.uint64).tobytes())
+            blob_at = _align(f)
+            with open(blob_path, 'rb') as blob_file:
+                while True:
+                    block = blob_file.read(1 << 24)
+                    if not block:
+                        break
+                    f.write(block)
+            f.seek(0)
+            f.write(HEADER.pack(MAGIC, VERSION, np.dtype(offset_dtype).itemsize, stride, count,
+                                len(sparse), offsets_at, sparse_at, blob_at, blob_length))
+        os.replace(tmp_index, index_file)
+    return count
+
+
+class SortedIndex:
+    """
+    Read-only, memory-mapped sorted username index built by build_sorted_index().
+
+    Opening the index only maps the file; lookups binary search the sparse index and then
+    one block of stride usernames in the blob, for O(log n) membership tests and ordered scans.
+
+    Attributes:
+        filename (str): Path of the index file.
+        stride (int): Number of usernames per sparse index entry.
+    """
+
+    def __init__(self, filename):
+        """
+        Opens and maps an index file.
+
+        Parameters:
+            filename (str): Path of the index file.
+        """
+        self.filename = filename
+        with open(filename, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, width, self.stride, self._count, sparse_count,
+         offsets_at, sparse_at, self._blob_at, _) = HEADER.unpack_from(self._map)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{filename} is not a sorted username index (version {VERSION})")
+        self._offsets = np.frombuffer(self._map, dtype=f'<u{width}', count=self._count + 1, offset=offsets_at)
+        self._sparse = np.frombuffer(self._map, dtype='<u8', count=sparse_count, offset=sparse_at)
+        # Scalar lookups index plain memoryviews, which return Python ints much faster than
+        # numpy scalar indexing (the file is little-endian, like the hosts we run on).
+        view = memoryview(self._map)
+        self._offsets_view = view[offsets_at:offsets_at + width * (self._count + 1)].cast('I' if width == 4 else 'Q')
+        self._sparse_view = view[sparse_at:sparse_at + 8 * sparse_count].cast('Q')
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, i):
+        """
+        Returns the i-th username in sorted order.
+        """
+        return self._key(i).decode('utf-8')
+
+    def __contains__(self, name):
+        return self.contains(name)
+
+    def _key(self, i):
+        offsets = self._offsets_view
+        return self._map[self._blob_at + offsets[i]:self._blob_at + offsets[i + 1]]
+
+    def _block(self, prefix):
+        """
+        Returns the [lo, hi) range of positions the lower bound of a key with this prefix can take.
+        """
+        lo = max(bisect_left(self._sparse_view, prefix) - 1, 0) * self.stride
+        hi = min(bisect_right(self._sparse_view, prefix) * self.stride, self._count)
+        return lo, hi
+
+    def _lower_bound(self, key, lo, hi):
+        """
+        Returns the position of the first username >= key (as UTF-8 bytes) within [lo, hi].
+        """
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _find(self, key):
+        return self._lower_bound(key, *self._block(_prefix(key)))
+
+    def contains(self, name):
+        """
+        Checks whether a username is in the index.
+
+        Parameters:
+            name (str): The username to search for.
+
+        Returns:
+            bool: True if the username is present, False otherwise.
+        """
+        key = name.encode('utf-8')
+        i = self._find(key)
+        return i < self._count and self._key(i) == key
+
+    def contains_many(self, names):
+        """
+        Checks a batch of usernames, narrowing all of them through the sparse index at once.
+
+        Parameters:
+            names: An iterable of usernames.
+
+        Returns:
+            numpy.ndarray: A bool array, True where the username is present.
+        """
+        keys = [name.encode('utf-8') for name in names]
+        padded = b"".join(key[:8].ljust(8, b"\0") for key in keys)
+        prefixes = np.frombuffer(padded, dtype='>u8').astype(np.uint64)
+        los = np.maximum(np.searchsorted(self._sparse, prefixes, side='left') - 1, 0) * self.stride
+        his = np.minimum(np.searchsorted(self._sparse, prefixes, side='right') * self.stride, self._count)
+        found = np.zeros(len(keys), dtype=bool)
+        for j, (key, lo, hi) in enumerate(zip(keys, los.tolist(), his.tolist())):
+            i = self._lower_bound(key, lo, hi)
+            found[j] = i < self._count and self._key(i) == key
+        return found
+
+    def range(self, low=None, high=None):
+        """
+        Yields the usernames in [low, high) in sorted order.
+
+        Parameters:
+            low (str): First username of the scan, or None to start at the beginning.
+            high (str): Username ending the scan (excluded), or None to scan to the end.
+        """
+        i = 0 if low is None else self._find(low.encode('utf-8'))
+        high = None if high is None else high.encode('utf-8')
+        while i < self._count:
+            key = self._key(i)
+            if high is not None and key >= high:
+                break
+            yield key.decode('utf-8')
+            i += 1
+
+    def prefix(self, prefix):
+        """
+        Yields the usernames starting with prefix in sorted order.
+
+        Parameters:
+            prefix (str): The prefix to scan for.
+        """
+        key = prefix.encode('utf-8')
+        i = self._find(key)
+        while i < self._count:
+            name = self._key(i)
+            if not name.startswith(key):
+                break
+            yield name.decode('utf-8')
+            i += 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build a sorted username index with an external sort.")
+    parser.add_argument("data_file", help="username file, one username per line")
+    parser.add_argument("index_file", help="index file to write")
+    parser.add_argument("--run-size", type=int, default=RUN_SIZE, help="usernames sorted in memory per run")
+    args = parser.parse_args()
+
+    print(f"Building sorted index {args.index_file} from {args.data_file}...")
+    start = time.time()
+    count = build_sorted_index(args.data_file, args.index_file, run_size=args.run_size)
+    print(f"Indexed {count} usernames in {time.time() - start:.2f} seconds.")
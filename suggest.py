@@ -0,0 +1,181 @@
+import argparse
+import random
+import re
+import time
+
+# Suggestions for a taken username.
+#
+# Candidate variants are generated a batch at a time, cheapest and most natural first:
+# separators and small numbers, then years, then Faker-style patterns (prefixes, initials,
+# separators between words), then random numeric suffixes whose width grows with every
+# batch so the candidate space never runs out. Each batch is checked with one
+# LoginChecker.is_available_many call: the front filter screens the whole batch and only
+# its "maybe taken" names reach the exact store. Most candidates are free, so the first
+# batch or two usually suffice whatever the number of registered users.
+BATCH_SIZE = 256
+DEADLINE = 0.05  # seconds
+SEPARATORS = ("_", ".", "")
+PREFIXES = ("the", "real", "its", "im", "hey", "mr", "ms", "official")
+SUFFIXES = ("official", "dev", "online", "hq", "app", "x")
+
+
+def normalize(name):
+    """
+    Returns the base a username's variants are built from: lower case, without the
+    numeric suffix (as in "jsmith_42") and without characters other than letters,
+    digits, '_' and '.'.
+    """
+    base = re.sub(r"[^a-z0-9_.]", "", name.lower())
+    return re.sub(r"[_.]?\d+$", "", base) or base or "user"
+
+
+def generate_candidates(name, rng=None):
+    """
+    Yields an endless stream of variants of a username, most natural first.
+
+    Parameters:
+        name (str): The requested username.
+        rng (random.Random): Source of the random variants (default: a new unseeded one).
+    """
+    rng = rng or random.Random()
+    base = normalize(name)
+    words = [word for word in re.split(r"[_.]", base) if word]
+
+    for n in range(1, 10):
+        for sep in SEPARATORS:
+            yield f"{base}{sep}{n}"
+    for year in range(time.localtime().tm_year, 1969, -1):
+        yield f"{base}{year}"
+        yield f"{base}{year % 100:02d}"
+    for affix in PREFIXES:
+        yield f"{affix}{base}"
+        yield f"{affix}_{base}"
+    for affix in SUFFIXES:
+        yield f"{base}_{affix}"
+    if len(words) > 1:
+        for sep in SEPARATORS:
+            yield sep.join(words)
+            yield sep.join(reversed(words))
+        yield words[0][0] + "".join(words[1:])
+
+    # Random numeric suffixes, one digit wider every BATCH_SIZE candidates.
+    digits = 2
+    while True:
+        for _ in range(BATCH_SIZE):
+            sep = rng.choice(SEPARATORS)
+            yield f"{base}{sep}{rng.randrange(10 ** (digits - 1), 10 ** digits)}"
+        digits = min(digits + 1, 12)
+
+
+class SuggestionEngine:
+    """
+    Suggests available usernames close to a taken one.
+
+    Attributes:
+        checker (LoginChecker): Answers which candidates are available.
+        batch_size (int): Candidates checked per is_available_many call.
+        deadline (float): Default latency budget of a suggest() call, in seconds.
+        stats (dict): Calls, batches and candidates checked, and calls that ran out of time.
+    """
+
+    def __init__(self, checker, batch_size=BATCH_SIZE, deadline=DEADLINE, seed=None):
+        """
+        Initializes the engine.
+
+        Parameters:
+            checker (LoginChecker): The checker holding every taken name.
+            batch_size (int): Candidates checked per batch.
+            deadline (float): Default latency budget in seconds.
+            seed (int): Seed of the random variants, for reproducible suggestions.
+        """
+        self.checker = checker
+        self.batch_size = batch_size
+        self.deadline = deadline
+        self._rng = random.Random(seed)
+        self.stats = {'calls': 0, 'batches': 0, 'candidates': 0, 'timeouts': 0}
+
+    def suggest(self, name, count=5, deadline=None):
+        """
+        Returns up to count available variants of a username, most natural first.
+
+        Every returned name was available when it was checked (a concurrent registration
+        can still take it before the user does). Fewer than count names are returned only
+        if the latency budget runs out first.
+
+        Parameters:
+            name (str): The requested (usually taken) username.
+            count (int): Number of suggestions wanted.
+            deadline (float): Latency budget in seconds (default: self.deadline).
+
+        Returns:
+            list: The suggested usernames.
+        """
+        search = self._search(name, count, deadline)
+        try:
+            batch = next(search)
+            while True:
+                # Candidates are not cached: they would evict names users actually look up.
+                batch = search.send(self.checker.is_available_many(batch, cache=False))
+        except StopIteration as done:
+            return done.value
+
+    async def suggest_async(self, name, check_many, count=5, deadline=None):
+        """
+        Same as suggest(), but each batch is checked by awaiting check_many(batch), which
+        returns a bool array like LoginChecker.is_available_many. A server uses it to run
+        the checks on the thread that owns the checker.
+        """
+        search = self._search(name, count, deadline)
+        try:
+            batch = next(search)
+            while True:
+                batch = search.send(await check_many(batch))
+        except StopIteration as done:
+            return done.value
+
+    def _search(self, name, count, deadline):
+        """
+        Generator behind suggest(): yields batches of candidates, is sent back whether
+        each is free, and returns the suggestions.
+        """
+        self.stats['calls'] += 1
+        stop_at = time.perf_counter() + (self.deadline if deadline is None else deadline)
+        candidates = generate_candidates(name, self._rng)
+        seen = {name}
+        suggestions = []
+        while len(suggestions) < count:
+            batch = []
+            for candidate in candidates:
+                if candidate not in seen:
+                    seen.add(candidate)
+                    batch.append(candidate)
+                    if len(batch) == self.batch_size:
+                        break
+            free = yield batch
+            self.stats['batches'] += 1
+            self.stats['candidates'] += len(batch)
+            suggestions.extend(candidate for candidate, is_free in zip(batch, free.tolist()) if is_free)
+            if len(suggestions) < count and time.perf_counter() >= stop_at:
+                self.stats['timeouts'] += 1
+                break
+        return suggestions[:count]
+
+
+if __name__ == "__main__":
+    from checkserver import open_exact_store, open_filter_file
+    from loginchecker import LoginChecker
+
+    parser = argparse.ArgumentParser(description="Suggest available usernames close to the requested ones.")
+    parser.add_argument("names", nargs="+", help="requested usernames")
+    parser.add_argument("--filter", required=True, help="saved filter file (any kind)")
+    parser.add_argument("--store", required=True, help="sorted index (.idx) or username file")
+    parser.add_argument("--count", type=int, default=5, help="suggestions per name")
+    parser.add_argument("--deadline-ms", type=float, default=DEADLINE * 1000, help="latency budget per name")
+    args = parser.parse_args()
+
+    engine = SuggestionEngine(LoginChecker(open_filter_file(args.filter), open_exact_store(args.store)))
+    for requested in args.names:
+        start = time.perf_counter()
+        suggestions = engine.suggest(requested, args.count, args.deadline_ms / 1000)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"{requested}: {', '.join(suggestions)} ({elapsed:.2f} ms)")
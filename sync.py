@@ -0,0 +1,314 @@
+import argparse
+import os
+import struct
+import time
+import zlib
+from collections import deque
+import numpy as np
+from cuckoofilter import CuckooFilter
+from snapshots import load_snapshot_filter
+
+# Merging filters and keeping replicas in sync with small deltas.
+#
+# Two filters are compatible when they were built with the same kind, hash seed and
+# geometry, so the same name maps to the same bits or buckets in both. Compatible Bloom
+# filters merge by ORing their bit arrays; compatible cuckoo filters merge by inserting
+# the fingerprints one holds and the other lacks, which only looks at the buckets where
+# they differ.
+#
+# A delta carries the units that changed between two versions of a filter: 64-bit words
+# of a Bloom bit array, or whole buckets of a cuckoo table, with their new contents. Its
+# size follows the number of changed units (new signups), not the size of the filter.
+# File layout:
+#   48-byte header: magic, filter kind, checksum of the filter parameters, from version,
+#                   to version, number of units, checksum of the body
+#   body (zlib):    gaps between the sorted unit indices (uint64), then the unit contents
+# A Bloom delta is applied by ORing the words in, so it never clears bits the replica set
+# on its own; a cuckoo delta overwrites the buckets, so cuckoo replicas are read-only
+# followers of the node that produces the deltas.
+MAGIC = b'LCFDELTA'
+HEADER = struct.Struct('<8sHxxIQQQI4x')
+HISTORY = 64  # versions whose changes a DeltaTracker keeps for delta_since()
+
+
+class IncompatibleFiltersError(ValueError):
+    """
+    Raised when filters (or a filter and a delta) were built with different parameters.
+    """
+
+
+def parameters(filter):
+    """
+    Returns the parameters that must be equal for two filters to be merged or synced.
+    """
+    seed = getattr(filter.hasher, 'seed', None)
+    if isinstance(filter, CuckooFilter):
+        return (filter.kind, type(filter.hasher).__name__, seed,
+                filter.capacity, filter.bucket_size, filter.fingerprint_size)
+    return filter.kind, type(filter.hasher).__name__, seed, filter.size, filter.hash_count
+
+
+def _parameters_checksum(filter):
+    return zlib.crc32(repr(parameters(filter)).encode())
+
+
+def check_compatible(a, b):
+    """
+    Raises IncompatibleFiltersError, naming the differences, unless a and b can be merged.
+    """
+    pa, pb = parameters(a), parameters(b)
+    if pa != pb:
+        raise IncompatibleFiltersError(f"Filters differ: {pa} != {pb}")
+
+
+def compatible(a, b):
+    """
+    Returns True if a and b can be merged.
+    """
+    return parameters(a) == parameters(b)
+
+
+def _units(filter):
+    """
+    Returns the filter's table as an array of sync units: 64-bit words of a Bloom bit
+    array (which is padded to whole words), or rows of a cuckoo table. Writing to the
+    array writes to the filter.
+    """
+    if isinstance(filter, CuckooFilter):
+        return filter.buckets
+    return np.frombuffer(filter.bit_array, dtype='<u8')
+
+
+def _changed(old, new):
+    """
+    Returns the indices of the units that differ between two unit arrays.
+    """
+    differ = old != new
+    if differ.ndim > 1:
+        differ = differ.any(axis=1)
+    return np.flatnonzero(differ)
+
+
+def merge(target, other):
+    """
+    Adds every item of other to target, in place. Cuckoo tables are merged as sets of
+    fingerprints: a fingerprint both tables hold for the same bucket pair is kept as many
+    times as the table holding it most often does.
+
+    Parameters:
+        target: A writable BloomFilter, BlockedBloomFilter or CuckooFilter.
+        other: A compatible filter.
+
+    Returns:
+        int: The number of fingerprints that did not fit (always 0 for Bloom filters).
+    """
+    check_compatible(target, other)
+    if not isinstance(target, CuckooFilter):
+        target.bit_array |= other.bit_array
+        return 0
+
+    # A fingerprint lives in one of two buckets; compare how often each (pair, fingerprint)
+    # occurs in both tables and insert what target is missing. Buckets that are equal in
+    # both tables can only hold keys whose other bucket differs, so they are reached from it.
+    seen = set()
+    failed = 0
+    for bucket in _changed(target.buckets, other.buckets).tolist():
+        for fp in set(other.buckets[bucket].tolist()) - {0}:
+            pair = tuple(sorted((bucket, target._index2(bucket, fp))))
+            if (pair, fp) in seen:
+                continue
+            seen.add((pair, fp))
+            rows = set(pair)
+            missing = sum(other.buckets[row].tolist().count(fp) for row in rows) \
+                - sum(target.buckets[row].tolist().count(fp) for row in rows)
+            for _ in range(missing):
+                if not target._insert_fingerprint(fp, bucket):
+                    failed += 1
+    return failed
+
+
+def union(a, b):
+    """
+    Returns a new filter holding the items of both a and b, which are left unchanged.
+    """
+    check_compatible(a, b)
+    result = type(a).__new__(type(a))
+    result.__dict__.update(a.__dict__)
+    if isinstance(a, CuckooFilter):
+        result.buckets = a.buckets.copy()
+    else:
+        result.bit_array = a.bit_array.copy()
+    merge(result, b)
+    return result
+
+
+def encode_delta(filter, indices, values, from_version, to_version):
+    """
+    Encodes changed units of a filter as a delta.
+
+    Parameters:
+        filter: The filter the delta applies to (only its parameters are used).
+        indices (numpy.ndarray): Sorted indices of the changed units.
+        values (numpy.ndarray): Their contents at to_version.
+        from_version (int): Version the receiver must be at.
+        to_version (int): Version the receiver is at after applying it.
+
+    Returns:
+        bytes: The delta.
+    """
+    indices = np.asarray(indices, dtype=np.uint64)
+    gaps = np.diff(indices, prepend=np.uint64(0)).astype('<u8')
+    values = np.ascontiguousarray(values.astype(values.dtype.newbyteorder('<'), copy=False))
+    body = zlib.compress(gaps.tobytes() + values.tobytes())
+    header = HEADER.pack(MAGIC, filter.kind, _parameters_checksum(filter),
+                         from_version, to_version, len(indices), zlib.crc32(body))
+    return header + body
+
+
+def read_delta_header(data):
+    """
+    Decodes the header of a delta.
+
+    Returns:
+        tuple: (kind, parameters checksum, from version, to version, number of units).
+    """
+    if len(data) < HEADER.size:
+        raise ValueError("Delta is too short to hold a header")
+    magic, kind, params, from_version, to_version, count, checksum = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("Not a filter delta (bad magic)")
+    if zlib.crc32(data[HEADER.size:]) != checksum:
+        raise ValueError("Delta failed its checksum")
+    return kind, params, from_version, to_version, count
+
+
+def apply_delta(filter, data, version=None):
+    """
+    Applies a delta to a replica, in place.
+
+    Parameters:
+        filter: A writable filter compatible with the one the delta was made from.
+        data (bytes): The delta.
+        version (int): Version of the replica; if given, a delta that starts after it
+            (which would leave a gap) is refused.
+
+    Returns:
+        int: The version of the replica after the delta.
+    """
+    kind, params, from_version, to_version, count = read_delta_header(data)
+    if kind != filter.kind or params != _parameters_checksum(filter):
+        raise IncompatibleFiltersError("Delta was made from a filter with different parameters")
+    if version is not None and from_version > version:
+        raise ValueError(f"Delta starts at version {from_version}, replica is at {version}")
+    units = _units(filter)
+    body = zlib.decompress(data[HEADER.size:])
+    indices = np.cumsum(np.frombuffer(body, dtype='<u8', count=count)).astype(np.intp)
+    values = np.frombuffer(body, dtype=units.dtype.newbyteorder('<'), offset=8 * count)
+    if isinstance(filter, CuckooFilter):
+        units[indices] = values.reshape(count, filter.bucket_size)
+    else:
+        units[indices] |= values
+    return to_version
+
+
+def diff(old, new, from_version=0, to_version=1):
+    """
+    Returns the delta that turns filter old into filter new (two versions of one filter).
+    """
+    check_compatible(old, new)
+    new_units = _units(new)
+    indices = _changed(_units(old), new_units)
+    return encode_delta(new, indices, new_units[indices], from_version, to_version)
+
+
+class DeltaTracker:
+    """
+    Versions a live filter and produces the delta since any recent version.
+
+    commit() compares the filter with a private copy of its table as of the last commit,
+    so changes made by any path (add_many, evictions, deletes) are caught. The copy costs
+    as much memory as the table.
+
+    Attributes:
+        filter: The tracked filter.
+        version (int): Version of the last commit (0 when tracking starts).
+    """
+
+    def __init__(self, filter, history=HISTORY):
+        """
+        Starts tracking a filter at version 0.
+
+        Parameters:
+            filter: The filter to track.
+            history (int): Number of commits whose changes are kept.
+        """
+        self.filter = filter
+        self.version = 0
+        self._baseline = _units(filter).copy()
+        self._changes = deque(maxlen=history)  # (version, indices changed by that commit)
+
+    def commit(self):
+        """
+        Records the changes since the last commit as a new version, if there are any.
+
+        Returns:
+            int: The current version.
+        """
+        live = _units(self.filter)
+        changed = _changed(self._baseline, live)
+        if len(changed):
+            self._baseline[changed] = live[changed]
+            self.version += 1
+            self._changes.append((self.version, changed))
+        return self.version
+
+    def delta_since(self, version):
+        """
+        Returns the delta from version to the current version, or None if version is older
+        than the kept history (the replica then needs the full filter).
+        """
+        if version > self.version:
+            raise ValueError(f"Version {version} is newer than the tracker's {self.version}")
+        oldest = self._changes[0][0] - 1 if self._changes else self.version
+        if version < oldest:
+            return None
+        parts = [changed for v, changed in self._changes if v > version]
+        indices = np.unique(np.concatenate(parts)) if parts else np.empty(0, dtype=np.intp)
+        return encode_delta(self.filter, indices, self._baseline[indices], version, self.version)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Merge filter files and sync them with deltas.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    merge_parser = commands.add_parser("merge", help="merge compatible filters into one file")
+    merge_parser.add_argument("output", help="filter file to write")
+    merge_parser.add_argument("inputs", nargs="+", help="filter files to merge")
+    diff_parser = commands.add_parser("diff", help="write the delta between two versions of a filter")
+    diff_parser.add_argument("old", help="filter file the replica holds")
+    diff_parser.add_argument("new", help="newer version of the same filter")
+    diff_parser.add_argument("delta", help="delta file to write")
+    apply_parser = commands.add_parser("apply", help="apply a delta to a filter file")
+    apply_parser.add_argument("filter", help="filter file to update")
+    apply_parser.add_argument("delta", help="delta file")
+    apply_parser.add_argument("--output", help="filter file to write (default: update the filter file)")
+    args = parser.parse_args()
+
+    start = time.time()
+    if args.command == "merge":
+        merged = load_snapshot_filter(args.inputs[0], mode='c')
+        failed = sum(merge(merged, load_snapshot_filter(name, mode='r')) for name in args.inputs[1:])
+        merged.save(args.output)
+        print(f"Merged {len(args.inputs)} filters into {args.output} ({failed} fingerprints did not fit) "
+              f"in {time.time() - start:.2f} seconds.")
+    elif args.command == "diff":
+        delta = diff(load_snapshot_filter(args.old, mode='r'), load_snapshot_filter(args.new, mode='r'))
+        with open(args.delta, 'wb') as f:
+            f.write(delta)
+        print(f"Wrote {read_delta_header(delta)[4]} changed units in {len(delta)} bytes "
+              f"({os.path.getsize(args.new)} bytes for the full filter) in {time.time() - start:.2f} seconds.")
+    else:
+        replica = load_snapshot_filter(args.filter, mode='c')
+        with open(args.delta, 'rb') as f:
+            apply_delta(replica, f.read())
+        replica.save(args.output or args.filter)
+        print(f"Applied {args.delta} to {args.output or args.filter} in {time.time() - start:.2f} seconds.")
@@ -0,0 +1,14 @@
+import pytest
+from benchmark import STRUCTURES, make_queries, run_structure
+
+
+@pytest.mark.parametrize('name', ['cuckoo', 'bloom', 'hash', 'sorted_index', 'xor', 'fingerprints'])
+def test_result_row(name, tmp_path):
+    data_file = tmp_path / "names.txt"
+    data_file.write_text("\n".join(f"user_{i}" for i in range(5000)) + "\n")
+    queries = make_queries(str(data_file), 2000, 0.5)
+    assert sum(not query.startswith("~absent~") for query in queries) == 1000
+    row = run_structure(STRUCTURES[name], str(data_file), queries, str(tmp_path), warmup=100, repetitions=1)
+    assert row['items'] == 5000 and row['queries'] == 2000
+    assert row['failed_inserts'] == 0
+    assert row['p50_us'] <= row['p99_us']
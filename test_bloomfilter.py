@@ -0,0 +1,48 @@
+import pytest
+from bloomfilter import BloomFilter, BlockedBloomFilter
+from cuckoofilter import CuckooFilter
+from hashing import Murmur3Hasher
+
+NAMES = [f"user_{i}" for i in range(10_000)]
+
+
+class ReversedHasher(Murmur3Hasher):
+    name = 'reversed_murmur3'
+
+    def hash_pair(self, item):
+        return super().hash_pair(item[::-1])
+
+    def hash_pairs(self, items):
+        return super().hash_pairs([item[::-1] for item in items])
+
+
+@pytest.mark.parametrize('cls', [BloomFilter, BlockedBloomFilter])
+def test_no_false_negatives_and_fp_rate(cls):
+    bloom_filter = cls(len(NAMES), 0.01)
+    bloom_filter.add_many(NAMES[:5000])
+    for name in NAMES[5000:]:
+        bloom_filter.add(name)
+    assert bloom_filter.check_many(NAMES).all()
+    assert all(bloom_filter.check(name) for name in NAMES[:100])
+    absent = [f"~absent~{i}" for i in range(50_000)]
+    assert bloom_filter.check_many(absent).mean() <= 0.015
+
+
+@pytest.mark.parametrize('cls', [BloomFilter, BlockedBloomFilter])
+def test_save_load_keeps_seed(cls, tmp_path):
+    path = str(tmp_path / "names.bin")
+    bloom_filter = cls(len(NAMES), 0.01, seed=7)
+    bloom_filter.add_many(NAMES)
+    bloom_filter.save(path)
+    loaded = cls.load(path, verify=True)
+    assert loaded.hasher.seed == 7
+    assert loaded.check_many(NAMES).all()
+
+
+@pytest.mark.parametrize('make', [lambda hasher: BloomFilter(100, 0.01, hasher=hasher),
+                                  lambda hasher: CuckooFilter(expected_items=100, hasher=hasher)])
+def test_save_rejects_other_hashers(make, tmp_path):
+    path = tmp_path / "names.bin"
+    with pytest.raises(ValueError, match="reversed_murmur3"):
+        make(ReversedHasher()).save(str(path))
+    assert not path.exists()
@@ -0,0 +1,74 @@
+import asyncio
+import threading
+import pytest
+from bloomfilter import BloomFilter
+from checkserver import CheckClient, CheckServer, open_filter_file
+from loginchecker import LoginChecker
+from shardedfilter import ShardedFilter
+
+TAKEN = [f"user_{i}" for i in range(1000)]
+
+
+def make_checker():
+    bloom_filter = BloomFilter(10_000, 0.01)
+    bloom_filter.add_many(TAKEN)
+    return LoginChecker(bloom_filter, set(TAKEN), cache_size=0)
+
+
+def serve(test, checker=None):
+    async def run():
+        server = CheckServer(checker or make_checker(), max_wait=0.01)
+        host, port = await server.start("127.0.0.1", 0)
+        client = await CheckClient().connect(host, port)
+        try:
+            return await test(client)
+        finally:
+            await client.close()
+            await server.stop()
+    return asyncio.run(run())
+
+
+def test_check_register_suggest():
+    async def test(client):
+        assert not await client.is_available("user_1")
+        assert await client.is_available("newcomer")
+        assert await client.register("newcomer")
+        assert not await client.register("newcomer")
+        suggestions = await client.suggest("user_1")
+        assert suggestions and not set(suggestions) & set(TAKEN)
+    serve(test)
+
+
+def test_pipelined_check_is_answered_before_a_later_register():
+    async def test(client):
+        return await asyncio.gather(client.is_available("late"), client.register("late"),
+                                    client.is_available("late"))
+    assert serve(test) == [True, True, False]
+
+
+def test_suggestions_use_the_checker_from_the_event_loop_only():
+    checker = make_checker()
+    threads = set()
+    is_available_many = checker.is_available_many
+
+    def recording(names, cache=True):
+        threads.add(threading.get_ident())
+        return is_available_many(names, cache)
+
+    checker.is_available_many = recording
+
+    async def test(client):
+        return await asyncio.gather(client.suggest("user_1"), client.is_available("user_2"),
+                                    client.suggest("user_3"))
+    first, taken, second = serve(test, checker)
+    assert len(first) == len(second) == 5 and taken is False
+    assert threads == {threading.get_ident()}
+
+
+def test_sharded_directory_cannot_be_journaled_or_watched(tmp_path):
+    directory = str(tmp_path / "shards")
+    ShardedFilter.create('bloom', 100, 2).save(directory)
+    open_filter_file(directory)
+    for kwargs in ({'journal': True}, {'watch': 1.0}):
+        with pytest.raises(ValueError, match="sharded filter directory"):
+            open_filter_file(directory, **kwargs)
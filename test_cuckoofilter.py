@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+from bloomfilter import BloomFilter, BlockedBloomFilter
+from cuckoofilter import CuckooFilter, fill_first_choice, fingerprint_size_for
+from filter_initializer import initialize_filters
+
+NAMES = [f"user_{i}" for i in range(20_000)]
+
+
+def test_eviction_reaches_target_load():
+    cuckoo_filter = CuckooFilter(expected_items=len(NAMES), seed=3)
+    failed = sum(not cuckoo_filter.insert(name) for name in NAMES)
+    assert failed <= len(NAMES) // 1000
+    assert cuckoo_filter.load_factor() > 0.94
+    assert sum(cuckoo_filter.contains(name) for name in NAMES) >= len(NAMES) - failed
+
+
+def test_eviction_path_keeps_every_fingerprint():
+    cuckoo_filter = CuckooFilter(capacity=64, max_kicks=500)
+    inserted = [name for name in NAMES[:240] if cuckoo_filter.insert(name)]
+    assert len(inserted) >= 230
+    assert all(cuckoo_filter.contains(name) for name in inserted)
+    assert np.count_nonzero(cuckoo_filter.buckets) == len(inserted)
+
+
+def test_bulk_insert_matches_single_inserts():
+    bulk = CuckooFilter(expected_items=len(NAMES), fingerprint_size=12)
+    assert bulk.bulk_insert(NAMES) == 0
+    assert bulk.contains_many(NAMES).all()
+    assert np.count_nonzero(bulk.buckets) == len(NAMES)
+    assert all(bulk.delete(name) for name in NAMES[:100])
+    assert not bulk.contains_many(NAMES[:100]).any()
+
+
+def test_fill_first_choice_respects_free_slots():
+    buckets = np.zeros((4, 2), dtype=np.uint8)
+    buckets[1, 0] = 9
+    fps = np.array([1, 2, 3, 4, 5], dtype=np.uint8)
+    indices = np.array([1, 1, 2, 2, 2], dtype=np.uint64)
+    left_fps, left_indices = fill_first_choice(buckets, 0, fps, indices)
+    assert buckets[1].tolist() == [9, 1] and buckets[2].tolist() == [3, 4]
+    assert left_fps.tolist() == [2, 5] and left_indices.tolist() == [1, 2]
+
+
+@pytest.mark.parametrize('fp_prob', [0.05, 0.01, 0.001])
+def test_fingerprint_size_meets_fp_prob(fp_prob):
+    cuckoo_filter = CuckooFilter(expected_items=len(NAMES), fingerprint_size=fingerprint_size_for(fp_prob))
+    cuckoo_filter.bulk_insert(NAMES)
+    absent = [f"~absent~{i}" for i in range(50_000)]
+    assert cuckoo_filter.contains_many(absent).mean() <= fp_prob * 1.2
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_initialize_filters(workers, tmp_path):
+    data_file = tmp_path / "names.txt"
+    data_file.write_text("\n".join(NAMES) + "\n")
+    files = [str(tmp_path / f"{kind}.bin") for kind in ('bloom', 'cuckoo', 'blocked')]
+    initialize_filters(str(data_file), *files, workers=workers)
+    cuckoo_filter = CuckooFilter.load(files[1])
+    assert np.count_nonzero(cuckoo_filter.contains_many(NAMES)) >= len(NAMES) - len(NAMES) // 1000
+    # The workers' partial bit arrays are merged into the parent's, so they must hash alike.
+    for cls, filename in ((BloomFilter, files[0]), (BlockedBloomFilter, files[2])):
+        assert cls.load(filename).check_many(NAMES).all()
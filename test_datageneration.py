@@ -0,0 +1,33 @@
+import pytest
+from datageneration import SHARD_SIZE, build_vocabulary, make_query_sets, save_usernames
+
+NUM = SHARD_SIZE + 1000  # two shards, so two workers each write one
+
+
+@pytest.fixture(scope='module')
+def vocabulary():
+    return build_vocabulary(size=2000, seed=7)
+
+
+def test_workers_give_identical_file(vocabulary, tmp_path):
+    single, pooled = tmp_path / "single.txt", tmp_path / "pooled.txt"
+    save_usernames(str(single), NUM, seed=7, workers=1, vocabulary=vocabulary)
+    save_usernames(str(pooled), NUM, seed=7, workers=2, vocabulary=vocabulary)
+    assert single.read_bytes() == pooled.read_bytes()
+
+    names = single.read_text().splitlines()
+    assert len(names) == NUM and len(set(names)) == NUM
+    assert build_vocabulary(size=2000, seed=7) == vocabulary
+
+    other = tmp_path / "other.txt"
+    save_usernames(str(other), NUM, seed=8, workers=1, vocabulary=vocabulary)
+    assert other.read_bytes() != single.read_bytes()
+
+
+def test_query_sets(vocabulary, tmp_path):
+    data_file = tmp_path / "names.txt"
+    save_usernames(str(data_file), NUM, seed=7, vocabulary=vocabulary)
+    names = set(data_file.read_text().splitlines())
+    hits, misses = make_query_sets(NUM, 5000, 5000, seed=7, vocabulary=vocabulary)
+    assert len(set(hits)) == 5000 and set(hits) <= names
+    assert len(misses) == 5000 and names.isdisjoint(misses)
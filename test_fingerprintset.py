@@ -0,0 +1,22 @@
+from fingerprintset import FingerprintSet
+
+NAMES = [f"user_{i}" for i in range(10_000)]
+
+
+def test_membership():
+    fingerprint_set = FingerprintSet(NAMES + NAMES[:10])
+    assert len(fingerprint_set) == len(NAMES)
+    assert fingerprint_set.contains_many(NAMES).all()
+    assert "user_5" in fingerprint_set and not fingerprint_set.contains("~absent~")
+    assert not fingerprint_set.contains_many([f"~absent~{i}" for i in range(10_000)]).any()
+
+
+def test_from_file_save_load(tmp_path):
+    data_file = tmp_path / "names.txt"
+    data_file.write_text("\n".join(NAMES) + "\n")
+    path = str(tmp_path / "names.fps")
+    FingerprintSet.from_file(str(data_file), seed=5).save(path)
+    loaded = FingerprintSet.load(path, verify=True)
+    assert loaded.hasher.seed == 5
+    assert loaded.contains_many(NAMES).all()
+    assert loaded.false_positive_rate() < 1e-12
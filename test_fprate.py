@@ -0,0 +1,25 @@
+import pytest
+from bloomfilter import BloomFilter
+from cuckoofilter import false_positive_bound
+from fprate import measure_bloom, measure_cuckoo, run_sweep
+
+
+def test_sweep(tmp_path):
+    data_file = tmp_path / "names.txt"
+    data_file.write_text("\n".join(f"user_{i}" for i in range(5000)) + "\n")
+    rows = run_sweep(str(data_file), probes=20000, fp_probs=(0.01,), fingerprint_sizes=(8, 16))
+    assert {row['structure'] for row in rows} == {'bloom', 'blocked_bloom', 'cuckoo', 'xor'}
+    for row in rows:
+        assert row['items'] == 5000 and row['bits_per_key'] > 0
+        # Twice the target leaves room for sampling noise over 20000 probes.
+        assert row['observed_fp'] <= 2 * row['target_fp'], row
+        if row['structure'] == 'cuckoo':
+            assert row['failures'] == 0
+            assert row['target_fp'] == pytest.approx(
+                false_positive_bound(int(row['params'].rsplit('=', 1)[1]), 4, 0.95))
+
+
+def test_empty_names():
+    assert measure_bloom(BloomFilter, [], 0.01, 100)['bits_per_key'] == 0.0
+    row = measure_cuckoo([], 4, 8, 0.95, 100)
+    assert row['bits_per_key'] == 0.0 and row['observed_fp'] == 0.0
@@ -0,0 +1,69 @@
+import pytest
+from bloomfilter import BloomFilter
+from cuckoofilter import CuckooFilter
+from journal import JournaledFilter
+from loginchecker import LoginChecker
+
+
+@pytest.fixture(params=['bloom', 'cuckoo'])
+def snapshot(request, tmp_path):
+    path = str(tmp_path / "snapshot.bin")
+    if request.param == 'bloom':
+        BloomFilter(1000, 0.01).save(path)
+        return BloomFilter, path
+    CuckooFilter(expected_items=1000).save(path)
+    return CuckooFilter, path
+
+
+def test_register_after_compaction(snapshot):
+    filter_class, path = snapshot
+    journaled = JournaledFilter(filter_class, path, sync=False, compact_after=5)
+    checker = LoginChecker(journaled, set(), cache_size=0)
+    for i in range(7):
+        assert checker.register(f"n{i}")
+    assert journaled.journal.records == 2  # compacted after n4
+    assert checker.register("n6") is False
+    assert not checker.is_available("n6")
+    journaled.close()
+
+
+def test_replay_after_restart(snapshot):
+    filter_class, path = snapshot
+    with JournaledFilter(filter_class, path, sync=False) as journaled:
+        for i in range(10):
+            journaled.add(f"user_{i}")
+    with JournaledFilter(filter_class, path, sync=False) as reopened:
+        assert all(reopened.check(f"user_{i}") for i in range(10))
+        assert reopened.check_many([f"user_{i}" for i in range(10)]).all()
+
+
+def test_torn_record_is_dropped(snapshot):
+    filter_class, path = snapshot
+    with JournaledFilter(filter_class, path, sync=False) as journaled:
+        journaled.add("kept")
+        journaled.add("torn")
+    with open(f"{path}.journal", 'r+b') as f:
+        f.truncate(f.seek(0, 2) - 2)
+    with JournaledFilter(filter_class, path, sync=False) as reopened:
+        assert reopened.journal.records == 1
+        assert reopened.check("kept")
+        reopened.add("after")
+    with JournaledFilter(filter_class, path, sync=False) as reopened:
+        assert reopened.journal.records == 2
+        assert reopened.check("after")
+
+
+def test_stale_journal_is_discarded(tmp_path):
+    path = str(tmp_path / "snapshot.bin")
+    CuckooFilter(expected_items=1000).save(path)
+    with JournaledFilter(CuckooFilter, path, sync=False) as journaled:
+        journaled.add("alice")
+        stale = open(f"{path}.journal", 'rb').read()
+        journaled.compact()
+    # A journal left over from before the compaction must not insert alice a second time.
+    with open(f"{path}.journal", 'wb') as f:
+        f.write(stale)
+    with JournaledFilter(CuckooFilter, path, sync=False) as reopened:
+        assert reopened.journal.records == 0
+        assert reopened.delete("alice")
+        assert not reopened.contains("alice")
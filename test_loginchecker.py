@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+from bloomfilter import BloomFilter
+from cuckoofilter import CuckooFilter
+from loginchecker import LoginChecker
+from sortedindex import SortedIndex, build_sorted_index
+
+TAKEN = [f"user_{i}" for i in range(1000)]
+
+
+class MaybeFilter:
+    """A front filter that says "maybe present" for everything, so every lookup reaches the store."""
+
+    def check(self, item):
+        return True
+
+    def check_many(self, items):
+        return np.ones(len(items), dtype=bool)
+
+    def add(self, item):
+        pass
+
+
+def bloom_checker(cache_size=100):
+    bloom_filter = BloomFilter(10_000, 0.01)
+    bloom_filter.add_many(TAKEN)
+    return LoginChecker(bloom_filter, set(TAKEN), cache_size=cache_size)
+
+
+def test_lru_evicts_least_recently_used():
+    checker = bloom_checker(cache_size=2)
+    for name in ("a", "b", "c", "b", "d"):  # c is now the least recently used, then evicted
+        checker.is_available(name)
+    assert checker.stats['cache_hits'] == 1
+    checker.is_available("b")
+    checker.is_available("c")
+    assert checker.stats['cache_hits'] == 2
+    assert checker.stats['checks'] == 7
+
+
+def test_register_replaces_a_cached_free_answer():
+    checker = bloom_checker()
+    assert checker.is_available("newcomer")
+    assert checker.register("newcomer")
+    hits = checker.stats['cache_hits']
+    assert not checker.is_available("newcomer")
+    assert checker.stats['cache_hits'] == hits + 1
+    assert not checker.is_available_many(["newcomer"])[0]
+    assert checker.register("newcomer") is False
+    assert checker.stats['registrations'] == 1
+
+
+def test_tier_counters():
+    checker = LoginChecker(MaybeFilter(), set(TAKEN[:10]), cache_size=0)
+    assert not checker.is_available("user_1")
+    assert checker.is_available("free_name")
+    assert list(checker.is_available_many(["user_2", "free_1", "free_2"])) == [False, True, True]
+    assert checker.stats == {'checks': 5, 'cache_hits': 0, 'filter_negatives': 0, 'exact_lookups': 5,
+                             'exact_hits': 2, 'false_positives': 3, 'registrations': 0}
+
+    checker = bloom_checker(cache_size=0)
+    checker.is_available_many([f"~absent~{i}" for i in range(1000)] + TAKEN[:10])
+    stats = checker.stats
+    assert stats['exact_hits'] == 10
+    assert stats['filter_negatives'] + stats['exact_lookups'] == 1010
+    assert stats['false_positives'] == stats['exact_lookups'] - 10 < 50
+
+
+@pytest.fixture
+def sorted_store(tmp_path):
+    data_file = tmp_path / "names.txt"
+    data_file.write_text("\n".join(TAKEN) + "\n")
+    index_file = str(tmp_path / "names.idx")
+    build_sorted_index(str(data_file), index_file)
+    return SortedIndex(index_file)
+
+
+@pytest.mark.parametrize('front', ['bloom', 'cuckoo', 'maybe'])
+def test_batch_matches_single_lookups(front, sorted_store):
+    if front == 'bloom':
+        front_filter = BloomFilter(10_000, 0.05)
+        front_filter.add_many(TAKEN)
+    elif front == 'cuckoo':
+        front_filter = CuckooFilter(expected_items=10_000, fingerprint_size=6)
+        front_filter.bulk_insert(TAKEN)
+    else:
+        front_filter = MaybeFilter()
+    # The sorted index has no add(), so registered names live in the checker's overlay.
+    checker = LoginChecker(front_filter, sorted_store, cache_size=50)
+    checker.register("registered_late")
+    names = TAKEN[::7] + [f"free_{i}" for i in range(300)] + ["registered_late"]
+    single = [checker.is_available(name) for name in names]
+    fresh = LoginChecker(front_filter, sorted_store, cache_size=0)
+    assert fresh.register("registered_late")
+    assert list(fresh.is_available_many(names)) == single
+    assert list(checker.is_available_many(names)) == single
+    assert single[-1] is False and single.count(True) == 300
@@ -0,0 +1,37 @@
+import pytest
+import metrics
+from bloomfilter import BloomFilter, BlockedBloomFilter
+from cuckoofilter import CuckooFilter
+
+
+@pytest.mark.parametrize('cls', [BloomFilter, BlockedBloomFilter])
+def test_bloom_occupancy_matches_popcount(cls):
+    bloom_filter = cls(10_000, 0.01)
+    recorded = metrics.instrument(bloom_filter)
+    bloom_filter.add_many([f"user_{i}" for i in range(5000)])
+    for i in range(4990, 5100):
+        bloom_filter.add(f"user_{i}")
+    bloom_filter.add_many([])
+    assert recorded.occupied == bloom_filter.bit_array.count()
+    assert recorded.counters['probes'] == 5110 * bloom_filter.hash_count
+
+
+def test_cuckoo_occupancy_and_probes():
+    cuckoo_filter = CuckooFilter(expected_items=2000)
+    recorded = metrics.instrument(cuckoo_filter)
+    assert cuckoo_filter.bulk_insert([f"user_{i}" for i in range(1800)]) == 0
+    for i in range(1800, 1900):
+        assert cuckoo_filter.insert(f"user_{i}")
+    assert cuckoo_filter.delete("user_0")
+    assert cuckoo_filter.contains("user_1")
+    assert recorded.occupied == int((cuckoo_filter.buckets != 0).sum())
+    assert cuckoo_filter.load_factor() == pytest.approx(recorded.occupied / cuckoo_filter.buckets.size)
+    assert recorded.counters['probes'] == 2 * (1800 + 100 + 1 + 1)
+    assert "filter_occupied" in recorded.to_prometheus()
+
+
+def test_uninstrument_restores_class_methods():
+    bloom_filter = BloomFilter(100, 0.01)
+    metrics.instrument(bloom_filter)
+    metrics.uninstrument(bloom_filter)
+    assert 'add' not in vars(bloom_filter) and 'metrics' not in vars(bloom_filter)
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+from shardedfilter import ShardedFilter, read_manifest, shard_of, shards_of
+
+NAMES = [f"user_{i}" for i in range(40_000)]
+ABSENT = [f"~absent~{i}" for i in range(50_000)]
+
+
+@pytest.fixture(scope='module')
+def data_file(tmp_path_factory):
+    path = tmp_path_factory.mktemp("data") / "usernames.txt"
+    path.write_text("\n".join(NAMES) + "\n")
+    return str(path)
+
+
+def test_routing_is_stable_and_in_range():
+    ids = shards_of(NAMES[:1000], 7)
+    assert ids.min() >= 0 and ids.max() < 7
+    assert [shard_of(name, 7) for name in NAMES[:1000]] == ids.tolist()
+
+
+@pytest.mark.parametrize('kind', ['bloom', 'blocked_bloom', 'cuckoo'])
+def test_build_meets_fp_target(kind, data_file, tmp_path):
+    directory = str(tmp_path / kind)
+    failed = ShardedFilter.build(data_file, directory, kind, 4, fp_prob=0.01)
+    # Cuckoo shards are sized for a 95% load, where an insert can rarely fail.
+    assert failed <= len(NAMES) // 1000
+    assert read_manifest(directory)['count'] == len(NAMES)
+    sharded = ShardedFilter.load(directory)
+    assert np.count_nonzero(sharded.check_many(NAMES)) >= len(NAMES) - failed
+    assert sharded.check_many(ABSENT).mean() <= 0.013
+
+
+def test_create_add_delete():
+    sharded = ShardedFilter.create('cuckoo', 10_000, 4, fp_prob=0.001)
+    assert sharded.add_many(NAMES[:10_000]) == 0
+    assert sharded.contains_many(NAMES[:10_000]).all()
+    assert sharded.delete(NAMES[0])
+    assert not sharded.contains(NAMES[0])
+
+
+def test_partial_load_raises_key_error(data_file, tmp_path):
+    directory = str(tmp_path / "partial")
+    ShardedFilter.build(data_file, directory, 'bloom', 4)
+    part = ShardedFilter.load(directory, shards=[0])
+    mine = [name for name in NAMES[:200] if shard_of(name, 4) == 0]
+    assert part.check_many(mine).all()
+    with pytest.raises(KeyError, match="is not loaded"):
+        part.check_many(NAMES[:200])
+    other = next(name for name in NAMES if shard_of(name, 4) != 0)
+    with pytest.raises(KeyError, match="is not loaded"):
+        part.check(other)
@@ -0,0 +1,80 @@
+import multiprocessing
+import os
+import pytest
+import filterfile
+from bloomfilter import BloomFilter, BlockedBloomFilter
+from cuckoofilter import CuckooFilter
+
+NAMES = [f"user_{i}" for i in range(2000)]
+CLASSES = {'bloom': BloomFilter, 'blocked_bloom': BlockedBloomFilter, 'cuckoo': CuckooFilter}
+
+
+def make(kind):
+    if kind == 'cuckoo':
+        return CuckooFilter(expected_items=len(NAMES), fingerprint_size=12)
+    return CLASSES[kind](len(NAMES), 0.001)
+
+
+def add(target, names):
+    for name in names:
+        (target.insert if isinstance(target, CuckooFilter) else target.add)(name)
+
+
+def contains(target, name):
+    return (target.contains if isinstance(target, CuckooFilter) else target.check)(name)
+
+
+def reader(kind, name, attached, added, results):
+    shared = CLASSES[kind].attach_shared(name)
+    attached.set()
+    added.wait(30)
+    results.put([contains(shared, n) for n in NAMES])
+
+
+@pytest.mark.parametrize('kind', list(CLASSES))
+def test_owner_adds_are_seen_by_attached_process(kind):
+    owner = make(kind)
+    add(owner, NAMES[:1000])
+    name = owner.to_shared_memory()
+    context = multiprocessing.get_context('spawn')
+    attached, added, results = context.Event(), context.Event(), context.Queue()
+    process = context.Process(target=reader, args=(kind, name, attached, added, results))
+    process.start()
+    try:
+        assert attached.wait(30)
+        add(owner, NAMES[1000:])  # after the reader mapped the filter
+        added.set()
+        assert all(results.get(timeout=30))
+        process.join(30)
+        assert process.exitcode == 0
+    finally:
+        filterfile.unlink_shared(name)
+
+
+@pytest.mark.parametrize('kind', list(CLASSES))
+def test_readonly_view_refuses_writes(kind):
+    owner = make(kind)
+    name = owner.to_shared_memory()
+    try:
+        view = CLASSES[kind].attach_shared(name)
+        with pytest.raises((TypeError, ValueError)):
+            add(view, ["intruder"])
+        assert not contains(owner, "intruder")
+        writer = CLASSES[kind].attach_shared(name, readonly=False)
+        add(writer, ["friend"])
+        assert contains(owner, "friend") and contains(view, "friend")
+    finally:
+        filterfile.unlink_shared(name)
+
+
+def test_unlink_removes_the_shared_file():
+    owner = make('bloom')
+    add(owner, NAMES[:10])
+    name = owner.to_shared_memory()
+    view = BloomFilter.attach_shared(name)
+    filterfile.unlink_shared(name)
+    assert not os.path.exists(filterfile.shared_path(name))
+    with pytest.raises(FileNotFoundError):
+        BloomFilter.attach_shared(name)
+    # Mappings made before the unlink stay valid until they are dropped.
+    assert view.check(NAMES[0]) and owner.check(NAMES[0])
@@ -0,0 +1,88 @@
+import time
+import pytest
+from bloomfilter import BloomFilter
+from cuckoofilter import CuckooFilter
+from filterfile import FilterFileError
+from snapshots import SnapshotManager
+
+NAMES = [f"user_{i}" for i in range(1000)]
+
+
+def save_bloom(path, names):
+    bloom_filter = BloomFilter(10_000, 0.001)
+    bloom_filter.add_many(names)
+    bloom_filter.save(path)
+
+
+@pytest.fixture
+def path(tmp_path):
+    path = str(tmp_path / "filter.bin")
+    save_bloom(path, NAMES[:500])
+    return path
+
+
+def test_reload_replays_added_names(path):
+    manager = SnapshotManager(path)
+    manager.add("late_signup")
+    save_bloom(path, NAMES)
+    assert manager.reload() == 2
+    assert manager.check("late_signup") and manager.check_many(NAMES).all()
+    assert manager.stats['swaps'] == 1 and manager._added == []
+
+
+def test_corrupt_file_keeps_the_old_snapshot(path, tmp_path):
+    manager = SnapshotManager(path)
+    manager.add("late_signup")
+    corrupt = str(tmp_path / "corrupt.bin")
+    save_bloom(corrupt, NAMES)
+    with open(corrupt, 'r+b') as f:
+        f.seek(-1, 2)
+        last = f.read(1)
+        f.seek(-1, 2)
+        f.write(bytes([last[0] ^ 0xFF]))
+    with pytest.raises(FilterFileError):
+        manager.reload(corrupt)
+    assert manager.generation == 1 and manager.filename == path
+    assert manager.stats['failed_reloads'] == 1 and manager.last_error is not None
+    assert manager.check("late_signup") and not manager.check(NAMES[900])
+    # The names added meanwhile are still replayed by the next good reload.
+    assert manager.reload() == 2 and manager.check("late_signup")
+
+
+def test_full_cuckoo_refuses_the_swap(tmp_path):
+    path = str(tmp_path / "cuckoo.bin")
+    CuckooFilter(capacity=4, bucket_size=2, max_kicks=10).save(path)
+    manager = SnapshotManager(path)
+    added = [name for name in NAMES[:8] if manager.add(name)]
+    small = str(tmp_path / "small.bin")
+    CuckooFilter(capacity=1, bucket_size=2, max_kicks=10).save(small)
+    with pytest.raises(FilterFileError, match="did not fit"):
+        manager.reload(small)
+    assert manager.stats['failed_replays'] > 0 and manager.generation == 1
+    assert all(manager.check(name) for name in added)
+
+
+def test_max_pending_bounds_the_replay_list(path):
+    manager = SnapshotManager(path, max_pending=3)
+    for name in ("a", "b", "c", "d", "e"):
+        manager.add(name)
+    assert len(manager._added) == 3 and manager.stats['unreplayable_adds'] == 2
+    with pytest.raises(FilterFileError, match="max_pending"):
+        manager.reload()
+    assert manager.generation == 1 and manager.check("e")
+
+
+def test_watch_swaps_in_a_rebuilt_file(path, tmp_path):
+    manager = SnapshotManager(path)
+    manager.watch(interval=0.01)
+    try:
+        manager.add("late_signup")
+        save_bloom(path, NAMES)
+        for _ in range(500):
+            if manager.generation == 2:
+                break
+            time.sleep(0.01)
+        assert manager.generation == 2
+        assert manager.check(NAMES[900]) and manager.check("late_signup")
+    finally:
+        manager.stop()
@@ -0,0 +1,42 @@
+import random
+import pytest
+from sortedindex import SortedIndex, build_sorted_index
+
+# Names sharing long prefixes land in the same sparse-index block; duplicates are stored once.
+NAMES = [f"user_{i}" for i in range(3000)] + ["userx", "用户", "ab", "user_1"]
+
+
+@pytest.fixture(scope='module')
+def index(tmp_path_factory):
+    tmp = tmp_path_factory.mktemp("index")
+    data_file = tmp / "names.txt"
+    names = NAMES[:]
+    random.Random(0).shuffle(names)
+    data_file.write_text("\n".join(names) + "\n", encoding='utf-8')
+    index_file = str(tmp / "names.idx")
+    # Small runs and stride exercise the run merge and the block search.
+    build_sorted_index(str(data_file), index_file, run_size=500, stride=8, tmp_dir=str(tmp))
+    return SortedIndex(index_file)
+
+
+def test_sorted_and_unique(index):
+    expected = sorted(set(NAMES), key=lambda name: name.encode('utf-8'))
+    assert len(index) == len(expected)
+    assert [index[i] for i in range(len(index))] == expected
+
+
+def test_lookups(index):
+    assert all(index.contains(name) for name in NAMES)
+    assert index.contains_many(NAMES).all()
+    absent = ["", "a", "user_", "user_30000", "zzz", "user_2999x"]
+    assert not any(name in index for name in absent)
+    assert not index.contains_many(absent).any()
+
+
+def test_range_and_prefix(index):
+    names = sorted(set(NAMES), key=lambda name: name.encode('utf-8'))
+    assert list(index.range("user_10", "user_11")) == [n for n in names if "user_10" <= n < "user_11"]
+    assert list(index.range(high="ab")) == []
+    assert list(index.range("userx")) == ["userx", "用户"]
+    assert list(index.prefix("user_299")) == ["user_299"] + [f"user_299{i}" for i in range(10)]
+    assert list(index.prefix("nobody")) == []
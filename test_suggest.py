@@ -0,0 +1,38 @@
+import asyncio
+import random
+import numpy as np
+from bloomfilter import BloomFilter
+from loginchecker import LoginChecker
+from suggest import SuggestionEngine, generate_candidates, normalize
+
+TAKEN = {"jsmith", "jsmith_1", "jsmith.1", "jsmith1", "jsmith_2"}
+
+
+def test_normalize():
+    assert normalize("J.Smith_42") == "j.smith"
+    assert normalize("!!!") == "user"
+
+
+def test_candidates_are_endless_and_natural_first():
+    candidates = generate_candidates("jsmith", random.Random(0))
+    first = [next(candidates) for _ in range(3000)]
+    assert first[:3] == ["jsmith_1", "jsmith.1", "jsmith1"]
+    assert all(name.startswith(("jsmith", "the", "real", "its", "im", "hey", "mr", "ms", "official"))
+               for name in first)
+
+
+def test_suggest_and_suggest_async_agree():
+    bloom_filter = BloomFilter(100, 0.01)
+    bloom_filter.add_many(TAKEN)
+    checker = LoginChecker(bloom_filter, set(TAKEN), cache_size=0)
+    engine = SuggestionEngine(checker, seed=1)
+    suggestions = engine.suggest("jsmith")
+    assert len(suggestions) == 5 and not set(suggestions) & TAKEN
+    assert suggestions[0] == "jsmith.2"
+
+    async def check_many(names):
+        return np.array([name not in TAKEN for name in names])
+
+    engine = SuggestionEngine(checker, seed=1)
+    assert asyncio.run(engine.suggest_async("jsmith", check_many)) == suggestions
+    assert engine.stats['calls'] == 1 and engine.stats['batches'] == 1
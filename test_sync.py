@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+from bloomfilter import BloomFilter
+from cuckoofilter import CuckooFilter
+from sync import (DeltaTracker, IncompatibleFiltersError, apply_delta, diff, merge,
+                  read_delta_header, union)
+
+NAMES = [f"user_{i}" for i in range(4000)]
+
+
+def bloom():
+    return BloomFilter(10_000, 0.01)
+
+
+def cuckoo():
+    return CuckooFilter(expected_items=10_000, fingerprint_size=12)
+
+
+def add(target, names):
+    if isinstance(target, CuckooFilter):
+        assert target.bulk_insert(names) == 0
+    else:
+        target.add_many(names)
+
+
+def contains_all(target, names):
+    check = target.contains if isinstance(target, CuckooFilter) else target.check
+    return all(map(check, names))
+
+
+def table(target):
+    return target.buckets if isinstance(target, CuckooFilter) else np.frombuffer(target.bit_array, np.uint8)
+
+
+@pytest.mark.parametrize('make', [bloom, cuckoo])
+def test_merge_and_union(make):
+    a, b = make(), make()
+    add(a, NAMES[:2000])
+    add(b, NAMES[1000:])
+    merged = union(a, b)
+    assert contains_all(merged, NAMES)
+    assert not contains_all(a, NAMES)  # union leaves its inputs unchanged
+    assert merge(a, b) == 0
+    assert np.array_equal(table(a), table(merged))
+
+
+@pytest.mark.parametrize('make', [bloom, cuckoo])
+def test_delta_turns_old_into_new(make):
+    old, new = make(), make()
+    add(old, NAMES[:3000])
+    add(new, NAMES[:3000])
+    add(new, NAMES[3000:])
+    delta = diff(old, new, 4, 5)
+    kind, _, from_version, to_version, count = read_delta_header(delta)
+    assert (kind, from_version, to_version) == (new.kind, 4, 5) and count > 0
+    assert apply_delta(old, delta, version=4) == 5
+    assert np.array_equal(table(old), table(new))
+    with pytest.raises(ValueError, match="replica is at 3"):
+        apply_delta(make(), delta, version=3)
+
+
+def test_tracker_and_corruption():
+    live, replica = cuckoo(), cuckoo()
+    tracker = DeltaTracker(live, history=2)
+    for version, start in enumerate(range(0, 3000, 1000), 1):
+        add(live, NAMES[start:start + 1000])
+        assert tracker.commit() == version
+    assert tracker.delta_since(0) is None  # older than the kept history
+    add(replica, NAMES[:1000])
+    assert apply_delta(replica, tracker.delta_since(1), version=1) == 3
+    assert np.array_equal(replica.buckets, live.buckets)
+
+    delta = bytearray(tracker.delta_since(2))
+    delta[-1] ^= 1
+    with pytest.raises(ValueError, match="checksum"):
+        apply_delta(replica, bytes(delta))
+    with pytest.raises(IncompatibleFiltersError):
+        apply_delta(CuckooFilter(expected_items=10_000, fingerprint_size=8), tracker.delta_since(2))
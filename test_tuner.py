@@ -0,0 +1,51 @@
+import sys
+import pytest
+import tuner
+from xorfilter import XorFilter, table_bytes
+
+
+def test_xor_table_bytes_matches_filter():
+    names = [f"user_{i}" for i in range(5000)]
+    for f in (8, 16):
+        assert table_bytes(len(names), f) == XorFilter(names, f).fingerprints.nbytes
+
+
+def test_over_budget_candidates_are_not_calibrated(monkeypatch):
+    calibrated = []
+
+    def fake_calibrate(candidates, users, items):
+        for candidate in candidates:
+            calibrated.append(candidate)
+            candidate.latency_us = 1.0
+
+    monkeypatch.setattr(tuner, 'calibrate', fake_calibrate)
+    recommendation = tuner.recommend(1_000_000, 2**21, 0.01, calibration_items=10_000)
+    assert calibrated and all(c.memory_bytes <= 2**21 for c in calibrated)
+    assert {c.structure for c in calibrated} <= {'bloom', 'blocked_bloom', 'cuckoo'}
+    assert all(c.latency_us is None for c in recommendation.candidates if c.rejected == "over the memory budget")
+
+
+def test_recommendation_builds_and_rejects_overflow(tmp_path):
+    data_file = tmp_path / "names.txt"
+    data_file.write_text("\n".join(f"user_{i}" for i in range(3000)) + "\n")
+    recommendation = tuner.recommend(3000, 2**20, 0.01, calibration_items=3000)
+    built = recommendation.build(str(data_file))
+    if hasattr(built, 'check_many'):
+        assert built.check_many([f"user_{i}" for i in range(3000)]).all()
+
+    cuckoo = next(c for c in tuner.analytic_candidates(100, 0.01) if c.structure == 'cuckoo')
+    with pytest.raises(ValueError, match="did not fit"):
+        tuner.Recommendation(cuckoo, True, [cuckoo]).build(str(data_file))
+
+
+def test_container_memory_estimates():
+    names = tuner._calibration_names(20_000)
+    strings = sum(map(sys.getsizeof, names)) / len(names)
+    assert abs(tuner.measure_str_bytes(20_000) - strings) < 1
+    for count in (0, 5, 1000, 20_000, 60_000):
+        assert tuner.set_bytes(count) == sys.getsizeof(set(range(count)))
+    candidates = {c.structure: c for c in tuner.analytic_candidates(20_000, 0.01, str_bytes=strings)}
+    real_list = sum(map(sys.getsizeof, names)) + 8 * len(names) + sys.getsizeof([])
+    assert candidates['linear'].memory_bytes == pytest.approx(real_list, abs=1)
+    real_set = sum(map(sys.getsizeof, names)) + sys.getsizeof(set(names))
+    assert candidates['hash'].memory_bytes == pytest.approx(real_set, abs=1)
@@ -0,0 +1,38 @@
+import pytest
+from usernamesource import UsernameSource
+
+CONTENT = "alice\n \n\tbob \r\n\r\n\x1c\n　\néric\n\ncarol"
+
+
+@pytest.fixture
+def username_file(tmp_path):
+    path = tmp_path / "names.txt"
+    path.write_bytes(CONTENT.encode('utf-8'))
+    return str(path)
+
+
+def test_count_matches_iteration(username_file):
+    source = UsernameSource(username_file)
+    names = list(source)
+    assert names == ["alice", "bob", "éric", "carol"]
+    assert source.count() == len(names)
+    assert list(source.usernames(decode=False)) == [name.encode('utf-8') for name in names]
+
+
+@pytest.mark.parametrize('block_size', [3, 7, 1 << 20])
+def test_ranges_and_batches(username_file, block_size):
+    source = UsernameSource(username_file, block_size=block_size)
+    names = list(source)
+    for parts in (1, 2, 5):
+        ranges = source.split(parts)
+        assert [n for r in ranges for n in source.usernames(*r)] == names
+        assert sum(source.count(*r) for r in ranges) == len(names)
+    assert [n for batch in source.batches(3) for n in batch] == names
+    assert [n for batch in source.batches(3, decode=False) for n in batch] == [n.encode('utf-8') for n in names]
+
+
+def test_empty_file(tmp_path):
+    path = tmp_path / "empty.txt"
+    path.write_bytes(b"")
+    source = UsernameSource(str(path))
+    assert source.count() == 0 and list(source) == []
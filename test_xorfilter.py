@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+from checkserver import open_filter_file
+from filterfile import FilterFileError
+from fingerprintset import FingerprintSet
+from snapshots import load_snapshot_filter
+from xorfilter import XorFilter, _peel
+
+NAMES = [f"user_{i}" for i in range(20_000)]
+
+
+def test_peel_orders_every_key():
+    positions = np.array([[0, 1, 2], [2, 3, 4], [4, 5, 0]], dtype=np.uint64)
+    rounds = _peel(positions, 6)
+    assert sorted(np.concatenate([keys for keys, _ in rounds]).tolist()) == [0, 1, 2]
+
+
+def test_peel_fails_on_a_cycle():
+    # Two keys on the same three slots never leave a slot with a single key.
+    positions = np.array([[0, 1, 2], [0, 1, 2]], dtype=np.uint64)
+    assert _peel(positions, 3) is None
+
+
+@pytest.mark.parametrize('fingerprint_size', [8, 16])
+def test_no_false_negatives_and_fp_rate(fingerprint_size):
+    xor_filter = XorFilter(NAMES + NAMES[:100], fingerprint_size)
+    assert len(xor_filter) == len(NAMES)
+    assert xor_filter.check_many(NAMES).all()
+    assert all(xor_filter.check(name) for name in NAMES[:500])
+    absent = [f"~absent~{i}" for i in range(50_000)]
+    assert xor_filter.check_many(absent).mean() <= 2.0 ** -fingerprint_size * 1.5
+
+
+def test_save_load(tmp_path):
+    path = str(tmp_path / "names.xor")
+    xor_filter = XorFilter(NAMES[:1000])
+    xor_filter.save(path)
+    loaded = XorFilter.load(path, verify=True)
+    assert loaded.check_many(NAMES[:1000]).all()
+    assert np.array_equal(loaded.fingerprints, xor_filter.fingerprints)
+
+
+@pytest.mark.parametrize('structure', [XorFilter, FingerprintSet])
+def test_static_kinds_are_rejected_as_snapshots(structure, tmp_path):
+    path = str(tmp_path / "static.bin")
+    structure(NAMES[:100]).save(path)
+    with pytest.raises(FilterFileError, match="unsupported filter kind"):
+        load_snapshot_filter(path)
+    for journal in (False, True):
+        with pytest.raises(FilterFileError, match="unsupported filter kind"):
+            open_filter_file(path, journal=journal)
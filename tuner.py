@@ -0,0 +1,360 @@
+import argparse
+import gc
+import math
+import os
+import random
+import string
+import sys
+import tempfile
+import time
+import tracemalloc
+from bisect import bisect_left
+import numpy as np
+from bloomfilter import BloomFilter, BlockedBloomFilter
+from cuckoofilter import (CuckooFilter, capacity_for, false_positive_bound, fingerprint_dtype,
+                          fingerprint_size_for)
+from fingerprintset import FingerprintSet
+from sortedindex import SortedIndex, build_sorted_index
+from usernamesource import UsernameSource
+from xorfilter import XorFilter, table_bytes
+
+# Picks a membership structure and its parameters from a user count, memory budget,
+# false positive target and latency goal.
+#
+# Every candidate configuration is first sized with the analytic formulas (the Bloom
+# get_size / get_hash_count, the cuckoo bound 2 * bucket_size * load / 2**fingerprint_size,
+# the xor bound 2**-fingerprint_size, the fingerprint set's n / 2**64), which gives its
+# memory and false positive rate at the expected user count without building anything;
+# the heap of the Python list and set candidates is the measured size of a name's str
+# object plus CPython's container layout. Candidates over budget or over the FP target
+# are dropped before anything else is built, and only the rest are built at a small
+# calibration size on this machine and timed with single lookups; the measured latency
+# is scaled to the full size for the structures whose lookups grow with n (linear and
+# binary search), and the calibration build also catches cuckoo tables that cannot reach
+# their load factor. The fastest candidate that fits wins.
+CALIBRATION_ITEMS = 100_000
+CALIBRATION_QUERIES = 20_000
+BATCH_SIZE = 1_000_000
+CUCKOO_LOADS = {2: 0.84, 4: 0.95, 8: 0.98}  # load factor reached per bucket size
+MAX_KICKS = 500
+
+
+class Candidate:
+    """
+    One structure configuration evaluated by the tuner.
+
+    Attributes:
+        structure (str): 'linear', 'binary', 'hash', 'sorted_index', 'fingerprints',
+            'bloom', 'blocked_bloom', 'cuckoo' or 'xor'.
+        params (dict): Constructor parameters at the expected user count.
+        memory_bytes (int): Estimated memory at the expected user count.
+        fp_rate (float): Analytic false positive rate (0 for exact structures).
+        dynamic (bool): Whether names can be added after the build.
+        latency_us (float): Calibrated p99 single-lookup latency, scaled to the user count.
+        rejected (str): Why the candidate does not fit, or None.
+    """
+
+    def __init__(self, structure, params, memory_bytes, fp_rate, dynamic):
+        self.structure = structure
+        self.params = params
+        self.memory_bytes = int(memory_bytes)
+        self.fp_rate = fp_rate
+        self.dynamic = dynamic
+        self.latency_us = None
+        self.rejected = None
+
+    def describe(self):
+        params = ", ".join(f"{key}={value}" for key, value in self.params.items())
+        latency = f"{self.latency_us:.2f} us" if self.latency_us is not None else "-"
+        return (f"{self.structure:<14} {self.memory_bytes / 2**20:>10.1f} MB  fp {self.fp_rate:<10.3g} "
+                f"p99 {latency:>10}  {params}" + (f"  [{self.rejected}]" if self.rejected else ""))
+
+
+class Recommendation:
+    """
+    The tuner's choice: a structure and configuration, ready to build.
+
+    Attributes:
+        candidate (Candidate): The chosen configuration.
+        meets_latency (bool): Whether its calibrated latency is within the latency goal.
+        candidates (list): Every configuration that was considered, with rejection reasons.
+    """
+
+    def __init__(self, candidate, meets_latency, candidates):
+        self.candidate = candidate
+        self.meets_latency = meets_latency
+        self.candidates = candidates
+
+    @property
+    def structure(self):
+        return self.candidate.structure
+
+    @property
+    def params(self):
+        return self.candidate.params
+
+    def create(self):
+        """
+        Returns a new empty filter with the chosen configuration (dynamic filters only).
+        """
+        params = self.params
+        if self.structure in ('bloom', 'blocked_bloom'):
+            cls = BloomFilter if self.structure == 'bloom' else BlockedBloomFilter
+            return cls(params['items_count'], params['fp_prob'])
+        if self.structure == 'cuckoo':
+            return CuckooFilter(capacity=params['capacity'], bucket_size=params['bucket_size'],
+                                fingerprint_size=params['fingerprint_size'], max_kicks=params['max_kicks'])
+        raise ValueError(f"{self.structure} is built from its data with build(), not created empty")
+
+    def build(self, data_file):
+        """
+        Builds the chosen structure over a username file.
+
+        Returns:
+            The structure: a filter, FingerprintSet, set or list. Sorted indexes are built
+            with sortedindex.py instead.
+
+        Raises:
+            ValueError: If names did not fit in the cuckoo table (it is too small for the file).
+        """
+        structure = self.structure
+        source = UsernameSource(data_file)
+        if structure == 'xor':
+            return XorFilter.from_file(data_file, self.params['fingerprint_size'])
+        if structure == 'fingerprints':
+            return FingerprintSet.from_file(data_file)
+        if structure in ('linear', 'binary', 'hash'):
+            names = [name for batch in source.batches(BATCH_SIZE) for name in batch]
+            return set(names) if structure == 'hash' else sorted(names) if structure == 'binary' else names
+        if structure == 'sorted_index':
+            raise ValueError("Build the sorted index with sortedindex.py")
+        new_filter = self.create()
+        if structure == 'cuckoo':
+            keys = [new_filter._fingerprints_and_indices(batch) for batch in source.batches(BATCH_SIZE)]
+            if keys:
+                failed = new_filter._insert_fingerprints(np.concatenate([fps for fps, _ in keys]),
+                                                         np.concatenate([indices for _, indices in keys]))
+                if failed:
+                    raise ValueError(f"{failed} names did not fit in the cuckoo table; "
+                                     f"tune for more users than the file holds")
+        else:
+            for batch in source.batches(BATCH_SIZE):
+                new_filter.add_many(batch)
+        return new_filter
+
+    def report(self):
+        """
+        Returns the recommendation and every considered candidate as text.
+        """
+        lines = [f"Recommended: {self.candidate.describe()}"
+                 + ("" if self.meets_latency else "  (slower than the latency goal)"), "Candidates:"]
+        lines += ["  " + candidate.describe() for candidate in self.candidates]
+        return "\n".join(lines)
+
+
+def analytic_candidates(users, fp_target, avg_name_bytes=16, str_bytes=62):
+    """
+    Returns every candidate configuration sized for users names.
+
+    Parameters:
+        users (int): Expected number of usernames.
+        fp_target (float): False positive target.
+        avg_name_bytes (float): Average UTF-8 length of a username.
+        str_bytes (float): Python heap per username str object, e.g. from
+            measure_str_bytes(); lists add an 8-byte slot, sets their hash table.
+    """
+    n = max(users, 1)
+    list_bytes = n * (str_bytes + 8) + sys.getsizeof([])
+    candidates = [
+        Candidate('linear', {}, list_bytes, 0.0, True),
+        Candidate('binary', {}, list_bytes, 0.0, True),
+        Candidate('hash', {}, n * str_bytes + set_bytes(n), 0.0, True),
+        Candidate('sorted_index', {}, n * (avg_name_bytes + 8.5), 0.0, False),
+        Candidate('fingerprints', {}, n * 8, n / 2.0 ** 64, False),
+    ]
+    for cls, name in ((BloomFilter, 'bloom'), (BlockedBloomFilter, 'blocked_bloom')):
+        m = cls.get_size(n, fp_target)
+        k = cls.get_hash_count(m, n)
+        candidates.append(Candidate(name, {'items_count': n, 'fp_prob': fp_target, 'size': m, 'hash_count': k},
+                                    -(-m // 64) * 8, fp_target, True))
+    for bucket_size, load in CUCKOO_LOADS.items():
+        f = fingerprint_size_for(fp_target, bucket_size, load)
+        if f > 32:
+            continue
+        capacity = capacity_for(n, bucket_size, load)
+        candidates.append(Candidate(
+            'cuckoo', {'capacity': capacity, 'bucket_size': bucket_size, 'fingerprint_size': f,
+                       'max_kicks': MAX_KICKS, 'target_load': load},
+            capacity * bucket_size * fingerprint_dtype(f).itemsize, false_positive_bound(f, bucket_size, load), True))
+    for f in (8, 16):
+        if 2.0 ** -f <= fp_target:
+            candidates.append(Candidate('xor', {'fingerprint_size': f}, table_bytes(n, f), 2.0 ** -f, False))
+            break
+    return candidates
+
+
+def _calibration_names(count, seed=0):
+    rng = random.Random(seed)
+    letters = string.ascii_lowercase
+    return [f"{''.join(rng.choices(letters, k=rng.randint(5, 10)))}_{i}" for i in range(count)]
+
+
+def _p99_us(check, structure, queries):
+    for name in queries[:1000]:
+        check(structure, name)
+    latencies = np.empty(len(queries), dtype=np.int64)
+    perf_counter_ns = time.perf_counter_ns
+    for i, name in enumerate(queries):
+        t0 = perf_counter_ns()
+        check(structure, name)
+        latencies[i] = perf_counter_ns() - t0
+    return float(np.percentile(latencies, 99)) / 1000
+
+
+def _binary_search(names, name):
+    i = bisect_left(names, name)
+    return i < len(names) and names[i] == name
+
+
+def measure_str_bytes(items=CALIBRATION_ITEMS, seed=0):
+    """
+    Returns the Python heap per username taken by its str object, measured on items
+    calibration names created while tracing.
+    """
+    gc.collect()
+    tracemalloc.start()
+    names = _calibration_names(items, seed)
+    traced = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (traced - sys.getsizeof(names)) / items
+
+
+def set_bytes(count):
+    """
+    Returns sys.getsizeof of a CPython set that count names were added to one by one: the
+    table (16 bytes per slot, a power of two) grows when it is 3/5 full, to four times the
+    used slots up to 50,000 and twice as many above.
+    """
+    mask, size = 7, 8
+    while True:
+        resize_at = -(-mask * 3 // 5)
+        if count < resize_at:
+            break
+        size = 8
+        while size <= resize_at * (2 if resize_at > 50000 else 4):
+            size <<= 1
+        mask = size - 1
+    # The first 8 slots are part of the set object itself.
+    return sys.getsizeof(set()) + (16 * size if size > 8 else 0)
+
+
+def calibrate(candidates, users, items=CALIBRATION_ITEMS, queries=CALIBRATION_QUERIES, seed=0):
+    """
+    Builds every candidate at a small size on this machine and records its p99 lookup
+    latency (scaled to users for linear and binary search) in candidate.latency_us.
+    Candidates that cannot be built at their parameters are marked rejected.
+    """
+    names = _calibration_names(items, seed)
+    name_set = set(names)
+    rng = random.Random(seed)
+    probes = rng.sample(names, queries // 10) + [f"~absent~{i}" for i in range(queries - queries // 10)]
+    rng.shuffle(probes)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_file = os.path.join(tmp, "names.txt")
+        with open(data_file, 'w') as f:
+            f.write("\n".join(names) + "\n")
+        for candidate in candidates:
+            structure, params = candidate.structure, candidate.params
+            scale = 1.0
+            if structure == 'linear':
+                # O(n): time a short list and scale linearly.
+                short = names[:1000]
+                latency = _p99_us(lambda s, name: name in s, short, probes[:2000])
+                scale = users / len(short)
+            elif structure == 'binary':
+                latency = _p99_us(_binary_search, sorted(names), probes)
+                scale = math.log2(max(users, 2)) / math.log2(items)
+            elif structure == 'hash':
+                latency = _p99_us(lambda s, name: name in s, name_set, probes)
+            elif structure == 'sorted_index':
+                index_file = os.path.join(tmp, "names.idx")
+                build_sorted_index(data_file, index_file)
+                index = SortedIndex(index_file)
+                latency = _p99_us(SortedIndex.contains, index, probes)
+                scale = math.log2(max(users, 2)) / math.log2(items)
+            elif structure == 'fingerprints':
+                latency = _p99_us(FingerprintSet.contains, FingerprintSet(names), probes)
+            elif structure == 'xor':
+                latency = _p99_us(XorFilter.check, XorFilter(names, params['fingerprint_size']), probes)
+            elif structure == 'cuckoo':
+                cuckoo_filter = CuckooFilter(bucket_size=params['bucket_size'], fingerprint_size=params['fingerprint_size'],
+                                             max_kicks=params['max_kicks'], expected_items=items,
+                                             target_load=params['target_load'])
+                if cuckoo_filter.bulk_insert(names):
+                    candidate.rejected = f"cannot reach load {params['target_load']}"
+                    continue
+                latency = _p99_us(CuckooFilter.contains, cuckoo_filter, probes)
+            else:
+                cls = BloomFilter if structure == 'bloom' else BlockedBloomFilter
+                bloom_filter = cls(items, params['fp_prob'])
+                bloom_filter.add_many(names)
+                latency = _p99_us(cls.check, bloom_filter, probes)
+            candidate.latency_us = latency * scale
+
+
+def recommend(users, memory_budget, fp_target=0.01, latency_goal_us=None, dynamic=True,
+              calibration_items=CALIBRATION_ITEMS):
+    """
+    Picks the fastest structure and configuration within the memory budget and FP target.
+
+    Parameters:
+        users (int): Expected number of usernames (size for the next growth milestone).
+        memory_budget (int): Memory the structure may use, in bytes.
+        fp_target (float): Highest acceptable false positive rate.
+        latency_goal_us (float): p99 single-lookup latency goal in microseconds, or None.
+        dynamic (bool): Require a structure that accepts new names after the build.
+        calibration_items (int): Names built into each candidate for calibration.
+
+    Returns:
+        Recommendation: The choice, with every considered candidate.
+
+    Raises:
+        ValueError: If no structure fits the budget and FP target.
+    """
+    candidates = analytic_candidates(users, fp_target, str_bytes=measure_str_bytes(calibration_items))
+    for candidate in candidates:
+        if dynamic and not candidate.dynamic:
+            candidate.rejected = "static"
+        elif candidate.fp_rate > fp_target:
+            candidate.rejected = "over the FP target"
+        elif candidate.memory_bytes > memory_budget:
+            candidate.rejected = "over the memory budget"
+    calibrate([c for c in candidates if c.rejected is None], users, calibration_items)
+
+    fitting = sorted((c for c in candidates if c.rejected is None), key=lambda c: (c.latency_us, c.memory_bytes))
+    if not fitting:
+        smallest = min((c for c in candidates if c.rejected in (None, "over the memory budget")),
+                       key=lambda c: c.memory_bytes, default=None)
+        need = f"; the smallest option needs {smallest.memory_bytes / 2**20:.1f} MB" if smallest else ""
+        raise ValueError(f"No structure fits {memory_budget / 2**20:.1f} MB at fp {fp_target}{need}")
+    best = fitting[0]
+    meets_latency = latency_goal_us is None or best.latency_us <= latency_goal_us
+    return Recommendation(best, meets_latency, candidates)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recommend a membership structure for a user count and budget.")
+    parser.add_argument("users", type=int, help="expected number of usernames")
+    parser.add_argument("--memory-mb", type=float, required=True, help="memory budget in MB")
+    parser.add_argument("--fp", type=float, default=0.01, help="false positive target")
+    parser.add_argument("--latency-us", type=float, help="p99 lookup latency goal in microseconds")
+    parser.add_argument("--static", action="store_true", help="allow structures that cannot add names")
+    parser.add_argument("--calibration-items", type=int, default=CALIBRATION_ITEMS)
+    args = parser.parse_args()
+
+    start = time.time()
+    recommendation = recommend(args.users, int(args.memory_mb * 2**20), args.fp, args.latency_us,
+                               not args.static, args.calibration_items)
+    print(recommendation.report())
+    print(f"Calibrated in {time.time() - start:.2f} seconds.")
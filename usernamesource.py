@@ -0,0 +1,177 @@
+import mmap
+import numpy as np
+
+BLOCK_SIZE = 8 << 20  # bytes decoded and split at a time
+# ASCII bytes that str.strip() keeps; a line holding one is never blank.
+_SOLID_BYTES = np.array([b < 0x80 and not chr(b).isspace() for b in range(256)])
+# ASCII separators that str.strip() removes and bytes.strip() keeps (as do non-ASCII spaces).
+_SEPARATOR_BYTES = (b"\x1c", b"\x1d", b"\x1e", b"\x1f")
+
+
+class UsernameSource:
+    """
+    Streaming, memory-mapped view of a username file (one username per line).
+
+    The file is mapped read-only, so every reader in every process shares the page cache
+    and no more than one block of usernames is materialized at a time. Blank lines and
+    surrounding whitespace (including the '\\r' of CRLF files) are skipped.
+
+    Attributes:
+        filename (str): Path of the username file.
+        block_size (int): Number of bytes decoded and split at a time.
+    """
+
+    def __init__(self, filename, block_size=BLOCK_SIZE):
+        """
+        Opens and maps a username file.
+
+        Parameters:
+            filename (str): Path of the username file.
+            block_size (int): Number of bytes decoded and split at a time.
+        """
+        self.filename = filename
+        self.block_size = block_size
+        with open(filename, 'rb') as f:
+            try:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # Empty files cannot be mapped.
+                self._map = b""
+
+    def __len__(self):
+        """
+        Returns the size of the file in bytes.
+        """
+        return len(self._map)
+
+    def __iter__(self):
+        """
+        Yields every username of the file as a str.
+        """
+        for block in self._blocks(0, len(self._map)):
+            yield from _split_block(block, decode=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """
+        Unmaps the file.
+        """
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+
+    def _blocks(self, start, end):
+        """
+        Yields zero-copy memoryviews over [start, end), each holding whole lines only.
+        """
+        pos = start
+        while pos < end:
+            stop = min(pos + self.block_size, end)
+            if stop < end:
+                # Cut after the last newline of the block, or after the end of a line longer than a block.
+                cut = self._map.rfind(b"\n", pos, stop)
+                if cut == -1:
+                    cut = self._map.find(b"\n", stop, end)
+                stop = end if cut == -1 else cut + 1
+            yield memoryview(self._map)[pos:stop]
+            pos = stop
+
+    def _range(self, start, end):
+        return start, len(self._map) if end is None else min(end, len(self._map))
+
+    def usernames(self, start=0, end=None, decode=True):
+        """
+        Yields the usernames of the lines in the byte range [start, end).
+
+        Parameters:
+            start (int): First byte, the start of a line (see split()).
+            end (int): Byte after the range, the start of a line or None for the end of the file.
+            decode (bool): Yield str if True, raw UTF-8 bytes otherwise.
+        """
+        for block in self._blocks(*self._range(start, end)):
+            yield from _split_block(block, decode)
+
+    def batches(self, batch_size, start=0, end=None, decode=True):
+        """
+        Yields the usernames of the byte range [start, end) in lists of batch_size
+        (the last list may be shorter).
+
+        Parameters:
+            batch_size (int): Number of usernames per batch.
+            start (int): First byte, the start of a line (see split()).
+            end (int): Byte after the range, the start of a line or None for the end of the file.
+            decode (bool): Yield str if True, raw UTF-8 bytes otherwise.
+        """
+        batch = []
+        for block in self._blocks(*self._range(start, end)):
+            names = _split_block(block, decode)
+            taken = 0
+            while taken < len(names):
+                take = batch_size - len(batch)
+                batch.extend(names[taken:taken + take])
+                taken += take
+                if len(batch) == batch_size:
+                    yield batch
+                    batch = []
+        if batch:
+            yield batch
+
+    def split(self, parts):
+        """
+        Splits the file into at most 'parts' byte ranges of similar size, each starting at a line.
+
+        Parameters:
+            parts (int): Number of ranges wanted.
+
+        Returns:
+            list: (start, end) byte ranges covering the file, for parallel consumers.
+        """
+        size = len(self._map)
+        bounds = [0]
+        for i in range(1, parts):
+            # Move each cut to the first line starting at or after it.
+            cut = self._map.find(b"\n", max(size * i // parts - 1, bounds[-1]))
+            bounds.append(size if cut == -1 else cut + 1)
+        bounds.append(size)
+        return [(start, end) for start, end in zip(bounds, bounds[1:]) if start < end]
+
+    def count(self, start=0, end=None):
+        """
+        Counts the usernames of the byte range [start, end) without building them.
+
+        Returns:
+            int: The exact number of usernames iteration yields, e.g. for sizing a filter.
+        """
+        total = 0
+        for block in self._blocks(*self._range(start, end)):
+            data = np.frombuffer(block, dtype=np.uint8)
+            newlines = np.flatnonzero(data == ord("\n"))
+            line_starts = np.concatenate(([0], newlines + 1))
+            line_ends = np.concatenate((newlines, [len(data)]))
+            # A line starting with an ASCII byte that str.strip() keeps is a username; the
+            # rest (empty, or starting with whitespace or a non-ASCII character) are rare
+            # and decoded and stripped like iteration does.
+            first = data[np.minimum(line_starts, len(data) - 1)]
+            solid = (line_ends > line_starts) & _SOLID_BYTES[first]
+            total += int(np.count_nonzero(solid))
+            for i in np.flatnonzero(~solid & (line_ends > line_starts)).tolist():
+                total += bool(str(block[line_starts[i]:line_ends[i]], 'utf-8').strip())
+        return total
+
+
+def _split_block(block, decode):
+    """
+    Splits a block of whole lines into its non-blank, stripped usernames. Raw bytes are
+    stripped like decoded names: a block of plain ASCII without \\x1c-\\x1f is split as
+    bytes, any other block is decoded, stripped and encoded again.
+    """
+    if not decode:
+        data = bytes(block)
+        if data.isascii() and not any(separator in data for separator in _SEPARATOR_BYTES):
+            return [name for name in map(bytes.strip, data.split(b"\n")) if name]
+    names = [name for name in map(str.strip, str(block, 'utf-8').split("\n")) if name]
+    return names if decode else [name.encode('utf-8') for name in names]
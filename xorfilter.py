@@ -0,0 +1,258 @@
+import argparse
+import time
+import numpy as np
+import filterfile
+from hashing import (Murmur3Hasher, saved_seed, xor_fingerprint, xor_fingerprint_many, xor_positions,
+                     xor_positions_many)
+from usernamesource import UsernameSource
+
+# Static xor filter (Graf & Lemire, "Xor Filters: Faster and Smaller Than Bloom and Cuckoo
+# Filters", 2020) for a snapshot of taken usernames that does not change between rebuilds.
+#
+# Every key maps to one slot in each of three blocks, and the table is filled so that the
+# xor of a key's three slots equals its fingerprint. A lookup is therefore exactly three
+# probes, and an absent key matches with probability 2**-fingerprint_size while the table
+# costs 1.23 * fingerprint_size bits per key (about 9.8 bits per key for 0.39% with 8-bit
+# fingerprints, against 9.6 bits per key for 1% in a Bloom filter). The table is built by
+# peeling: repeatedly remove keys that are alone in one of their slots, then assign the
+# slots in reverse peeling order. Peeling fails with a small probability, in which case the
+# keys are hashed again with the next seed.
+BATCH_SIZE = 1_000_000
+MAX_ATTEMPTS = 100
+
+
+def _fingerprint_dtype(fingerprint_size):
+    if fingerprint_size not in (8, 16):
+        raise ValueError(f"fingerprint_size must be 8 or 16 bits, got {fingerprint_size}")
+    return np.dtype(np.uint8 if fingerprint_size == 8 else np.uint16)
+
+
+def _block_length(num_keys):
+    return (int(1.23 * num_keys) + 32) // 3 + 1
+
+
+def table_bytes(num_keys, fingerprint_size=8):
+    """
+    Returns the size in bytes of the fingerprint table of a xor filter over num_keys keys.
+
+    Parameters:
+        num_keys (int): Number of distinct keys.
+        fingerprint_size (int): Fingerprint size in bits, 8 or 16.
+
+    Returns:
+        int: The table size in bytes.
+    """
+    return 3 * _block_length(num_keys) * _fingerprint_dtype(fingerprint_size).itemsize
+
+
+def _peel(positions, capacity):
+    """
+    Peels the keys of an (n, 3) slot array, a round at a time: every key alone in one of
+    its slots is removed at once, which may leave other keys alone in theirs.
+
+    Returns:
+        list: (keys, slots) array pairs, one per round, or None if some keys could not be peeled.
+    """
+    n = len(positions)
+    flat = positions.ravel().astype(np.intp)
+    key_ids = np.repeat(np.arange(n, dtype=np.int64), 3)
+    counts = np.bincount(flat, minlength=capacity)
+    # xor of the ids of the keys in each slot: the id of the only key of a slot with count 1
+    xor_ids = np.zeros(capacity, dtype=np.int64)
+    np.bitwise_xor.at(xor_ids, flat, key_ids)
+
+    rounds = []
+    peeled = 0
+    candidates = np.flatnonzero(counts == 1)
+    while len(candidates):
+        slots = candidates[counts[candidates] == 1]
+        keys, first = np.unique(xor_ids[slots], return_index=True)
+        slots = slots[first]
+        rounds.append((keys, slots))
+        peeled += len(keys)
+
+        removed = positions[keys].ravel().astype(np.intp)
+        np.subtract.at(counts, removed, 1)
+        np.bitwise_xor.at(xor_ids, removed, np.repeat(keys, 3))
+        # Only the slots just touched can have become singletons.
+        candidates = np.unique(removed[counts[removed] == 1])
+    return rounds if peeled == n else None
+
+
+class XorFilter:
+    """
+    Static xor filter: built once from a set of usernames, then only queried.
+
+    Attributes:
+        fingerprint_size (int): Fingerprint size in bits (8 or 16).
+        block_length (int): Slots per block; the table has three blocks.
+        count (int): Number of distinct keys the filter was built from.
+        hasher: Stable 128-bit hasher; the first 64 bits of each hash are used.
+        fingerprints (numpy.ndarray): The table of 3 * block_length fingerprints.
+    """
+
+    # Filter kind recorded in saved files.
+    kind = filterfile.KIND_XOR
+
+    def __init__(self, items=(), fingerprint_size=8, seed=0):
+        """
+        Builds the filter from an iterable of usernames.
+
+        Parameters:
+            items: An iterable of usernames.
+            fingerprint_size (int): Fingerprint size in bits (8 or 16).
+            seed (int): Seed of the first hash function tried.
+        """
+        items = list(items)
+        self._build(lambda: (items[i:i + BATCH_SIZE] for i in range(0, len(items), BATCH_SIZE)),
+                    fingerprint_size, seed)
+
+    @classmethod
+    def from_file(cls, data_file, fingerprint_size=8, seed=0):
+        """
+        Builds the filter from a username file, hashing it one batch at a time.
+
+        Parameters:
+            data_file (str): Username file, one username per line.
+            fingerprint_size (int): Fingerprint size in bits (8 or 16).
+            seed (int): Seed of the first hash function tried.
+
+        Returns:
+            XorFilter: The new filter.
+        """
+        xor_filter = cls.__new__(cls)
+        xor_filter._build(lambda: UsernameSource(data_file).batches(BATCH_SIZE), fingerprint_size, seed)
+        return xor_filter
+
+    def _build(self, batches, fingerprint_size, seed):
+        """
+        Hashes the keys from batches() and fills the table, trying seed, seed + 1, ...
+        until peeling succeeds.
+        """
+        dtype = _fingerprint_dtype(fingerprint_size)
+        self.fingerprint_size = fingerprint_size
+        for attempt in range(MAX_ATTEMPTS):
+            self.hasher = Murmur3Hasher((seed + attempt) % 2 ** 32)
+            parts = [self.hasher.hash_pairs(batch)[0] for batch in batches() if batch]
+            # Duplicate keys could never be peeled; identical usernames are stored once.
+            hashes = np.unique(np.concatenate(parts)) if parts else np.empty(0, dtype=np.uint64)
+            self.count = len(hashes)
+            self.block_length = _block_length(self.count)
+            capacity = 3 * self.block_length
+            positions = xor_positions_many(hashes, self.block_length)
+            rounds = _peel(positions, capacity)
+            if rounds is not None:
+                break
+        else:
+            raise RuntimeError(f"Could not build an xor filter in {MAX_ATTEMPTS} attempts")
+
+        fingerprints = np.zeros(capacity, dtype=dtype)
+        fps = xor_fingerprint_many(hashes, fingerprint_size).astype(dtype)
+        # In reverse peeling order each key owns its peeling slot, whose value makes the
+        # xor of the key's three slots equal its fingerprint. Slots peeled in the same
+        # round never hold another key of that round, so a round is assigned at once.
+        for keys, slots in reversed(rounds):
+            key_positions = positions[keys].astype(np.intp)
+            value = fps[keys] ^ fingerprints[key_positions[:, 0]] ^ fingerprints[key_positions[:, 1]] \
+                ^ fingerprints[key_positions[:, 2]]
+            fingerprints[slots] = value  # the peeling slot itself still holds 0
+        self._set_fingerprints(fingerprints)
+
+    def _set_fingerprints(self, fingerprints):
+        self.fingerprints = fingerprints
+        # Scalar lookups index a plain memoryview, which returns Python ints much faster
+        # than numpy scalar indexing.
+        self._view = memoryview(fingerprints).cast('B').cast('B' if self.fingerprint_size == 8 else 'H')
+
+    def __len__(self):
+        return self.count
+
+    def check(self, item):
+        """
+        Checks whether an item is possibly in the filter.
+
+        Parameters:
+            item: The item to search for.
+
+        Returns:
+            bool: True if the item might be in the filter (or is present), False if definitely not.
+        """
+        h = self.hasher.hash_pair(item)[0]
+        p0, p1, p2 = xor_positions(h, self.block_length)
+        view = self._view
+        return xor_fingerprint(h, self.fingerprint_size) == view[p0] ^ view[p1] ^ view[p2]
+
+    def check_many(self, items):
+        """
+        Checks a batch of items at once.
+
+        Parameters:
+            items: An iterable of items to search for.
+
+        Returns:
+            numpy.ndarray: A bool array, True where the item might be in the filter.
+        """
+        h = self.hasher.hash_pairs(items)[0]
+        positions = xor_positions_many(h, self.block_length).astype(np.intp)
+        table = self.fingerprints
+        stored = table[positions[:, 0]] ^ table[positions[:, 1]] ^ table[positions[:, 2]]
+        return stored == xor_fingerprint_many(h, self.fingerprint_size).astype(table.dtype)
+
+    def bits_per_key(self):
+        """
+        Returns the size of the table in bits per stored key.
+        """
+        return self.fingerprints.nbytes * 8 / self.count if self.count else 0.0
+
+    def save(self, filename):
+        """
+        Saves the filter to a file in the binary filter format.
+
+        Parameters:
+            filename (str): Path of the file to write.
+        """
+        header = filterfile.FilterHeader(
+            kind=self.kind, seed=saved_seed(self.hasher), size=len(self.fingerprints), hash_count=3,
+            bucket_size=0, fingerprint_size=self.fingerprint_size, count=self.count,
+            fp_prob=2.0 ** -self.fingerprint_size)
+        table = self.fingerprints.astype(self.fingerprints.dtype.newbyteorder('<'), copy=False)
+        filterfile.write_filter(filename, header, np.ascontiguousarray(table))
+
+    @classmethod
+    def load(cls, filename, mode='r', verify=False):
+        """
+        Opens a filter saved with save(). The table is memory-mapped from the file,
+        so nothing is copied and it is ready at once.
+
+        Parameters:
+            filename (str): Path of the file to open.
+            mode (str): 'r' read-only or 'c' private copy-on-write.
+            verify (bool): Check the payload checksum (reads the whole table).
+
+        Returns:
+            XorFilter: The loaded filter.
+        """
+        header, payload = filterfile.open_filter(filename, cls.kind, mode, verify)
+        xor_filter = cls.__new__(cls)
+        xor_filter.fingerprint_size = header.fingerprint_size
+        xor_filter.block_length = header.size // 3
+        xor_filter.count = header.count
+        xor_filter.hasher = Murmur3Hasher(header.seed)
+        dtype = _fingerprint_dtype(header.fingerprint_size).newbyteorder('<')
+        xor_filter._set_fingerprints(np.frombuffer(payload, dtype=dtype, count=header.size))
+        return xor_filter
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build a static xor filter over a username file.")
+    parser.add_argument("data_file", help="username file, one username per line")
+    parser.add_argument("filter_file", help="xor filter file to write")
+    parser.add_argument("--fingerprint-size", type=int, choices=[8, 16], default=8)
+    args = parser.parse_args()
+
+    print(f"Building xor filter {args.filter_file} from {args.data_file}...")
+    start = time.time()
+    xor_filter = XorFilter.from_file(args.data_file, args.fingerprint_size)
+    xor_filter.save(args.filter_file)
+    print(f"Stored {len(xor_filter)} usernames at {xor_filter.bits_per_key():.2f} bits per key "
+          f"in {time.time() - start:.2f} seconds.")